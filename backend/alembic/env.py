@@ -13,6 +13,8 @@ from app.core.database import Base
 from app.core.config import settings
 from app.models.company import Company
 from app.models.financials import IncomeStatement
+from app.models.sync_state import SyncState
+from app.models.sync_run import SyncRun, SyncCheckpoint, SyncDeadLetter
 
 # Alembic Config object
 config = context.config
@@ -1,19 +1,36 @@
 from fastapi import APIRouter, Query, Path, HTTPException, Depends
 from enum import Enum
-from sqlalchemy.orm import Session
-from ..core.database import get_db
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..core.database import get_async_db
+from ..core.singleflight import run_db_coalesced
+from ..core.responses import ORJSONResponse
 from app.services.business_service import (
     get_company_profile,
     get_income_statements,
     get_key_metrics,
     get_financial_ratios,
     get_stock_news,
+    get_company_profiles_batch,
+    get_financials_batch,
+    get_ttm_financials,
 )
+from app.services.fetch_through import get_fetch_through
 import logging
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
+class PaginationMode(str, Enum):
+    offset = "offset"
+    cursor = "cursor"
+
+class FinancialPeriod(str, Enum):
+    annual = "annual"
+    quarter = "quarter"
+    all = "all"
+
 class FinancialDataType(str, Enum):
     income_statements = "income-statements"
     key_metrics = "key-metrics"
@@ -25,26 +42,102 @@ DATA_TYPE_TO_SERVICE = {
     FinancialDataType.ratios: get_financial_ratios,
 }
 
+DATA_TYPE_TO_DATASET = {
+    FinancialDataType.income_statements: "income_statements",
+    FinancialDataType.key_metrics: "key_metrics",
+    FinancialDataType.ratios: "financial_ratios",
+}
+
+def parse_symbols(symbols: str) -> List[str]:
+    """Comma-separated tickers, upper-cased and de-duplicated in request order."""
+    parsed = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="At least one symbol is required")
+    if len(parsed) > settings.batch_max_symbols:
+        raise HTTPException(status_code=400, detail=f"At most {settings.batch_max_symbols} symbols per request")
+    return parsed
+
+def parse_data_types(data_types: str) -> List[str]:
+    datasets = []
+    for value in dict.fromkeys(v.strip() for v in data_types.split(",") if v.strip()):
+        try:
+            datasets.append(DATA_TYPE_TO_DATASET[FinancialDataType(value)])
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid data type: {value}")
+    if not datasets:
+        raise HTTPException(status_code=400, detail="At least one data type is required")
+    return datasets
+
+async def fetch_through(db: AsyncSession, symbol: str, dataset: str, service_func, *args) -> ORJSONResponse:
+    """Serve a per-symbol read, syncing unknown symbols and refreshing stale ones from FMP."""
+    read = lambda: run_db_coalesced(db, service_func, symbol, *args)
+    status_code, body = await get_fetch_through().serve(db, symbol, dataset, read)
+    headers = {"Retry-After": str(body["retry_after"])} if status_code == 202 else None
+    return ORJSONResponse(body, status_code=status_code, headers=headers)
+
 @router.get("/company/{symbol}")
-def company_profile(symbol: str, db: Session = Depends(get_db)):
-    """Get company profile by symbol."""
-    return get_company_profile(db, symbol)
+async def company_profile(symbol: str, db: AsyncSession = Depends(get_async_db)):
+    """Get company profile by symbol; 202 while an unknown symbol is being fetched."""
+    return await fetch_through(db, symbol, "profiles", get_company_profile)
 
 @router.get("/financials/{symbol}/{data_type}")
-def financials_paginated(
+async def financials_paginated(
     symbol: str,
     data_type: FinancialDataType = Path(..., description="Type of financial data to retrieve"),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    paginate: PaginationMode = Query(PaginationMode.offset, description="offset (skip/limit) or cursor (keyset on date, id)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; implies cursor mode"),
+    include_total: Optional[bool] = Query(None, description="Cursor mode only: also return the total row count"),
+    period: FinancialPeriod = Query(FinancialPeriod.annual, description="annual (FY) rows, quarter (Q1-Q4) rows, or all"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get paginated financial data (income statements) for a symbol."""
     service_func = DATA_TYPE_TO_SERVICE.get(data_type)
     if not service_func:
         raise HTTPException(status_code=400, detail=f"Invalid data type: {data_type}")
-    return service_func(db, symbol, skip, limit)
+    return await fetch_through(
+        db, symbol, DATA_TYPE_TO_DATASET[data_type], service_func,
+        skip, limit, cursor, paginate.value, include_total, period.value,
+    )
+
+@router.get("/financials/{symbol}/{data_type}/ttm")
+async def financials_ttm(
+    symbol: str,
+    data_type: FinancialDataType = Path(..., description="Type of financial data to aggregate"),
+    limit: int = Query(4, ge=1, le=40, description="Latest trailing-twelve-month windows, one per quarter end"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get trailing-twelve-month figures computed from a symbol's quarterly rows."""
+    dataset = DATA_TYPE_TO_DATASET[data_type]
+    return await fetch_through(db, symbol, dataset, get_ttm_financials, dataset, limit)
 
 @router.get("/news/{symbol}")
-def stock_news(symbol: str, limit: int = Query(20, ge=1, le=50), db: Session = Depends(get_db)):
+async def stock_news(symbol: str, limit: int = Query(20, ge=1, le=50), db: AsyncSession = Depends(get_async_db)):
     """Get latest news articles for a symbol."""
-    return get_stock_news(db, symbol, limit)
\ No newline at end of file
+    return await fetch_through(db, symbol, "news", get_stock_news, limit)
+
+@router.get("/batch/companies")
+async def company_profiles_batch(
+    symbols: str = Query(..., description="Comma-separated tickers, e.g. AAPL,MSFT"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get company profiles for many symbols; unknown symbols get an error entry."""
+    return ORJSONResponse(await run_db_coalesced(db, get_company_profiles_batch, parse_symbols(symbols)))
+
+@router.get("/batch/financials")
+async def financials_batch(
+    symbols: str = Query(..., description="Comma-separated tickers, e.g. AAPL,MSFT"),
+    data_types: str = Query(
+        ",".join(t.value for t in FinancialDataType),
+        description="Comma-separated data types (income-statements, key-metrics, ratios)",
+    ),
+    limit: int = Query(4, ge=1, le=20, description="Latest rows per symbol and data type"),
+    period: FinancialPeriod = Query(FinancialPeriod.annual, description="annual (FY) rows, quarter (Q1-Q4) rows, or all"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the latest financial data for many symbols, grouped by symbol then data type."""
+    datasets = parse_data_types(data_types)
+    return ORJSONResponse(await run_db_coalesced(
+        db, get_financials_batch, parse_symbols(symbols), datasets, limit, period.value,
+    ))
@@ -0,0 +1,268 @@
+# command line entry point for backend jobs
+# run with command: python -m app.cli sync --symbols AAPL,MSFT --stages profiles,news --report report.json
+#                   python -m app.cli seed-fixtures --samples ../docs/api-endpoints
+#                   python -m app.cli import --dataset income_statements history/*.csv
+#                   python -m app.cli sync --resume [RUN_ID]; python -m app.cli runs --dead-letters
+#                   python -m app.cli scheduler [--run-now news]
+#                   python -m app.cli queue produce --symbols-file universe.txt; python -m app.cli queue work --workers 4
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import List, Optional
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.crud.crud_sync_runs import get_dead_letters, get_recent_runs
+from app.services.bulk_import import FILE_FORMATS, IMPORT_DATASETS, import_file
+from app.services.business_service import PERIOD_DAYS
+from app.services.fmp_client import FMPClient, set_shared_fmp_client
+from app.services.fmp_transport import seed_fixtures
+from app.services.pipeline import STAGE_DEPENDENCIES, resume_pipeline, run_pipeline
+from app.services.scheduler import get_scheduler
+from app.services.rate_limiter import RedisTokenBucket, requests_per_minute, set_rate_limiter
+from app.services.work_queue import RedisBroker, get_broker, produce, run_workers
+
+def _csv(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Foresight Analytics backend jobs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sync = commands.add_parser("sync", help="Sync FMP data into the database")
+    sync.add_argument("--symbols", type=lambda v: [s.upper() for s in _csv(v)], default=None,
+                      help="comma-separated tickers (default: settings.FAANG_SYMBOLS)")
+    sync.add_argument("--stages", type=_csv, default=None,
+                      help=f"comma-separated stages (default: all of {', '.join(STAGE_DEPENDENCIES)})")
+    sync.add_argument("--concurrency", type=int, default=None,
+                      help="symbols in flight at once (default: settings.sync_concurrency)")
+    sync.add_argument("--force-refresh", action="store_true", help="ignore sync watermarks")
+    sync.add_argument("--periods", type=_csv, default=None,
+                      help="comma-separated period types for the financial stages, annual and/or quarter "
+                           "(default: settings.fmp_sync_periods)")
+    sync.add_argument("--report", default=None, help="write the JSON run report to this path, or - for stdout")
+    sync.add_argument("--resume", nargs="?", type=int, const=0, default=None, metavar="RUN_ID",
+                      help="continue an interrupted run with its own symbols and options "
+                           "(default: the newest run still marked running)")
+
+    runs = commands.add_parser("runs", help="Print recent sync runs, or the dead-letter table, as JSON")
+    runs.add_argument("--limit", type=int, default=20)
+    runs.add_argument("--dead-letters", action="store_true", help="list the symbols later runs will retry")
+
+    seed = commands.add_parser("seed-fixtures", help="Write FMP replay fixtures from sample payloads")
+    seed.add_argument("--samples", type=Path, default=Path("../docs/api-endpoints"),
+                      help="directory of sample FMP payloads (default: ../docs/api-endpoints)")
+    seed.add_argument("--fixtures", type=Path, default=None,
+                      help="fixture directory (default: settings.fmp_fixtures_dir)")
+
+    bulk = commands.add_parser("import", help="Bulk-load historical FMP records from files")
+    bulk.add_argument("files", type=Path, nargs="+", help="CSV, JSON-lines or Parquet files with FMP field names")
+    bulk.add_argument("--dataset", required=True, choices=list(IMPORT_DATASETS))
+    bulk.add_argument("--format", dest="file_format", choices=sorted(set(FILE_FORMATS.values())), default=None,
+                      help="file format (default: from each file's extension)")
+    bulk.add_argument("--chunk-size", type=int, default=None,
+                      help="records per chunk (default: settings.import_chunk_size)")
+    bulk.add_argument("--report", default=None, help="write the JSON import report to this path, or - for stdout")
+
+    scheduler = commands.add_parser("scheduler", help="Run the scheduled syncs as a standalone worker")
+    scheduler.add_argument("--run-now", dest="run_now", default=None, choices=list(settings.scheduler_jobs),
+                           help="run this job once, subject to its lease, and exit")
+
+    queue = commands.add_parser("queue", help="Sync through the shared work queue: produce tasks, run workers")
+    actions = queue.add_subparsers(dest="action", required=True)
+    enqueue = actions.add_parser("produce", help="Enqueue a (symbol, dataset) task per pair")
+    enqueue.add_argument("--symbols", type=lambda v: [s.upper() for s in _csv(v)], default=None,
+                         help="comma-separated tickers (default: every company in the database plus FAANG)")
+    enqueue.add_argument("--symbols-file", type=Path, default=None, help="file of tickers, one per line")
+    enqueue.add_argument("--datasets", type=_csv, default=None,
+                         help=f"comma-separated datasets (default: all of {', '.join(STAGE_DEPENDENCIES)})")
+    work = actions.add_parser("work", help="Consume tasks until interrupted")
+    work.add_argument("--workers", type=int, default=1, help="workers in this process, each with its own FMP client")
+    work.add_argument("--drain", action="store_true", help="exit once no task is ready or in flight")
+    work.add_argument("--concurrency", type=int, default=None,
+                      help="symbols in flight per worker (default: settings.sync_concurrency)")
+    actions.add_parser("status", help="Print the queue's progress counters as JSON")
+    dead = actions.add_parser("dead-letters", help="Print dead-lettered tasks as JSON")
+    dead.add_argument("--requeue", action="store_true", help="enqueue them again with fresh attempts")
+    return parser
+
+def print_summary(report: dict):
+    print(f"\n{'stage':<18} {'status':<10} {'seconds':>8} {'symbols':>8} {'rows':>7} {'failed':>7}")
+    for name, outcome in report["stages"].items():
+        result = outcome.get("result", {})
+        print(f"{name:<18} {outcome['status']:<10} {outcome.get('seconds', 0):>8.2f} "
+              f"{result.get('succeeded', 0):>8} {result.get('rows', 0):>7} {len(result.get('failed', {})):>7}")
+    run = f"run {report['run_id']} " if report.get("run_id") else ""
+    print(f"\n{run}{report['status']}: wall {report['wall_seconds']:.2f}s "
+          f"(stages sum to {report['stage_seconds_total']:.2f}s)")
+
+def run_sync(args: argparse.Namespace) -> int:
+    symbols = args.symbols or settings.FAANG_SYMBOLS
+    unknown = [s for s in args.stages or [] if s not in STAGE_DEPENDENCIES]
+    if unknown:
+        print(f"Unknown stages: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    unknown = [p for p in args.periods or [] if p not in PERIOD_DAYS]
+    if unknown:
+        print(f"Unknown periods: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    if args.resume is not None:
+        try:
+            report = asyncio.run(resume_pipeline(args.resume or None, concurrency=args.concurrency))
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+    else:
+        report = asyncio.run(run_pipeline(
+            symbols,
+            stages=args.stages,
+            concurrency=args.concurrency,
+            force_refresh=args.force_refresh,
+            periods=args.periods,
+        ))
+
+    if args.report == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_summary(report)
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(report, f, indent=2)
+    return 0 if report["status"] == "succeeded" else 1
+
+def run_seed_fixtures(args: argparse.Namespace) -> int:
+    written = seed_fixtures(args.samples, args.fixtures or Path(settings.fmp_fixtures_dir))
+    for path in written:
+        print(path)
+    return 0 if written else 1
+
+def run_import(args: argparse.Namespace) -> int:
+    reports = []
+    db = SessionLocal()
+    try:
+        for path in args.files:
+            reports.append(import_file(db, path, args.dataset, args.chunk_size, args.file_format))
+    finally:
+        db.close()
+
+    if args.report == "-":
+        json.dump(reports, sys.stdout, indent=2)
+        print()
+        return 0
+    print(f"\n{'file':<40} {'read':>10} {'inserted':>10} {'updated':>10} {'rejected':>9} {'rows/s':>9}")
+    for report in reports:
+        print(f"{report['file'][-40:]:<40} {report['read']:>10} {report['inserted']:>10} {report['updated']:>10} "
+              f"{report['rejected']:>9} {report['rows_per_second'] or 0:>9}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(reports, f, indent=2)
+    return 0
+
+async def scheduler_worker(run_now: Optional[str] = None) -> int:
+    scheduler = get_scheduler()
+    async with FMPClient(api_key=settings.fmp_api_key) as fmp_client:
+        set_shared_fmp_client(fmp_client)
+        try:
+            if run_now:
+                run = await scheduler.run_job(run_now)
+                if run is None:
+                    print(f"{run_now} is running on another replica", file=sys.stderr)
+                    return 1
+                json.dump(run, sys.stdout, indent=2)
+                print()
+                return 0 if run["status"] == "succeeded" else 1
+            scheduler.start()
+            await asyncio.Event().wait()  # until interrupted
+            return 0
+        finally:
+            await scheduler.stop()
+            set_shared_fmp_client(None)
+
+def run_scheduler(args: argparse.Namespace) -> int:
+    try:
+        return asyncio.run(scheduler_worker(args.run_now))
+    except KeyboardInterrupt:
+        return 0
+
+def run_runs(args: argparse.Namespace) -> int:
+    db = SessionLocal()
+    try:
+        if args.dead_letters:
+            rows = [{
+                "symbol": letter.symbol,
+                "dataset": letter.dataset,
+                "failures": letter.failures,
+                "error": letter.error,
+                "last_run_id": letter.last_run_id,
+                "next_retry_at": letter.next_retry_at.isoformat() if letter.next_retry_at else None,
+            } for letter in get_dead_letters(db)]
+        else:
+            rows = [{
+                "id": run.id,
+                "status": run.status,
+                "trigger": run.trigger,
+                "symbols": len(run.symbols),
+                "stages": run.stages,
+                "started_at": run.created_at.isoformat() if run.created_at else None,
+                "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+            } for run in get_recent_runs(db, args.limit)]
+    finally:
+        db.close()
+    json.dump(rows, sys.stdout, indent=2)
+    print()
+    return 0
+
+def run_queue(args: argparse.Namespace) -> int:
+    broker = get_broker()
+    if args.action == "produce":
+        symbols = args.symbols
+        if args.symbols_file:
+            symbols = (symbols or []) + [s.strip().upper() for s in args.symbols_file.read_text().split() if s.strip()]
+        try:
+            added = asyncio.run(produce(broker, symbols, args.datasets))
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+        print(f"Enqueued {added} tasks")
+    elif args.action == "work":
+        if isinstance(broker, RedisBroker):  # every worker on every node draws on the one plan budget
+            set_rate_limiter(RedisTokenBucket(broker.client, requests_per_minute(), settings.fmp_rate_limit_burst))
+        try:
+            asyncio.run(run_workers(broker, args.workers, drain=args.drain, concurrency=args.concurrency))
+        except KeyboardInterrupt:
+            pass
+    elif args.action == "dead-letters" and args.requeue:
+        print(f"Requeued {broker.requeue_dead()} tasks")
+        return 0
+    elif args.action == "dead-letters":
+        json.dump(broker.dead_letters(), sys.stdout, indent=2)
+        print()
+        return 0
+    json.dump(broker.progress(), sys.stdout, indent=2)
+    print()
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    args = build_parser().parse_args(argv)
+    if args.command == "sync":
+        return run_sync(args)
+    if args.command == "seed-fixtures":
+        return run_seed_fixtures(args)
+    if args.command == "import":
+        return run_import(args)
+    if args.command == "runs":
+        return run_runs(args)
+    if args.command == "scheduler":
+        return run_scheduler(args)
+    if args.command == "queue":
+        return run_queue(args)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+# read-through response cache for the service layer (Redis, with an in-process fallback)
+
+import asyncio
+import inspect
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.util.concurrency import await_, in_greenlet
+from .config import settings
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "foresight:cache"
+
+def _json_default(value: Any):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class InMemoryCache:
+    """Thread-safe LRU with a TTL per entry; used when Redis is not configured or reachable."""
+
+    def __init__(self, max_entries: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple[float, str, tuple[str, ...]]]" = OrderedDict()
+        self._tags: dict[str, set[str]] = {}
+        self._fill_locks: dict[str, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, tags = entry
+            if expires_at <= self._clock():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int, tags: Iterable[str] = ()):
+        tags = tuple(tags)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (self._clock() + ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def acquire(self, key: str, ttl: float) -> Optional[str]:
+        """Take the lock named key unless someone holds it; returns the token to release it with."""
+        with self._lock:
+            held = self._fill_locks.get(key)
+            if held is not None and held[0] > self._clock():
+                return None
+            token = uuid.uuid4().hex
+            self._fill_locks[key] = (self._clock() + ttl, token)
+            return token
+
+    def release(self, key: str, token: str):
+        with self._lock:
+            held = self._fill_locks.get(key)
+            if held is not None and held[1] == token:
+                del self._fill_locks[key]
+
+    def extend(self, key: str, token: str, ttl: float) -> bool:
+        """Push a held lock's expiry to ttl from now; False when the lock is no longer ours."""
+        with self._lock:
+            held = self._fill_locks.get(key)
+            if held is None or held[1] != token or held[0] <= self._clock():
+                return False
+            self._fill_locks[key] = (self._clock() + ttl, token)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._fill_locks.clear()
+
+def _off_loop(fn: Callable, *args, **kwargs):
+    """
+    Call a blocking backend method. Inside AsyncSession.run_sync the caller is on the
+    event loop's thread, so the call runs in a worker thread while the loop keeps serving.
+    """
+    if in_greenlet():
+        return await_(asyncio.to_thread(fn, *args, **kwargs))
+    return fn(*args, **kwargs)
+
+class RedisCache:
+    """
+    Redis-backed cache; each tag is a set of the keys to drop when it is invalidated.
+    Round trips made from the event loop's thread run in a worker thread (_off_loop).
+    """
+
+    # delete the lock only while it still holds our token, not one taken after ours expired
+    RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+    EXTEND_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end return 0"
+
+    def __init__(self, client):
+        self.client = client
+        self._release = client.register_script(self.RELEASE_SCRIPT)
+        self._extend = client.register_script(self.EXTEND_SCRIPT)
+
+    def get(self, key: str) -> Optional[str]:
+        value = _off_loop(self.client.get, key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str, ttl: int, tags: Iterable[str] = ()):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(key, value, ex=ttl)
+        for tag in tags:
+            tag_key = f"{KEY_PREFIX}:tag:{tag}"
+            pipe.sadd(tag_key, key)
+            pipe.expire(tag_key, ttl)
+        _off_loop(pipe.execute)
+
+    def invalidate_tags(self, tags: Iterable[str]):
+        _off_loop(self._invalidate_tags, list(tags))
+
+    def _invalidate_tags(self, tags: List[str]):
+        for tag in tags:
+            tag_key = f"{KEY_PREFIX}:tag:{tag}"
+            keys = self.client.smembers(tag_key)
+            self.client.delete(tag_key, *keys)
+
+    def acquire(self, key: str, ttl: float) -> Optional[str]:
+        """SET NX with an expiry, so a crashed holder cannot block the key for longer than ttl."""
+        token = uuid.uuid4().hex
+        return token if _off_loop(self.client.set, key, token, nx=True, px=int(ttl * 1000)) else None
+
+    def release(self, key: str, token: str):
+        _off_loop(self._release, keys=[key], args=[token])
+
+    def extend(self, key: str, token: str, ttl: float) -> bool:
+        return bool(_off_loop(self._extend, keys=[key], args=[token, int(ttl * 1000)]))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(f"{KEY_PREFIX}:*"))
+        if keys:
+            self.client.delete(*keys)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def connect_redis():
+    """A pinged client for the configured Redis; raises when it is not reachable."""
+    import redis
+    client = redis.Redis.from_url(
+        settings.upstash_redis_url or settings.redis_url,
+        socket_connect_timeout=settings.cache_redis_timeout,
+        socket_timeout=settings.cache_redis_timeout,
+    )
+    client.ping()
+    return client
+
+def _build_cache():
+    if settings.cache_backend == "redis":
+        try:
+            client = connect_redis()
+            logger.info("Response cache using Redis")
+            return RedisCache(client)
+        except Exception as e:
+            logger.warning(f"Redis unavailable ({e}); falling back to in-process cache")
+    return InMemoryCache(max_entries=settings.cache_max_entries)
+
+def get_cache():
+    """Process-wide cache backend, chosen on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = _build_cache()
+    return _cache
+
+def set_cache(cache):
+    """Swap the process-wide backend (tests, or app startup with an explicit client)."""
+    global _cache
+    _cache = cache
+
+def _tag(dataset: str, symbol: str) -> str:
+    return f"{dataset}:{symbol}"
+
+def invalidate(symbol: str, *datasets: str):
+    """Drop every cached response for these datasets of a symbol."""
+    try:
+        get_cache().invalidate_tags(_tag(dataset, symbol) for dataset in datasets)
+    except Exception as e:
+        logger.warning(f"Cache invalidation failed for {symbol} {datasets}: {e}")
+
+async def invalidate_async(symbol: str, *datasets: str):
+    """invalidate() for coroutines: the backend round trips run in a worker thread."""
+    await asyncio.to_thread(invalidate, symbol, *datasets)
+
+def _sleep(seconds: float):
+    """Sleep without blocking the event loop when running inside AsyncSession.run_sync."""
+    if in_greenlet():
+        await_(asyncio.sleep(seconds))
+    else:
+        time.sleep(seconds)
+
+def _lead_or_wait(cache, key: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Elect one filler per missed key across workers. Returns (lock token, None) to the
+    worker that should run the loader, or (None, value) to one that found the value
+    another worker stored while it waited. (None, None) means load without the lock:
+    the wait timed out, or the backend cannot lock.
+    """
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + settings.cache_lock_wait
+    waited = False
+    while True:
+        try:
+            token = cache.acquire(lock_key, settings.cache_lock_ttl)
+            if token is not None:
+                # the previous holder may have stored the value just before releasing
+                hit = cache.get(key) if waited else None
+                if hit is not None:
+                    cache.release(lock_key, token)
+                    return None, hit
+                return token, None
+        except Exception as e:
+            logger.warning(f"Cache lock failed for {key}: {e}")
+            return None, None
+        if time.monotonic() >= deadline:
+            metrics.incr("cache_fills_total", role="timeout")
+            return None, None
+        _sleep(settings.cache_lock_poll)
+        waited = True
+        try:
+            hit = cache.get(key)
+        except Exception:
+            hit = None
+        if hit is not None:
+            return None, hit
+
+def read_through(dataset: str, symbol: str, params: Dict[str, Any], loader: Callable[[], Any]) -> Any:
+    """
+    Return the cached value for (dataset, params), or call loader and cache its result.
+    The TTL comes from settings.cache_ttls and the entry is tagged by (dataset, symbol)
+    for invalidation by the sync functions. Exceptions, e.g. 404s, are never cached.
+    On a miss, a short-lived lock in the cache backend lets one worker run the loader
+    while the others poll for its result, so an expiring hot key costs one query
+    rather than one per worker.
+    """
+    key = f"{KEY_PREFIX}:{dataset}:" + ":".join(f"{name}={value}" for name, value in params.items())
+
+    cache = get_cache()
+    try:
+        hit = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+        hit = None
+    if hit is not None:
+        return json.loads(hit)
+
+    token, hit = _lead_or_wait(cache, key)
+    if hit is not None:
+        metrics.incr("cache_fills_total", role="follower")
+        return json.loads(hit)
+    if token is not None:
+        metrics.incr("cache_fills_total", role="leader")
+    try:
+        result = loader()
+        try:
+            ttl = settings.cache_ttls.get(dataset, settings.cache_default_ttl)
+            cache.set(key, json.dumps(result, default=_json_default), ttl, tags=[_tag(dataset, symbol)])
+        except Exception as e:
+            logger.warning(f"Cache write failed for {key}: {e}")
+    finally:
+        if token is not None:
+            try:
+                cache.release(f"{key}:lock", token)
+            except Exception as e:
+                logger.warning(f"Cache unlock failed for {key}: {e}")
+    return result
+
+def cached(dataset: str):
+    """
+    Read-through cache for service functions shaped like fn(db, symbol, ...).
+    The key covers every argument after db, so skip/limit pages are cached separately.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(db, *args, **kwargs):
+            bound = signature.bind(db, *args, **kwargs)
+            bound.apply_defaults()
+            params = dict(list(bound.arguments.items())[1:])
+            symbol = next(iter(params.values()))
+            return read_through(dataset, symbol, params, lambda: func(db, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def _fill_coalesced_ratio() -> Dict[str, float]:
+    followers = metrics.counter("cache_fills_total", role="follower")
+    total = followers + sum(metrics.counter("cache_fills_total", role=role) for role in ("leader", "timeout"))
+    return {"cache_fill_coalesced_ratio": round(followers / total, 4)} if total else {}
+
+metrics.register_collector(_fill_coalesced_ratio)
@@ -13,11 +13,38 @@ class Settings(BaseSettings):
     # database 
     database_url: str
     neon_database_url: Optional[str] = None
+    async_database_url: Optional[str] = None  # derived from the URL above when unset
+
+    # connection pool (ignored for SQLite)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30  # seconds to wait for a free connection
+    db_pool_recycle: int = 300  # seconds; under Neon's idle suspend so stale sockets are not reused
+    db_pool_pre_ping: bool = True
+    db_external_pooler: bool = False  # NullPool, for PgBouncer / Neon's pooled endpoint
+    db_max_connections: Optional[int] = None  # connection budget shared by all web workers and both engines
+    web_concurrency: int = 1  # uvicorn/gunicorn worker processes (WEB_CONCURRENCY)
 
     # redis
     redis_url: str
     upstash_redis_url: Optional[str] = None
 
+    # response cache
+    cache_backend: str = "redis"  # "redis" or "memory"; redis falls back to memory when unreachable
+    cache_redis_timeout: float = 0.5  # seconds
+    cache_max_entries: int = 1024  # in-process LRU size
+    cache_default_ttl: int = 300
+    cache_lock_ttl: float = 10  # seconds a cache-fill lock outlives a crashed holder
+    cache_lock_wait: float = 2  # seconds a worker waits for another worker's fill before querying itself
+    cache_lock_poll: float = 0.02  # seconds between checks while waiting
+    cache_ttls: dict[str, int] = {
+        "company": 3600,
+        "income_statements": 86400,
+        "key_metrics": 86400,
+        "financial_ratios": 86400,
+        "news": 900,
+    }
+
     # API Keys
     fmp_api_key: str
 
@@ -25,6 +52,7 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str="HS256"
     access_token_expire_minutes: int=30
+    admin_token: Optional[str] = None  # enables /admin/* routes; callers send it in the X-Admin-Token header
 
     # app
     app_name: str = "Finance Analytics Platform"
@@ -33,11 +61,96 @@ class Settings(BaseSettings):
     # FMP API Configuration
     fmp_base_url: str = "https://financialmodelingprep.com/stable"
     fmp_rate_limit_delay: int = 1  # seconds between requests for free tier
+    fmp_plan_tier: str = "free"  # free, starter, premium or ultimate
+    fmp_requests_per_minute: Optional[float] = None  # overrides the tier; 0 disables limiting
+    fmp_plan_rate_limits: dict[str, int] = {
+        "starter": 300,
+        "premium": 750,
+        "ultimate": 3000,
+    }
+    fmp_rate_limit_burst: Optional[int] = None  # defaults to one second of budget
+    fmp_rate_limit_backend: str = "local"  # "redis" shares one budget across processes and nodes (sync workers)
+    fmp_max_retries: int = 4  # on 429, 5xx and timeouts
+    fmp_backoff_base: float = 0.5  # seconds; doubled per attempt, with full jitter
+    fmp_backoff_max: float = 30
+    fmp_breaker_failure_threshold: int = 5  # consecutive 429s/5xx/timeouts before an endpoint's circuit opens
+    fmp_breaker_reset_timeout: float = 30  # seconds a circuit stays open before a probe request
+    fmp_endpoint_memory_ttl: float = 3600  # seconds to remember which news endpoint variant answers
+
+    # FMP HTTP transport; one long-lived session per app or CLI run
+    fmp_connection_limit: int = 100  # open sockets in total
+    fmp_connection_limit_per_host: int = 20
+    fmp_dns_cache_ttl: int = 300  # seconds
+    fmp_keepalive_timeout: float = 30  # seconds an idle connection stays open for reuse
+    fmp_connect_timeout: float = 5
+    fmp_timeout_default: float = 15  # total seconds per request
+    fmp_timeouts: dict[str, float] = {  # per endpoint, overriding the default
+        "profile": 10,
+        "stock_news": 30,
+        "general_news": 30,
+    }
+    fmp_transport: str = "http"  # http, record (http + save fixtures) or replay (fixtures only, offline)
+    fmp_fixtures_dir: str = "tests/fixtures/fmp"
     
     # Data fetch limits (free tier constraints)
     fmp_max_companies: int = 5  # FAANG companies
     fmp_max_periods: int = 5
-    fmp_max_articles: int = 20  # articles per request
+    fmp_max_quarters: int = 8  # quarters on a first sync; four make one trailing-twelve-month window
+    fmp_sync_periods: list[str] = ["annual", "quarter"]  # period types synced for the financial datasets
+    fmp_max_articles: int = 20  # articles per symbol
+    fmp_batch_size: int = 50  # symbols per comma-separated profile/news request
+
+    # Batch endpoints
+    batch_max_symbols: int = 100  # symbols per /batch request
+
+    # Sync engine
+    sync_concurrency: int = 5  # symbols in flight at once across a sync run
+    db_upsert_batch_size: int = 1000  # rows per INSERT ... ON CONFLICT statement
+    sync_state_max_age_days: int = 7  # refetch even when no new period is due, for restatements
+    sync_checkpoint_chunk: int = 100  # symbols per stage between checkpoints; a crash loses at most one chunk
+    sync_retry_attempts: int = 2  # retries within a run of the symbols that failed
+    sync_retry_delay: float = 5  # seconds before the first retry, doubled per retry
+    sync_dead_letter_backoff: float = 3600  # seconds before a later run retries a dead-lettered symbol
+    sync_dead_letter_backoff_max: float = 7 * 86400  # the backoff doubles per failed run up to this
+    sync_dead_letter_max_failures: int = 8  # failed runs after which a symbol is only retried when asked for
+
+    # Fetch-through reads: unknown symbols are synced on request, stale ones refreshed in the background
+    fetch_through_enabled: bool = True
+    fetch_through_wait: float = 3  # seconds a request for an unknown symbol waits before answering 202
+    fetch_through_check_interval: float = 60  # seconds between freshness checks per symbol and dataset
+    fetch_through_negative_ttl: float = 120  # seconds a symbol still missing after a fetch answers 404 without a refetch
+    fetch_through_new_per_minute: float = 30  # syncs of symbols missing from the database per process; 0 disables the cap
+    fetch_through_max_tracked: int = 10000  # (symbol, dataset) pairs remembered for freshness checks and 404 answers
+    freshness_sla: dict[str, int] = {  # seconds since the last fetch before a dataset is refreshed
+        "profiles": 86400,
+        "income_statements": 7 * 86400,  # matches sync_state_max_age_days; sooner would skip as not due
+        "key_metrics": 7 * 86400,
+        "financial_ratios": 7 * 86400,
+        "news": 3600,
+    }
+
+    # Background sync scheduler: cron expressions in UTC, one lease per job across replicas
+    scheduler_enabled: bool = False  # run inside the web app; `python -m app.cli scheduler` runs it standalone
+    scheduler_jobs: dict[str, str] = {
+        "profiles": "0 */6 * * *",
+        "financials": "30 6 * * *",
+        "news": "*/15 * * * *",
+    }
+    scheduler_jitter: float = 30  # up to this many seconds added to each run, so replicas and jobs spread out
+    scheduler_lease_ttl: float = 300  # seconds a crashed runner holds a job; renewed while the job runs
+    scheduler_stats_ttl: int = 30 * 86400  # seconds the last-run record of a job is kept
+    scheduler_runs_kept: int = 100  # newest scheduled runs kept in sync_runs, with their checkpoints
+
+    # Sync work queue: a producer enqueues (symbol, dataset) tasks, any number of workers consume them
+    work_queue_backend: str = "redis"  # "redis" or "memory" (one process; tests)
+    work_queue_claim_size: int = 20  # tasks per claim; profile and news tasks of a claim share FMP batch requests
+    work_queue_visibility_timeout: float = 300  # seconds before an unacknowledged task is handed to another worker
+    work_queue_max_attempts: int = 3  # then the task moves to the dead-letter list
+    work_queue_retry_delay: float = 30  # seconds before a failed task is retried, doubled per attempt
+    work_queue_poll_interval: float = 1  # seconds an idle worker waits before claiming again
+
+    # Bulk import
+    import_chunk_size: int = 5000  # records read, validated and merged at a time
 
     # FAANG Symbol
     FAANG_SYMBOLS: list[str] = ["META", "AAPL", "AMZN", "NFLX", "GOOGL"]
@@ -1,16 +1,116 @@
 # setting up SQLAlchemy (ORM) to connect to the database
 
-from sqlalchemy import create_engine
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
+from .metrics import metrics
 
 # Neon URL, fall back to local PostgreSQL
 database_url = settings.neon_database_url or settings.database_url
 
-engine = create_engine(database_url)
+# asyncio drivers for each supported backend
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its asyncio counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver configured for {backend}")
+    parsed = parsed.set(drivername=ASYNC_DRIVERS[backend])
+    # asyncpg takes ssl= rather than libpq's sslmode= (Neon URLs carry sslmode=require)
+    if backend == "postgresql" and "sslmode" in parsed.query:
+        sslmode = parsed.query["sslmode"]
+        parsed = parsed.difference_update_query(["sslmode", "channel_binding"]).update_query_dict({"ssl": sslmode})
+    return parsed.render_as_string(hide_password=False)
+
+class _PoolTelemetryMixin:
+    """Records checkout wait time, overflow connections and checkout timeouts."""
+    metrics_label = "sync"
+
+    def _do_get(self):
+        overflow_before = self.overflow()
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            metrics.incr("db_pool_checkout_timeouts_total", engine=self.metrics_label)
+            raise
+        finally:
+            metrics.observe("db_pool_checkout_wait_seconds", time.perf_counter() - start, engine=self.metrics_label)
+        if self.overflow() > overflow_before and self.overflow() > 0:
+            metrics.incr("db_pool_overflow_total", engine=self.metrics_label)
+        return connection
+
+class InstrumentedQueuePool(_PoolTelemetryMixin, QueuePool):
+    metrics_label = "sync"
+
+class InstrumentedAsyncQueuePool(_PoolTelemetryMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+def pool_options(url: str, is_async: bool = False) -> dict:
+    """
+    create_engine pool arguments from settings. With db_max_connections set, the
+    budget is split across web_concurrency workers, then between the two engines every
+    process has: the async one (routes and syncs) gets the larger half, the sync one
+    (CLI and bulk import paths) the rest, at least one each. The share caps
+    pool_size + overflow.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    if settings.db_external_pooler:
+        # PgBouncer in transaction mode cannot keep asyncpg's prepared statements
+        options = {"poolclass": NullPool}
+        if is_async:
+            options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        return options
+
+    pool_size, max_overflow = settings.db_pool_size, settings.db_max_overflow
+    if settings.db_max_connections:
+        per_worker = max(1, settings.db_max_connections // max(1, settings.web_concurrency))
+        async_share = (per_worker + 1) // 2
+        share = async_share if is_async else max(1, per_worker - async_share)
+        pool_size = min(pool_size, share)
+        max_overflow = min(max_overflow, share - pool_size)
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+engine = create_engine(database_url, **pool_options(database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_database_url = settings.async_database_url or to_async_url(database_url)
+async_engine = create_async_engine(async_database_url, **pool_options(async_database_url, is_async=True))
+# expire_on_commit=False: attributes stay readable between awaits without implicit IO
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def _pool_gauges() -> dict:
+    gauges = {}
+    for label, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        if isinstance(pool, QueuePool):
+            gauges[f"db_pool_in_use{{engine={label}}}"] = pool.checkedout()
+            gauges[f"db_pool_idle{{engine={label}}}"] = pool.checkedin()
+            gauges[f"db_pool_overflow{{engine={label}}}"] = max(0, pool.overflow())
+            gauges[f"db_pool_size{{engine={label}}}"] = pool.size()
+    return gauges
+
+metrics.register_collector(_pool_gauges)
+
 Base = declarative_base()
 
 def get_db():
@@ -18,4 +118,46 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Call a sync CRUD/service function fn(session, ...) with either session flavour.
+    On an AsyncSession it runs through run_sync, so IO is awaited on the async driver
+    instead of blocking the event loop; calls sharing one AsyncSession are serialized,
+    since a session cannot run two operations at once.
+    """
+    if not isinstance(db, AsyncSession):
+        return fn(db, *args, **kwargs)
+    async with _run_db_lock(db):
+        return await db.run_sync(fn, *args, **kwargs)
+
+def _run_db_lock(db: AsyncSession) -> asyncio.Lock:
+    lock = db.info.get("run_db_lock")
+    if lock is None:
+        lock = db.info["run_db_lock"] = asyncio.Lock()
+    return lock
+
+@asynccontextmanager
+async def forked_session(db):
+    """
+    A session of its own on db's engine, for work that commits or rolls back independently
+    of other coroutines sharing db; a failure there leaves db and its loaded objects alone.
+    run_db calls stay serialized with db's, as on one shared session, so engines that hand
+    every session the same connection (SQLite's StaticPool) keep working.
+    """
+    if isinstance(db, AsyncSession):
+        async with AsyncSession(bind=db.bind, autoflush=False, expire_on_commit=False) as session:
+            session.info["run_db_lock"] = _run_db_lock(db)
+            try:
+                yield session
+            finally:
+                # closing rolls back whatever a failed call left behind
+                await run_db(session, Session.close)
+    else:
+        with Session(bind=db.get_bind(), autoflush=False, expire_on_commit=False) as session:
+            yield session
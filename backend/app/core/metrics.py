@@ -0,0 +1,65 @@
+# lightweight in-process metrics, exposed as JSON at GET /metrics
+
+import threading
+from collections import defaultdict
+from typing import Callable, Dict
+
+def _key(name: str, labels: Dict[str, str]) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+    return f"{name}{{{rendered}}}"
+
+class Metrics:
+    """Counters, gauges and summaries (count/sum/max) keyed by name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._summaries: Dict[str, Dict[str, float]] = {}
+        self._collectors: list[Callable[[], Dict[str, float]]] = []
+
+    def incr(self, name: str, value: float = 1.0, **labels):
+        with self._lock:
+            self._counters[_key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            summary = self._summaries.setdefault(key, {"count": 0, "sum": 0.0, "max": 0.0})
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["max"] = max(summary["max"], value)
+
+    def register_collector(self, collector: Callable[[], Dict[str, float]]):
+        """Add a callback that reports point-in-time gauges whenever a snapshot is taken."""
+        self._collectors.append(collector)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0.0)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            gauges = dict(self._gauges)
+            snapshot = {
+                "counters": dict(self._counters),
+                "summaries": {k: dict(v) for k, v in self._summaries.items()},
+            }
+        for collector in self._collectors:
+            gauges.update(collector())
+        snapshot["gauges"] = gauges
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+metrics = Metrics()
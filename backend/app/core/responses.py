@@ -0,0 +1,21 @@
+# pre-encoded JSON responses for the data endpoints
+
+from decimal import Decimal
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+
+def _orjson_default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class ORJSONResponse(JSONResponse):
+    """
+    Encodes the content with orjson, which handles dates and floats natively.
+    Returning it from a route bypasses FastAPI's jsonable_encoder walk over the payload.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,60 @@
+# request coalescing: concurrent identical reads share one execution (across workers, see cache.read_through)
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from .database import forked_session, run_db
+from .metrics import metrics
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one. The first caller starts
+    fn as a task; callers arriving while it is in flight await the same task and
+    share its result or exception. Each caller awaits through a shield, so one
+    disconnecting client does not cancel the work the others are waiting for.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            metrics.incr("singleflight_calls_total", role="leader")
+        else:
+            metrics.incr("singleflight_calls_total", role="follower")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller was cancelled
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+singleflight = SingleFlight()
+
+async def run_db_coalesced(db, fn: Callable[..., Any], *args) -> Any:
+    """
+    run_db for read-only service calls: concurrent calls of fn with equal arguments
+    run once and every caller gets that result. The shared call runs on a session of
+    its own on db's engine, since the first caller's request, and with it db, may end
+    while the others are still waiting.
+    """
+    key = (fn.__module__, fn.__qualname__, repr(args))
+    return await singleflight.do(key, lambda: _run_on_own_session(db, fn, *args))
+
+async def _run_on_own_session(db, fn: Callable[..., Any], *args) -> Any:
+    async with forked_session(db) as session:
+        return await run_db(session, fn, *args)
+
+def _coalesced_ratio() -> Dict[str, float]:
+    followers = metrics.counter("singleflight_calls_total", role="follower")
+    total = followers + metrics.counter("singleflight_calls_total", role="leader")
+    return {"singleflight_coalesced_ratio": round(followers / total, 4)} if total else {}
+
+metrics.register_collector(_coalesced_ratio)
@@ -0,0 +1,78 @@
+import io
+import zlib
+from typing import Any, Dict, List
+from sqlalchemy import column, literal_column, select, table
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+
+# SQLite caps bound parameters per statement (SQLITE_MAX_VARIABLE_NUMBER, 32766 since 3.32)
+SQLITE_MAX_VARIABLES = 32766
+
+def dialect_insert(db: Session, model):
+    """INSERT construct for the session's dialect, which exposes ON CONFLICT clauses."""
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model.__table__)
+    if dialect == 'sqlite':
+        return sqlite.insert(model.__table__)
+    raise NotImplementedError(f"Bulk writes are not supported on {dialect}")
+
+def max_batch_rows(db: Session, batch_size: int, columns: int) -> int:
+    """Clamp batch_size so one statement stays under the dialect's bound-parameter limit."""
+    if db.get_bind().dialect.name == 'sqlite':
+        return max(1, min(batch_size, SQLITE_MAX_VARIABLES // max(columns, 1)))
+    return batch_size
+
+def _copy_field(value: Any) -> str:
+    # COPY csv reads an unquoted empty field as NULL and a quoted one as ''
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+def copy_merge(db: Session, model, rows: List[Dict[str, Any]], key_columns: List[str], update: bool = True) -> Dict[str, int]:
+    """
+    PostgreSQL bulk merge: COPY rows into a temporary staging table, then move them into
+    the model's table with one INSERT ... SELECT ... ON CONFLICT on key_columns. Rows must
+    share the same keys and be unique on key_columns; with update=False rows that already
+    exist are left as stored. The caller commits.
+    """
+    report = {"inserted": 0, "updated": 0}
+    if not rows:
+        return report
+
+    target = model.__table__
+    columns = list(rows[0])
+    # one staging table per column set, kept for the connection's lifetime and emptied per call
+    stage_name = f"import_stage_{target.name}_{zlib.crc32(','.join(columns).encode()):08x}"
+    column_list = ", ".join(f'"{c}"' for c in columns)
+    connection = db.connection()
+    connection.exec_driver_sql(
+        f'CREATE TEMP TABLE IF NOT EXISTS {stage_name} AS SELECT {column_list} FROM "{target.name}" WITH NO DATA'
+    )
+    connection.exec_driver_sql(f"TRUNCATE {stage_name}")
+
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_copy_field(row[c]) for c in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {stage_name} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+    stage = table(stage_name, *[column(c) for c in columns])
+    stmt = postgresql.insert(target).from_select(columns, select(*stage.c))
+    if update:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={c: stmt.excluded[c] for c in columns if c not in key_columns},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=key_columns)
+    # xmax is 0 only on the rows this statement inserted
+    inserted = db.execute(stmt.returning(literal_column("xmax = 0"))).scalars().all()
+    report["inserted"] = sum(1 for flag in inserted if flag)
+    report["updated"] = len(inserted) - report["inserted"]
+    return report
@@ -1,6 +1,10 @@
 import logging
+from typing import Dict, List
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models.company import Company
+from .bulk import dialect_insert
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +39,12 @@ def create_company_from_profile(db: Session, profile_data: dict) -> Company:
         
         company = Company(**filtered_data)
         db.add(company)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # another sync worker created it since the lookup above; update that row instead
+            db.rollback()
+            return create_company_from_profile(db, profile_data)
         db.refresh(company)
         return company
 
@@ -45,4 +54,29 @@ def create_minimal_company(db: Session, symbol: str) -> Company:
     db.add(company)
     db.commit()
     db.refresh(company)
-    return company
\ No newline at end of file
+    return company
+
+def get_company_ids(db: Session, symbols: List[str]) -> Dict[str, int]:
+    """symbol -> company id for the given symbols that exist, in one query."""
+    if not symbols:
+        return {}
+    return dict(db.execute(select(Company.symbol, Company.id).where(Company.symbol.in_(symbols))).all())
+
+def get_company_symbols(db: Session) -> List[str]:
+    """Every symbol in the companies table, in symbol order."""
+    return list(db.execute(select(Company.symbol).order_by(Company.symbol)).scalars())
+
+def bulk_create_companies(db: Session, rows: List[dict]) -> None:
+    """
+    Insert companies from profile dicts, ignoring symbols that already exist.
+    None values are dropped as in create_company_from_profile, so column defaults
+    apply; rows are grouped by their remaining keys, one executemany per group.
+    """
+    groups: Dict[tuple, List[dict]] = {}
+    for row in rows:
+        filtered = {k: v for k, v in row.items() if v is not None}
+        groups.setdefault(tuple(sorted(filtered)), []).append(filtered)
+    stmt = dialect_insert(db, Company).on_conflict_do_nothing(index_elements=['symbol'])
+    for group in groups.values():
+        db.execute(stmt, group)
+    db.commit()
@@ -1,70 +1,76 @@
 from sqlalchemy.orm import Session
-from typing import List, Dict
-from datetime import datetime
+from sqlalchemy import select, UniqueConstraint
+from typing import List, Dict, Optional
+from ..core.config import settings
+from .bulk import dialect_insert, max_batch_rows
 from ..models.financials import IncomeStatement as IncomeStatementModel, FinancialRatio, KeyMetric
-from ..schemas.fmp_schemas import IncomeStatement as FMPIncomeStatement, FinancialRatios, KeyMetrics
 
-def upsert_income_statements(db: Session, statements: List[Dict], company_id: int, symbol: str):
+def _conflict_columns(model) -> List[str]:
+    """Columns of the model's _symbol_date_period_uc_* unique constraint."""
+    for constraint in model.__table__.constraints:
+        if isinstance(constraint, UniqueConstraint) and str(constraint.name).startswith('_symbol_date_period_uc'):
+            return [column.name for column in constraint.columns]
+    raise ValueError(f"{model.__name__} has no _symbol_date_period_uc_* constraint")
+
+def bulk_upsert(db: Session, model, rows: List[Dict], batch_size: Optional[int] = None) -> Dict[str, int]:
     """
-    Upserts (updates or inserts) income statement records from processed data dictionaries.
+    Set-based upsert keyed on the model's (symbol, date, period) unique constraint.
+    Each batch costs one SELECT for the existing keys (to report inserted vs updated)
+    and one INSERT ... ON CONFLICT DO UPDATE, instead of a query per row.
     """
-    for data_dict in statements:
-        existing = db.query(IncomeStatementModel).filter_by(
-            symbol=symbol, 
-            date=data_dict['date'], 
-            period=data_dict['period']
-        ).first()
+    report = {"inserted": 0, "updated": 0}
+    if not rows:
+        return report
+
+    key_columns = _conflict_columns(model)
+    table_columns = {c.name for c in model.__table__.columns if c.name != 'id'}
+    columns = [c for c in rows[0] if c in table_columns]
+
+    # A statement may not touch the same row twice, so the last payload per key wins
+    unique_rows = {}
+    for row in rows:
+        unique_rows[tuple(row[k] for k in key_columns)] = {c: row.get(c) for c in columns}
+    payload = list(unique_rows.items())
+
+    batch_size = max_batch_rows(db, batch_size or settings.db_upsert_batch_size, len(columns))
+
+    key_cols = [model.__table__.c[k] for k in key_columns]
+    symbol_col = model.__table__.c.symbol
+    for start in range(0, len(payload), batch_size):
+        batch = payload[start:start + batch_size]
+        # Filter on symbol (an indexed prefix on every dialect) and match full keys here;
+        # row-value IN lists are not index-assisted on SQLite.
+        symbols = {values['symbol'] for _, values in batch}
+        stored = set(db.execute(select(*key_cols).where(symbol_col.in_(symbols))).all())
+        existing = sum(1 for key, _ in batch if key in stored)
 
-        if existing:
-            # Update existing record
-            for key, value in data_dict.items():
-                if hasattr(existing, key):
-                    setattr(existing, key, value)
-        else:
-            # Create new record
-            new_statement = IncomeStatementModel(**data_dict)
-            db.add(new_statement)
+        stmt = dialect_insert(db, model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={c: stmt.excluded[c] for c in columns if c not in key_columns},
+        )
+        db.execute(stmt, [values for _, values in batch])
+
+        report["updated"] += existing
+        report["inserted"] += len(batch) - existing
 
     db.commit()
+    return report
+
+def upsert_income_statements(db: Session, statements: List[Dict], company_id: int, symbol: str) -> Dict[str, int]:
+    """
+    Upserts (updates or inserts) income statement records from processed data dictionaries.
+    """
+    return bulk_upsert(db, IncomeStatementModel, statements)
 
-def upsert_financial_ratios(db: Session, ratios: List[Dict], company_id: int, symbol: str):
+def upsert_financial_ratios(db: Session, ratios: List[Dict], company_id: int, symbol: str) -> Dict[str, int]:
     """
     Upserts financial ratio records.
     """
-    for data_dict in ratios:
-        existing = db.query(FinancialRatio).filter_by(
-            symbol=symbol,
-            date=data_dict['date'],
-            period=data_dict['period']
-        ).first()
-        
-        if existing:
-            for key, value in data_dict.items():
-                if hasattr(existing, key):
-                    setattr(existing, key, value)
-        else:
-            new_ratio = FinancialRatio(**data_dict)
-            db.add(new_ratio)
-    
-    db.commit()
+    return bulk_upsert(db, FinancialRatio, ratios)
 
-def upsert_key_metrics(db: Session, metrics: List[Dict], company_id: int, symbol: str):
+def upsert_key_metrics(db: Session, metrics: List[Dict], company_id: int, symbol: str) -> Dict[str, int]:
     """
     Upserts key metric records.
     """
-    for data_dict in metrics:
-        existing = db.query(KeyMetric).filter_by(
-            symbol=symbol,
-            date=data_dict['date'],
-            period=data_dict['period']
-        ).first()
-        
-        if existing:
-            for key, value in data_dict.items():
-                if hasattr(existing, key):
-                    setattr(existing, key, value)
-        else:
-            new_metric = KeyMetric(**data_dict)
-            db.add(new_metric)
-    
-    db.commit()
\ No newline at end of file
+    return bulk_upsert(db, KeyMetric, metrics)
@@ -1,23 +1,51 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from typing import List, Optional
+from ..core.config import settings
 from ..models.news import NewsArticle
 from ..schemas.fmp_schemas import FMPArticle
-from datetime import datetime
+from .bulk import dialect_insert, max_batch_rows
 
-def create_article(db: Session, article_data: FMPArticle, symbol: str) -> NewsArticle:
-    db_article = NewsArticle(
-        symbol=symbol,
-        title=article_data.title,
-        url=article_data.link,
-        site=article_data.site,
-        content=article_data.content,
-        author=article_data.author,
-        image_url=article_data.image,
-        published_date=datetime.strptime(article_data.date, '%Y-%m-%d %H:%M:%S')
-    )
-    db.add(db_article)
-    db.commit()
-    db.refresh(db_article)
-    return db_article
+def _article_row(article_data: FMPArticle, symbol: str) -> dict:
+    return {
+        "symbol": symbol,
+        "title": article_data.title,
+        "url": article_data.link,
+        "site": article_data.site,
+        "content": article_data.content,
+        "author": article_data.author,
+        "image_url": article_data.image,
+        "published_date": article_data.date,
+    }
 
-def get_articles_by_symbol(db: Session, symbol: str, limit: int = 20):
-    return db.query(NewsArticle).filter(NewsArticle.symbol == symbol).order_by(NewsArticle.published_date.desc()).limit(limit).all()
\ No newline at end of file
+def bulk_create_articles(db: Session, articles: List[FMPArticle], symbol: str, batch_size: Optional[int] = None) -> int:
+    """
+    Insert the articles not yet stored for a symbol and return how many were new.
+    Duplicates are dropped in memory, each batch is checked against the
+    (symbol, url) unique index in one query, and each batch commits once.
+    """
+    unique_articles = {}
+    for article_data in articles:
+        unique_articles.setdefault(article_data.link, article_data)
+    pending = list(unique_articles.values())
+
+    columns = len(NewsArticle.__table__.columns)
+    batch_size = max_batch_rows(db, batch_size or settings.db_upsert_batch_size, columns)
+
+    inserted = 0
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        stored = set(db.scalars(
+            select(NewsArticle.url).where(
+                NewsArticle.symbol == symbol,
+                NewsArticle.url.in_([a.link for a in batch]),
+            )
+        ))
+        rows = [_article_row(a, symbol) for a in batch if a.link not in stored]
+        if rows:
+            # Still guard on the constraint: a concurrent writer may insert between check and write
+            stmt = dialect_insert(db, NewsArticle).on_conflict_do_nothing(index_elements=['symbol', 'url'])
+            db.execute(stmt, rows)
+            inserted += len(rows)
+        db.commit()
+    return inserted
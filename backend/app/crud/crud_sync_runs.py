@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from ..models.sync_run import SyncCheckpoint, SyncDeadLetter, SyncRun
+from .bulk import dialect_insert
+
+def create_sync_run(
+    db: Session,
+    symbols: List[str],
+    stages: List[str],
+    periods: Optional[List[str]] = None,
+    force_refresh: bool = False,
+    trigger: str = "manual",
+) -> int:
+    run = SyncRun(
+        status="running", symbols=symbols, stages=stages, periods=periods, force_refresh=force_refresh, trigger=trigger,
+    )
+    db.add(run)
+    db.commit()
+    return run.id
+
+def get_sync_run(db: Session, run_id: int) -> Optional[SyncRun]:
+    return db.get(SyncRun, run_id)
+
+def get_unfinished_run(db: Session) -> Optional[SyncRun]:
+    """
+    The newest manual run still marked running, i.e. one that crashed or was stopped.
+    Scheduled runs are not picked: the next slot syncs their symbols again anyway.
+    """
+    return (
+        db.query(SyncRun)
+        .filter(SyncRun.status == "running", SyncRun.trigger == "manual")
+        .order_by(SyncRun.id.desc())
+        .first()
+    )
+
+def get_recent_runs(db: Session, limit: int = 20) -> List[SyncRun]:
+    return db.query(SyncRun).order_by(SyncRun.id.desc()).limit(limit).all()
+
+def prune_sync_runs(db: Session, trigger: str, keep: int) -> int:
+    """Delete all but the newest `keep` runs of a trigger, with their checkpoints; returns the runs deleted."""
+    stale = list(db.execute(
+        select(SyncRun.id).where(SyncRun.trigger == trigger).order_by(SyncRun.id.desc()).offset(keep)
+    ).scalars())
+    if not stale:
+        return 0
+    # spelled out rather than left to ON DELETE, which SQLite only honours with foreign keys enabled
+    db.execute(update(SyncDeadLetter).where(SyncDeadLetter.last_run_id.in_(stale)).values(last_run_id=None))
+    db.execute(delete(SyncCheckpoint).where(SyncCheckpoint.run_id.in_(stale)))
+    db.execute(delete(SyncRun).where(SyncRun.id.in_(stale)))
+    db.commit()
+    return len(stale)
+
+def finish_sync_run(db: Session, run_id: int, status: str, report: Dict[str, Any]) -> None:
+    db.execute(update(SyncRun).where(SyncRun.id == run_id).values(
+        status=status, report=report, finished_at=datetime.now(timezone.utc), updated_at=datetime.now(timezone.utc),
+    ))
+    db.commit()
+
+def get_checkpointed(db: Session, run_id: int, dataset: str) -> Set[str]:
+    """Symbols the run already synced for the dataset."""
+    return set(db.execute(select(SyncCheckpoint.symbol).where(
+        SyncCheckpoint.run_id == run_id, SyncCheckpoint.dataset == dataset, SyncCheckpoint.status == "succeeded",
+    )).scalars())
+
+def record_checkpoints(db: Session, run_id: int, dataset: str, succeeded: List[str], failed: Dict[str, str]) -> None:
+    """Upsert the outcome of each symbol; attempts counts every time a symbol was tried in the run."""
+    if not succeeded and not failed:
+        return
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"run_id": run_id, "symbol": symbol, "dataset": dataset, "status": "succeeded", "attempts": 1,
+         "error": None, "created_at": now, "updated_at": now}
+        for symbol in succeeded
+    ] + [
+        {"run_id": run_id, "symbol": symbol, "dataset": dataset, "status": "failed", "attempts": 1,
+         "error": error, "created_at": now, "updated_at": now}
+        for symbol, error in failed.items()
+    ]
+    stmt = dialect_insert(db, SyncCheckpoint)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['run_id', 'symbol', 'dataset'],
+        set_={
+            "status": stmt.excluded.status,
+            "error": stmt.excluded.error,
+            "attempts": SyncCheckpoint.__table__.c.attempts + 1,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt, rows)
+    db.commit()
+
+def record_dead_letters(
+    db: Session,
+    run_id: int,
+    dataset: str,
+    failed: Dict[str, str],
+    backoff: float,
+    backoff_max: float,
+) -> None:
+    """
+    Dead-letter symbols a run gave up on. Each further failure doubles the wait before
+    a later run retries the symbol: backoff, 2 * backoff, ... up to backoff_max seconds.
+    """
+    if not failed:
+        return
+    now = datetime.now(timezone.utc)
+    previous = dict(db.execute(select(SyncDeadLetter.symbol, SyncDeadLetter.failures).where(
+        SyncDeadLetter.dataset == dataset, SyncDeadLetter.symbol.in_(list(failed)),
+    )).all())
+    rows = []
+    for symbol, error in failed.items():
+        failures = previous.get(symbol, 0) + 1
+        rows.append({
+            "symbol": symbol,
+            "dataset": dataset,
+            "error": error,
+            "failures": failures,
+            "last_run_id": run_id,
+            "last_failed_at": now,
+            "next_retry_at": now + timedelta(seconds=min(backoff_max, backoff * 2 ** (failures - 1))),
+            "created_at": now,
+            "updated_at": now,
+        })
+    stmt = dialect_insert(db, SyncDeadLetter)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['symbol', 'dataset'],
+        set_={name: stmt.excluded[name] for name in (
+            "error", "failures", "last_run_id", "last_failed_at", "next_retry_at", "updated_at",
+        )},
+    )
+    db.execute(stmt, rows)
+    db.commit()
+
+def clear_dead_letters(db: Session, dataset: str, symbols: List[str]) -> None:
+    """Drop the dead letters of symbols that synced again."""
+    if not symbols:
+        return
+    db.execute(delete(SyncDeadLetter).where(SyncDeadLetter.dataset == dataset, SyncDeadLetter.symbol.in_(symbols)))
+    db.commit()
+
+def get_due_dead_letters(db: Session, dataset: str, max_failures: int) -> List[str]:
+    """Dead-lettered symbols whose backoff has passed and that have not failed max_failures runs yet."""
+    return list(db.execute(select(SyncDeadLetter.symbol).where(
+        SyncDeadLetter.dataset == dataset,
+        SyncDeadLetter.next_retry_at <= datetime.now(timezone.utc),
+        SyncDeadLetter.failures < max_failures,
+    ).order_by(SyncDeadLetter.next_retry_at)).scalars())
+
+def get_dead_letters(db: Session) -> List[SyncDeadLetter]:
+    return db.query(SyncDeadLetter).order_by(SyncDeadLetter.dataset, SyncDeadLetter.symbol).all()
@@ -0,0 +1,64 @@
+from datetime import date, datetime, timezone
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy.orm import Session
+from ..models.sync_state import SyncState
+from .bulk import dialect_insert
+
+class Watermark(NamedTuple):
+    """
+    A stored watermark as plain values. Syncs hold it across awaits, where an ORM
+    SyncState could be expired by another symbol's commit or rollback and need IO to read.
+    """
+    last_date: Optional[date]
+    last_fetched_at: Optional[datetime]
+    payload_hash: Optional[str]
+
+WATERMARK_COLUMNS = (SyncState.last_date, SyncState.last_fetched_at, SyncState.payload_hash)
+
+def get_sync_state(db: Session, symbol: str, dataset: str, period: str) -> Optional[Watermark]:
+    row = db.query(*WATERMARK_COLUMNS).filter_by(symbol=symbol, dataset=dataset, period=period).first()
+    return Watermark(*row) if row else None
+
+def get_sync_states(db: Session, symbols: List[str], dataset: str, period: str) -> Dict[str, Watermark]:
+    """Watermarks for many symbols in one query, keyed by symbol."""
+    rows = db.query(SyncState.symbol, *WATERMARK_COLUMNS).filter(
+        SyncState.symbol.in_(symbols), SyncState.dataset == dataset, SyncState.period == period
+    ).all()
+    return {symbol: Watermark(*values) for symbol, *values in rows}
+
+def get_last_fetched(db: Session, symbol: str, dataset: str) -> Dict[str, Optional[datetime]]:
+    """period -> when the dataset was last fetched for the symbol, one entry per stored watermark."""
+    rows = db.query(SyncState.period, SyncState.last_fetched_at).filter_by(symbol=symbol, dataset=dataset).all()
+    return dict(rows)
+
+def record_sync_state(
+    db: Session,
+    symbol: str,
+    dataset: str,
+    period: str,
+    last_date: Optional[date],
+    payload_hash: Optional[str],
+) -> None:
+    """Insert or update the watermark for (symbol, dataset, period) after a successful fetch."""
+    now = datetime.now(timezone.utc)
+    stmt = dialect_insert(db, SyncState).values(
+        symbol=symbol,
+        dataset=dataset,
+        period=period,
+        last_date=last_date,
+        last_fetched_at=now,
+        payload_hash=payload_hash,
+        created_at=now,
+        updated_at=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['symbol', 'dataset', 'period'],
+        set_={
+            "last_date": stmt.excluded.last_date,
+            "last_fetched_at": stmt.excluded.last_fetched_at,
+            "payload_hash": stmt.excluded.payload_hash,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+    db.commit()
@@ -1,12 +1,38 @@
-from fastapi import FastAPI
+import secrets
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
+from .core.metrics import metrics
 from .api.routes import router
+from .services.fetch_through import get_fetch_through
+from .services.fmp_client import FMPClient, set_shared_fmp_client
+from .services.scheduler import get_scheduler
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one FMP session for the app's lifetime, so requests reuse warm keep-alive connections
+    if not settings.fmp_api_key:
+        yield
+        return
+    async with FMPClient(api_key=settings.fmp_api_key) as fmp_client:
+        set_shared_fmp_client(fmp_client)
+        if settings.scheduler_enabled:
+            get_scheduler().start()
+        try:
+            yield
+        finally:
+            # scheduled and fetch-through syncs use the shared client; stop them before it closes
+            await get_scheduler().stop()
+            await get_fetch_through().close()
+            set_shared_fmp_client(None)
 
 app = FastAPI(
     title = settings.app_name,
     description="AI-powered finance analytics platform",
-    version = "1.0.0"
+    version = "1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware for frontend
@@ -27,4 +53,19 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "environment": settings.environment}
\ No newline at end of file
+    return {"status": "healthy", "environment": settings.environment}
+
+@app.get("/metrics")
+async def metrics_snapshot():
+    return metrics.snapshot()
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Admin routes do not exist unless ADMIN_TOKEN is set, and then need it in X-Admin-Token."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.get("/admin/jobs", dependencies=[Depends(require_admin_token)])
+async def scheduled_jobs():
+    return get_scheduler().status()
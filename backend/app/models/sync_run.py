@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.sql import func
+from ..core.database import Base
+from .company import TimestampMixin
+
+class SyncRun(Base, TimestampMixin):
+    """One pipeline run; what it was asked to sync, so an interrupted run can be resumed."""
+    __tablename__ = 'sync_runs'
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String(16), nullable=False, default="running")  # running / succeeded / partial / failed
+    symbols = Column(JSON, nullable=False)
+    stages = Column(JSON, nullable=False)
+    periods = Column(JSON)  # None: settings.fmp_sync_periods at run time
+    force_refresh = Column(Boolean, default=False)
+    trigger = Column(String(16), nullable=False, default="manual", server_default="manual")  # manual / scheduled
+    finished_at = Column(DateTime(timezone=True))
+    report = Column(JSON)
+    # when the run started; set client-side too, so it is on the object right after the insert
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), default=lambda: datetime.now(timezone.utc))
+
+class SyncCheckpoint(Base, TimestampMixin):
+    """Outcome of one (symbol, dataset) within a run; succeeded ones are skipped on resume."""
+    __tablename__ = 'sync_checkpoints'
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey('sync_runs.id', ondelete='CASCADE'), nullable=False)
+    symbol = Column(String(10), nullable=False)
+    dataset = Column(String(32), nullable=False)
+    status = Column(String(16), nullable=False)  # succeeded / failed
+    attempts = Column(Integer, nullable=False, default=1)
+    error = Column(Text)
+
+    __table_args__ = (
+        UniqueConstraint('run_id', 'symbol', 'dataset', name='_run_symbol_dataset_uc'),
+    )
+
+class SyncDeadLetter(Base, TimestampMixin):
+    """A (symbol, dataset) that kept failing; later runs retry it once next_retry_at has passed."""
+    __tablename__ = 'sync_dead_letters'
+
+    id = Column(Integer, primary_key=True, index=True)
+    symbol = Column(String(10), nullable=False)
+    dataset = Column(String(32), nullable=False)
+    error = Column(Text)
+    failures = Column(Integer, nullable=False, default=1)  # runs that gave up on it
+    last_run_id = Column(Integer, ForeignKey('sync_runs.id', ondelete='SET NULL'))
+    last_failed_at = Column(DateTime(timezone=True))
+    next_retry_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        UniqueConstraint('symbol', 'dataset', name='_dead_letter_symbol_dataset_uc'),
+        Index('ix_sync_dead_letters_next_retry', 'dataset', 'next_retry_at'),
+    )
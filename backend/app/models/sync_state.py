@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, Date, UniqueConstraint
+from ..core.database import Base
+from .company import TimestampMixin
+
+class SyncState(Base, TimestampMixin):
+    """Watermark of the last sync per (symbol, dataset, period type)."""
+    __tablename__ = 'sync_state'
+
+    id = Column(Integer, primary_key=True, index=True)
+    symbol = Column(String(10), nullable=False)
+    dataset = Column(String(32), nullable=False)
+    period = Column(String(10), nullable=False)  # annual / quarter; "all" for news
+    last_date = Column(Date)  # newest record date stored so far
+    last_fetched_at = Column(DateTime(timezone=True))
+    payload_hash = Column(String(64))  # sha256 of the last payload written
+
+    __table_args__ = (
+        UniqueConstraint('symbol', 'dataset', 'period', name='_symbol_dataset_period_uc'),
+    )
@@ -1,5 +1,7 @@
-from typing import Optional, List 
-from pydantic import BaseModel, Field, ConfigDict
+import datetime as dt
+from functools import lru_cache
+from typing import Optional, List, Type
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
 
 class BaseFMPModel(BaseModel):
     model_config = ConfigDict(
@@ -27,7 +29,7 @@ class CompanyProfile(BaseFMPModel):
 
 class IncomeStatement(BaseFMPModel):
     symbol: str
-    date: str
+    date: dt.date
     fiscal_year: str = Field(alias="fiscalYear")
     period: str
     reported_currency: str | None = Field(None, alias="reportedCurrency")
@@ -51,7 +53,7 @@ class IncomeStatement(BaseFMPModel):
 
 class FinancialRatios(BaseFMPModel):
     symbol: str
-    date: str
+    date: dt.date
     period: str
     fiscal_year: str = Field(alias="fiscalYear")
     net_profit_margin: Optional[float] = Field(None, alias="netProfitMargin")
@@ -69,7 +71,7 @@ class FinancialRatios(BaseFMPModel):
 
 class KeyMetrics(BaseFMPModel):
     symbol: str
-    date: str
+    date: dt.date
     period: str
     fiscal_year: str = Field(alias="fiscalYear")
     market_cap: Optional[float] = Field(None, alias="marketCap")
@@ -83,10 +85,18 @@ class KeyMetrics(BaseFMPModel):
 
 class FMPArticle(BaseFMPModel):
     title: str
-    date: str
+    date: dt.datetime  # FMP sends 'YYYY-MM-DD HH:MM:SS'
     content: str
     tickers: str
     image: str
     link: str
     author: str
-    site: str
\ No newline at end of file
+    site: str
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseFMPModel]) -> TypeAdapter:
+    """
+    TypeAdapter(List[model]), built once per model. validate_json parses and validates a
+    raw response body in one pass; dump_python turns the result into row dicts.
+    """
+    return TypeAdapter(List[model])
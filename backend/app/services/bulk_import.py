@@ -0,0 +1,208 @@
+# bulk historical backfill: stream CSV, JSON-lines or Parquet files of FMP records into the database
+
+import csv
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+import orjson
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from app.core.cache import invalidate
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud.bulk import copy_merge
+from app.crud.crud_company import bulk_create_companies, get_company_ids
+from app.crud.crud_financials import _conflict_columns, bulk_upsert
+from app.crud.crud_news import _article_row, bulk_create_articles
+from app.models.financials import IncomeStatement, KeyMetric, FinancialRatio
+from app.models.news import NewsArticle
+from app.schemas import fmp_schemas
+
+logger = logging.getLogger(__name__)
+
+# dataset -> (table model, schema of one FMP record)
+IMPORT_DATASETS = {
+    "income_statements": (IncomeStatement, fmp_schemas.IncomeStatement),
+    "key_metrics": (KeyMetric, fmp_schemas.KeyMetrics),
+    "financial_ratios": (FinancialRatio, fmp_schemas.FinancialRatios),
+    "news": (NewsArticle, fmp_schemas.FMPArticle),
+}
+
+FILE_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+
+def _read_csv(path: Path, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        chunk = []
+        for record in csv.DictReader(f):
+            chunk.append(record)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def _read_jsonl(path: Path, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    with open(path, "rb") as f:
+        chunk = []
+        for line in f:
+            if line.strip():
+                chunk.append(orjson.loads(line))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def _read_parquet(path: Path, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet import needs pyarrow: pip install pyarrow")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pylist()
+
+READERS = {"csv": _read_csv, "jsonl": _read_jsonl, "parquet": _read_parquet}
+
+def read_chunks(path: Path, chunk_size: int, file_format: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+    """Records of a file in lists of at most chunk_size; the format defaults to the file's extension."""
+    path = Path(path)
+    file_format = file_format or FILE_FORMATS.get(path.suffix.lower())
+    if file_format not in READERS:
+        raise ValueError(f"Cannot tell the format of {path}; pass one of {', '.join(READERS)}")
+    return READERS[file_format](path, chunk_size)
+
+def _csv_blanks(schema: Type[fmp_schemas.BaseFMPModel]) -> set:
+    """Names and aliases of optional fields, whose empty CSV cells mean missing rather than ''."""
+    names = set()
+    for name, field in schema.model_fields.items():
+        if not field.is_required():
+            names.update({name, field.alias} - {None})
+    return names
+
+def _validate(chunk: List[Dict[str, Any]], schema: Type[fmp_schemas.BaseFMPModel]) -> Tuple[List[Any], int]:
+    """Validate a chunk in one call, falling back to record by record to drop the invalid ones."""
+    try:
+        return fmp_schemas.list_adapter(schema).validate_python(chunk), 0
+    except ValidationError:
+        pass
+    valid, first_error = [], None
+    for record in chunk:
+        try:
+            valid.append(schema.model_validate(record))
+        except ValidationError as e:
+            first_error = first_error or e.errors()[0]
+    rejected = len(chunk) - len(valid)
+    logger.warning(f"Rejected {rejected} of {len(chunk)} {schema.__name__} records, e.g. {first_error}")
+    return valid, rejected
+
+class _CompanyIds:
+    """symbol -> company id for an import, creating minimal companies for unknown symbols."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+
+    def resolve(self, db: Session, symbols: set) -> Dict[str, int]:
+        missing = [s for s in symbols if s not in self._ids]
+        if missing:
+            found = get_company_ids(db, missing)
+            new = [s for s in missing if s not in found]
+            if new:
+                bulk_create_companies(db, [{"symbol": s, "company_name": f"Company {s}"} for s in new])
+                found.update(get_company_ids(db, new))
+            self._ids.update(found)
+        return self._ids
+
+def _financial_rows(db: Session, model, items: List[Any], companies: _CompanyIds) -> List[Dict[str, Any]]:
+    ids = companies.resolve(db, {item.symbol for item in items})
+    columns = set(model.__table__.columns.keys())
+    # the last record per key wins, as in bulk_upsert
+    key_columns = _conflict_columns(model)
+    unique = {}
+    for row in fmp_schemas.list_adapter(type(items[0])).dump_python(items):
+        row = {c: v for c, v in row.items() if c in columns}
+        row["company_id"] = ids[row["symbol"]]
+        unique[tuple(row[k] for k in key_columns)] = row
+    # key order keeps each write batch to a few symbols, so bulk_upsert's existing-key lookups stay small
+    return [unique[key] for key in sorted(unique)]
+
+def _news_rows(items: List[fmp_schemas.FMPArticle]) -> Dict[str, List[fmp_schemas.FMPArticle]]:
+    """Articles per symbol; an article naming several tickers is stored once for each."""
+    by_symbol: Dict[str, Dict[str, fmp_schemas.FMPArticle]] = {}
+    for article in items:
+        for ticker in article.tickers.split(","):
+            symbol = ticker.rsplit(":", 1)[-1].strip().upper()
+            if symbol:
+                by_symbol.setdefault(symbol, {})[article.link] = article
+    return {symbol: list(articles.values()) for symbol, articles in by_symbol.items()}
+
+def _write_chunk(db: Session, dataset: str, items: List[Any], companies: _CompanyIds) -> Tuple[Dict[str, int], set]:
+    """Merge one validated chunk; returns the inserted/updated counts and the symbols touched."""
+    model, _ = IMPORT_DATASETS[dataset]
+    postgres = db.get_bind().dialect.name == "postgresql"
+
+    if dataset == "news":
+        by_symbol = _news_rows(items)
+        if postgres:
+            rows = [_article_row(a, symbol) for symbol, articles in by_symbol.items() for a in articles]
+            report = copy_merge(db, model, rows, ["symbol", "url"], update=False)
+            db.commit()
+        else:
+            inserted = sum(bulk_create_articles(db, articles, symbol) for symbol, articles in by_symbol.items())
+            report = {"inserted": inserted, "updated": 0}
+        return report, set(by_symbol)
+
+    rows = _financial_rows(db, model, items, companies)
+    if postgres:
+        report = copy_merge(db, model, rows, _conflict_columns(model))
+        db.commit()
+    else:
+        report = bulk_upsert(db, model, rows)
+    return report, {row["symbol"] for row in rows}
+
+def import_file(
+    db: Session,
+    path: Path,
+    dataset: str,
+    chunk_size: Optional[int] = None,
+    file_format: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Stream one file of FMP records into a dataset's table. Records use the FMP field
+    names of app.schemas.fmp_schemas and are read, validated and merged one chunk at a
+    time, so memory stays flat whatever the file size. PostgreSQL stages each chunk with
+    COPY and merges it in one statement; other databases go through bulk_upsert's
+    executemany. Existing rows are updated on the dataset's unique key (news articles,
+    keyed on symbol and url, are never overwritten). Each chunk commits on its own, so
+    an interrupted import can simply be rerun.
+    """
+    if dataset not in IMPORT_DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset}; expected one of {', '.join(IMPORT_DATASETS)}")
+    _, schema = IMPORT_DATASETS[dataset]
+    chunk_size = chunk_size or settings.import_chunk_size
+    blanks = _csv_blanks(schema)
+    companies = _CompanyIds()
+    report = {"file": str(path), "dataset": dataset, "chunks": 0, "read": 0, "rejected": 0, "inserted": 0, "updated": 0}
+    start = time.perf_counter()
+
+    for chunk in read_chunks(path, chunk_size, file_format):
+        # CSV has no nulls; an empty optional cell is a missing value
+        chunk = [{k: v for k, v in record.items() if not (v == "" and k in blanks)} for record in chunk]
+        items, rejected = _validate(chunk, schema)
+        written, symbols = _write_chunk(db, dataset, items, companies) if items else ({"inserted": 0, "updated": 0}, set())
+        for symbol in symbols:
+            invalidate(symbol, dataset)
+
+        report["chunks"] += 1
+        report["read"] += len(chunk)
+        report["rejected"] += rejected
+        report["inserted"] += written["inserted"]
+        report["updated"] += written["updated"]
+        for result in ("inserted", "updated"):
+            metrics.incr("import_rows_total", written[result], dataset=dataset, result=result)
+        metrics.incr("import_rows_total", rejected, dataset=dataset, result="rejected")
+        logger.info(f"{path}: chunk {report['chunks']} merged ({report['read']} records read so far)")
+
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    report["rows_per_second"] = round(report["read"] / report["seconds"]) if report["seconds"] else None
+    return report
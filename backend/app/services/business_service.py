@@ -1,14 +1,25 @@
+import asyncio
+import base64
+import hashlib
+import json
 import logging
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Date, Integer, Numeric, case, cast, desc, func, or_, and_, select, type_coerce
 from app.core.config import settings
-from typing import List, Dict, Any
+from app.core.cache import cached, invalidate_async, read_through
+from app.core.database import forked_session, run_db
+from app.core.metrics import metrics
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Union
 from fastapi import HTTPException
-from datetime import datetime
-from app.services.fmp_client import FMPClient
-from app.crud.crud_company import get_company_by_symbol, create_company_from_profile, create_minimal_company
+from datetime import date, datetime, timedelta, timezone
+from app.services.fmp_client import FMPClient, fmp_session
+from app.schemas import fmp_schemas
+from app.services.company_resolver import CompanyResolver
+from app.crud.crud_company import create_company_from_profile
 from app.crud.crud_financials import upsert_income_statements, upsert_financial_ratios, upsert_key_metrics
-from app.crud.crud_news import create_article, get_articles_by_symbol
+from app.crud.crud_news import bulk_create_articles
+from app.crud.crud_sync_state import Watermark, get_sync_state, get_sync_states, record_sync_state
 from app.models.company import Company
 from app.models.financials import IncomeStatement, KeyMetric, FinancialRatio
 from app.models.news import NewsArticle
@@ -18,277 +29,652 @@ logger = logging.getLogger(__name__)
 # 1: get data INTO database (sync functions): Sync pulls data from the external API and pushes it into the DB.
 # 2: get data OUT OF database (get functions): User makes request, and Get function retrieve data from the DB.
 
-async def get_or_create_company(db: Session, symbol: str, fmp_client: FMPClient) -> Company:
-    """Get existing company or create new one."""
-    company = get_company_by_symbol(db, symbol)
-    if company:
-        return company
-    
-    logger.info(f"Creating new company record for {symbol}")
-    try:
-        profile_data = await fmp_client.get_company_profile(symbol)
-        company = create_company_from_profile(db, profile_data.model_dump())
-        logger.info(f"Successfully created company {symbol}")
-    except Exception as e:
-        logger.error(f"Failed to create company {symbol} from profile: {str(e)}")
-        company = create_minimal_company(db, symbol)
-    
-    return company
-
-async def sync_company_profiles(db: Session, symbols: List[str]):
+async def _sync_symbols(
+    db: Union[Session, AsyncSession],
+    dataset: str,
+    symbols: List[str],
+    sync_symbol: Callable[[Union[Session, AsyncSession], str], Awaitable[int]],
+    concurrency: Union[int, asyncio.Semaphore, None] = None,
+) -> Dict[str, Any]:
     """
-    Syncs company profile data for a given list of symbols.
-    It fetches the latest profile and update existing records in the database.
+    Fan sync_symbol out across symbols with bounded concurrency. Each symbol runs on a
+    session of its own, so a failing symbol is rolled back and recorded without
+    touching the transaction or loaded state of the others.
     """
-    logger.info(f"Starting company profile sync for {len(symbols)} symbols")
-    async with FMPClient(api_key=settings.fmp_api_key) as fmp_client:
-        for symbol in symbols:
+    if isinstance(concurrency, asyncio.Semaphore):
+        semaphore = concurrency
+    else:
+        semaphore = asyncio.Semaphore(concurrency or settings.sync_concurrency)
+
+    result = {"dataset": dataset, "symbols": len(symbols), "succeeded": 0, "rows": 0, "failed": {}}
+
+    async def run(symbol: str):
+        async with semaphore:
             try:
-                logger.info(f"Syncing profile for {symbol}")
-                profile_data = await fmp_client.get_company_profile(symbol)
-                create_company_from_profile(db, profile_data.model_dump())
-                logger.info(f"Successfully synced profile for {symbol}")
+                async with forked_session(db) as session:
+                    rows = await sync_symbol(session, symbol)
             except Exception as e:
-                logger.error(f"Failed to sync profile for {symbol}: {str(e)}")
-                continue
+                logger.error(f"Failed to sync {dataset} for {symbol}: {str(e)}")
+                result["failed"][symbol] = str(e)
+            else:
+                result["rows"] += rows
+                result["succeeded"] += 1
+
+    await asyncio.gather(*(run(symbol) for symbol in symbols))
+    return result
+
+async def sync_company_profiles(
+    db: Union[Session, AsyncSession],
+    symbols: List[str],
+    fmp_client: Optional[FMPClient] = None,
+    concurrency: Union[int, asyncio.Semaphore, None] = None,
+    resolver: Optional[CompanyResolver] = None,
+) -> Dict[str, Any]:
+    """
+    Syncs company profile data for a given list of symbols.
+    Profiles are fetched in multi-symbol batches, then each record is created or updated.
+    """
+    logger.info(f"Starting company profile sync for {len(symbols)} symbols")
+    async with fmp_session(fmp_client) as client:
+        profiles = await client.get_company_profiles(symbols)
+
+        async def sync_symbol(db: Union[Session, AsyncSession], symbol: str) -> int:
+            logger.info(f"Syncing profile for {symbol}")
+            profile_data = profiles.get(symbol)
+            if profile_data is None:
+                raise HTTPException(status_code=404, detail=f"No profile data found for symbol: {symbol}")
+            company = await run_db(db, create_company_from_profile, profile_data.model_dump())
+            if resolver is not None and company is not None:
+                resolver.remember(symbol, company.id)
+            await invalidate_async(symbol, "company")
+            # profiles carry no period; the watermark records when the symbol was last refreshed
+            await run_db(db, record_sync_state, symbol, "profiles", "all", None, _payload_hash([profile_data]))
+            logger.info(f"Successfully synced profile for {symbol}")
+            return 1
+
+        result = await _sync_symbols(db, "profiles", symbols, sync_symbol, concurrency)
     logger.info("Company profile sync completed.")
+    return result
+
+# days per period type, used to work out how many periods can have closed since a watermark
+PERIOD_DAYS = {"annual": 365, "quarter": 91}
+
+def _max_periods(period: str) -> int:
+    return settings.fmp_max_quarters if period == "quarter" else settings.fmp_max_periods
+
+def _payload_hash(items: List[Any]) -> str:
+    """sha256 of a validated, non-empty FMP payload; fields serialize in schema order."""
+    return hashlib.sha256(fmp_schemas.list_adapter(type(items[0])).dump_json(items)).hexdigest()
+
+def _periods_due(state: Optional[Watermark], period: str, today: Optional[date] = None) -> int:
+    """
+    How many of the latest periods to request given the stored watermark: the periods
+    closed since last_date plus the latest one again, to pick up restatements. Returns 0
+    when no period can have closed yet and the last fetch is recent enough to skip.
+    """
+    if state is None or state.last_date is None:
+        return _max_periods(period)
+    today = today or date.today()
+    elapsed = max(0, (today - state.last_date).days // PERIOD_DAYS[period])
+    if elapsed == 0 and state.last_fetched_at is not None:
+        fetched_at = state.last_fetched_at
+        if fetched_at.tzinfo is None:  # SQLite returns naive datetimes
+            fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) - fetched_at < timedelta(days=settings.sync_state_max_age_days):
+            return 0
+    return min(_max_periods(period), elapsed + 1)
+
+async def _sync_financial_symbol(
+    db: Union[Session, AsyncSession],
+    client: FMPClient,
+    symbol: str,
+    dataset: str,
+    label: str,
+    fetch: Callable[..., Awaitable[List[Any]]],
+    upsert: Callable[..., Dict[str, int]],
+    resolver: CompanyResolver,
+    force_refresh: bool = False,
+    period: str = "annual",
+) -> int:
+    """
+    Incremental sync of one financial dataset for a symbol. The sync_state watermark
+    narrows the request to the periods that can be new, and a payload identical to
+    the last one written skips the database writes entirely.
+    """
+    state = None if force_refresh else await run_db(db, get_sync_state, symbol, dataset, period)
+    limit = _periods_due(state, period)
+    if not limit:
+        metrics.incr("sync_skipped_total", dataset=dataset, reason="not_due")
+        logger.info(f"No new {label} due for {symbol}, skipping fetch")
+        return 0
+
+    items = await fetch(symbol, period=period, limit=limit)
+    if not items:
+        logger.warning(f"No {label} data found for {symbol}")
+        return 0
+
+    digest = _payload_hash(items)
+    last_date = max(item.date for item in items)
+    if state is not None:
+        last_date = max(last_date, state.last_date) if state.last_date else last_date
+        if state.payload_hash == digest:
+            await run_db(db, record_sync_state, symbol, dataset, period, last_date, digest)
+            metrics.incr("sync_skipped_total", dataset=dataset, reason="unchanged")
+            logger.info(f"{label.capitalize()} for {symbol} unchanged since last sync")
+            return 0
+
+    company_id = await resolver.company_id(db, symbol)
+
+    # One dump for the whole payload; dates are already date objects
+    rows = fmp_schemas.list_adapter(type(items[0])).dump_python(items)
+    for row in rows:
+        row['company_id'] = company_id
+        row['symbol'] = symbol
+
+    report = await run_db(db, upsert, rows, company_id, symbol)
+    if report["inserted"] or report["updated"]:
+        await invalidate_async(symbol, dataset)
+    # Recorded only after the write, so a failed upsert is retried in full next time
+    await run_db(db, record_sync_state, symbol, dataset, period, last_date, digest)
+    logger.info(f"Successfully synced {len(rows)} {label} for {symbol} "
+                f"({report['inserted']} new, {report['updated']} updated)")
+    return len(rows)
 
-async def sync_income_statements(db: Session, symbols: List[str], force_refresh: bool = False):
-    """Sync income statements for given symbols."""
+async def sync_income_statements(
+    db: Union[Session, AsyncSession],
+    symbols: List[str],
+    force_refresh: bool = False,
+    fmp_client: Optional[FMPClient] = None,
+    concurrency: Union[int, asyncio.Semaphore, None] = None,
+    resolver: Optional[CompanyResolver] = None,
+    periods: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Sync income statements for given symbols, once per period type (annual and
+    quarterly by default); force_refresh ignores the sync watermark.
+    """
     logger.info(f"Starting income statement sync for {len(symbols)} symbols")
-    
-    async with FMPClient(api_key=settings.fmp_api_key) as fmp_client:
-        for symbol in symbols:
-            try:
-                logger.info(f"Syncing income statements for {symbol}")
-                
-                # Get or create company
-                company = await get_or_create_company(db, symbol, fmp_client)
-                
-                # Get income statement data
-                income_statements = await fmp_client.get_income_statement(
-                    symbol=symbol, 
-                    period="annual", 
-                    limit=settings.fmp_max_periods
-                )
-                
-                if not income_statements:
-                    logger.warning(f"No income statement data found for {symbol}")
-                    continue
-                
-                # Prepare data for database
-                statements_to_insert = []
-                for statement in income_statements:
-                    statement_dict = statement.model_dump()
-                    statement_dict['company_id'] = company.id
-                    statement_dict['symbol'] = symbol
-                    
-                    # Convert date string to date object if needed
-                    if isinstance(statement_dict.get('date'), str):
-                        statement_dict['date'] = datetime.strptime(statement_dict['date'], '%Y-%m-%d').date()
-                    
-                    statements_to_insert.append(statement_dict)
-                
-                # Insert/update in database with correct parameters
-                upsert_income_statements(db, statements_to_insert, company.id, symbol)
-                logger.info(f"Successfully synced {len(statements_to_insert)} income statements for {symbol}")
-                
-            except Exception as e:
-                logger.error(f"Failed to sync income statements for {symbol}: {str(e)}")
-                continue
-    
+    periods = periods or settings.fmp_sync_periods
+
+    async with fmp_session(fmp_client) as client:
+        resolver = resolver or CompanyResolver(symbols, client)
+        async def sync_symbol(db: Union[Session, AsyncSession], symbol: str) -> int:
+            logger.info(f"Syncing income statements for {symbol}")
+            return sum([await _sync_financial_symbol(
+                db, client, symbol, "income_statements", "income statements",
+                client.get_income_statement, upsert_income_statements, resolver, force_refresh, period,
+            ) for period in periods])
+
+        result = await _sync_symbols(db, "income_statements", symbols, sync_symbol, concurrency)
+
     logger.info("Income statement sync completed")
+    return result
 
-async def sync_key_metrics(db: Session, symbols: List[str]):
-    """Syncs key metrics for given symbols."""
+async def sync_key_metrics(
+    db: Union[Session, AsyncSession],
+    symbols: List[str],
+    force_refresh: bool = False,
+    fmp_client: Optional[FMPClient] = None,
+    concurrency: Union[int, asyncio.Semaphore, None] = None,
+    resolver: Optional[CompanyResolver] = None,
+    periods: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Syncs key metrics for given symbols, once per period type."""
     logger.info(f"Starting key metrics sync for {len(symbols)} symbols")
-    async with FMPClient(api_key=settings.fmp_api_key) as fmp_client:
-        for symbol in symbols:
-            try:
-                company = await get_or_create_company(db, symbol, fmp_client)
-                metrics_data = await fmp_client.get_key_metrics(symbol, limit=settings.fmp_max_periods)
-                
-                if metrics_data:
-                    # Prepare data for database
-                    metrics_to_insert = []
-                    for metric in metrics_data:
-                        metric_dict = metric.model_dump()
-                        metric_dict['company_id'] = company.id
-                        metric_dict['symbol'] = symbol
-                        
-                        # Convert date string to date object if needed
-                        if isinstance(metric_dict.get('date'), str):
-                            metric_dict['date'] = datetime.strptime(metric_dict['date'], '%Y-%m-%d').date()
-                        
-                        metrics_to_insert.append(metric_dict)
-                    
-                    upsert_key_metrics(db, metrics_to_insert, company.id, symbol)
-                    logger.info(f"Successfully synced {len(metrics_to_insert)} key metrics for {symbol}")
-            except Exception as e:
-                logger.error(f"Failed to sync key metrics for {symbol}: {e}")
+    periods = periods or settings.fmp_sync_periods
+    async with fmp_session(fmp_client) as client:
+        resolver = resolver or CompanyResolver(symbols, client)
+        async def sync_symbol(db: Union[Session, AsyncSession], symbol: str) -> int:
+            return sum([await _sync_financial_symbol(
+                db, client, symbol, "key_metrics", "key metrics",
+                client.get_key_metrics, upsert_key_metrics, resolver, force_refresh, period,
+            ) for period in periods])
+
+        result = await _sync_symbols(db, "key_metrics", symbols, sync_symbol, concurrency)
     logger.info("Key metrics sync completed.")
+    return result
 
-async def sync_financial_ratios(db: Session, symbols: List[str]):
-    """Syncs financial ratios for given symbols."""
+async def sync_financial_ratios(
+    db: Union[Session, AsyncSession],
+    symbols: List[str],
+    force_refresh: bool = False,
+    fmp_client: Optional[FMPClient] = None,
+    concurrency: Union[int, asyncio.Semaphore, None] = None,
+    resolver: Optional[CompanyResolver] = None,
+    periods: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Syncs financial ratios for given symbols, once per period type."""
     logger.info(f"Starting financial ratios sync for {len(symbols)} symbols")
-    async with FMPClient(api_key=settings.fmp_api_key) as fmp_client:
-        for symbol in symbols:
-            try:
-                company = await get_or_create_company(db, symbol, fmp_client)
-                ratios_data = await fmp_client.get_financial_ratios(symbol, limit=settings.fmp_max_periods)
-                
-                if ratios_data:
-                    # Prepare data for database
-                    ratios_to_insert = []
-                    for ratio in ratios_data:
-                        ratio_dict = ratio.model_dump()
-                        ratio_dict['company_id'] = company.id
-                        ratio_dict['symbol'] = symbol
-                        
-                        # Convert date string to date object if needed
-                        if isinstance(ratio_dict.get('date'), str):
-                            ratio_dict['date'] = datetime.strptime(ratio_dict['date'], '%Y-%m-%d').date()
-                        
-                        ratios_to_insert.append(ratio_dict)
-                    
-                    upsert_financial_ratios(db, ratios_to_insert, company.id, symbol)
-                    logger.info(f"Successfully synced {len(ratios_to_insert)} financial ratios for {symbol}")
-            except Exception as e:
-                logger.error(f"Failed to sync financial ratios for {symbol}: {e}")
+    periods = periods or settings.fmp_sync_periods
+    async with fmp_session(fmp_client) as client:
+        resolver = resolver or CompanyResolver(symbols, client)
+        async def sync_symbol(db: Union[Session, AsyncSession], symbol: str) -> int:
+            return sum([await _sync_financial_symbol(
+                db, client, symbol, "financial_ratios", "financial ratios",
+                client.get_financial_ratios, upsert_financial_ratios, resolver, force_refresh, period,
+            ) for period in periods])
+
+        result = await _sync_symbols(db, "financial_ratios", symbols, sync_symbol, concurrency)
     logger.info("Financial ratios sync completed.")
+    return result
 
-async def sync_stock_news(db: Session, symbols: List[str]):
-    """Syncs news articles for given symbols."""
+async def sync_stock_news(
+    db: Union[Session, AsyncSession],
+    symbols: List[str],
+    force_refresh: bool = False,
+    fmp_client: Optional[FMPClient] = None,
+    concurrency: Union[int, asyncio.Semaphore, None] = None,
+    resolver: Optional[CompanyResolver] = None,
+) -> Dict[str, Any]:
+    """
+    Syncs news articles for given symbols. Tickers are fetched in multi-symbol batches,
+    grouped by watermark so each batch asks only for articles published since the newest
+    stored one; an unchanged per-symbol payload skips the insert.
+    """
     logger.info(f"Starting stock news sync for {len(symbols)} symbols")
-    async with FMPClient(api_key=settings.fmp_api_key) as fmp_client:
+    async with fmp_session(fmp_client) as client:
+        stored = await run_db(db, get_sync_states, symbols, "news", "all")
+        states = {} if force_refresh else stored
+        by_from_date: Dict[Optional[date], List[str]] = {}
         for symbol in symbols:
-            try:
-                articles_data = await fmp_client.get_stock_news(symbol, limit=settings.fmp_max_articles)
-                if articles_data:
-                    for article_data in articles_data:
-                        # Check if article already exists to avoid duplicates
-                        existing = db.query(NewsArticle).filter_by(url=article_data.link).first()
-                        if not existing:
-                            create_article(db, article_data, symbol)
-                    logger.info(f"Successfully synced news for {symbol}")
-            except Exception as e:
-                logger.error(f"Failed to sync news for {symbol}: {e}")
+            state = states.get(symbol)
+            by_from_date.setdefault(state.last_date if state else None, []).append(symbol)
+        news: Dict[str, Union[List[Any], Exception]] = {}
+        for batch in await asyncio.gather(*(
+            client.get_stock_news_batch(group, limit=settings.fmp_max_articles, from_date=from_date)
+            for from_date, group in by_from_date.items()
+        )):
+            news.update(batch)
+
+        async def sync_symbol(db: Union[Session, AsyncSession], symbol: str) -> int:
+            state = states.get(symbol)
+            articles_data = news.get(symbol)
+            if isinstance(articles_data, Exception):
+                raise articles_data
+            if not articles_data:
+                # nothing new; stamp the fetch so freshness checks do not re-sync the symbol
+                kept = stored.get(symbol)
+                await run_db(db, record_sync_state, symbol, "news", "all",
+                             kept.last_date if kept else None, kept.payload_hash if kept else None)
+                return 0
+
+            digest = _payload_hash(articles_data)
+            last_date = max(a.date for a in articles_data).date()
+            if state is not None and state.last_date:
+                last_date = max(last_date, state.last_date)
+            if state is not None and state.payload_hash == digest:
+                await run_db(db, record_sync_state, symbol, "news", "all", last_date, digest)
+                metrics.incr("sync_skipped_total", dataset="news", reason="unchanged")
+                return 0
+
+            created = await run_db(db, bulk_create_articles, articles_data, symbol)
+            if created:
+                await invalidate_async(symbol, "news")
+            await run_db(db, record_sync_state, symbol, "news", "all", last_date, digest)
+            logger.info(f"Successfully synced news for {symbol} ({created} new articles)")
+            return created
+
+        result = await _sync_symbols(db, "news", symbols, sync_symbol, concurrency)
     logger.info("Stock news sync completed.")
+    return result
+
+# datasets fetched per period type (annual, quarter)
+PERIOD_DATASETS = ("income_statements", "key_metrics", "financial_ratios")
+
+SYNC_FUNCTIONS = {
+    "profiles": sync_company_profiles,
+    "income_statements": sync_income_statements,
+    "key_metrics": sync_key_metrics,
+    "financial_ratios": sync_financial_ratios,
+    "news": sync_stock_news,
+}
+
+async def sync_all(
+    db: Union[Session, AsyncSession],
+    symbols: List[str],
+    datasets: Optional[List[str]] = None,
+    concurrency: Optional[int] = None,
+    force_refresh: bool = False,
+    periods: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Sync several datasets over one shared FMPClient session.
+    Profiles run first so the other datasets find their companies; the remaining
+    datasets then run concurrently, sharing one bound on in-flight symbols and one
+    CompanyResolver, so company ids are looked up once per run rather than per dataset.
+    periods narrows the period types of the financial datasets (default: settings.fmp_sync_periods).
+    """
+    datasets = datasets or list(SYNC_FUNCTIONS)
+    unknown = [d for d in datasets if d not in SYNC_FUNCTIONS]
+    if unknown:
+        raise ValueError(f"Unknown datasets: {', '.join(unknown)}")
+
+    semaphore = asyncio.Semaphore(concurrency or settings.sync_concurrency)
+    results: Dict[str, Dict[str, Any]] = {}
+    async with fmp_session() as fmp_client:
+        resolver = CompanyResolver(symbols, fmp_client)
+        if "profiles" in datasets:
+            results["profiles"] = await sync_company_profiles(
+                db, symbols, fmp_client=fmp_client, concurrency=semaphore, resolver=resolver
+            )
+        remaining = [d for d in datasets if d != "profiles"]
+        outcomes = await asyncio.gather(*(
+            SYNC_FUNCTIONS[d](
+                db, symbols, force_refresh=force_refresh, fmp_client=fmp_client,
+                concurrency=semaphore, resolver=resolver, **({"periods": periods} if d in PERIOD_DATASETS else {}),
+            )
+            for d in remaining
+        ))
+        results.update(zip(remaining, outcomes))
+    return results
 
 # SERVICE FUNCTIONS FOR ROUTES
+def _projection(model, names: Optional[List[str]] = None) -> List[Any]:
+    """
+    Column expressions for reading plain rows instead of ORM entities. Numeric
+    columns are coerced to Numeric(asdecimal=False), so the driver's result processor
+    hands back floats and no per-field Decimal conversion is needed afterwards.
+    """
+    columns = model.__table__.columns
+    selected = [columns[name] for name in names] if names else list(columns)
+    return [
+        type_coerce(column, Numeric(asdecimal=False)).label(column.key)
+        if isinstance(column.type, Numeric) else column
+        for column in selected
+    ]
+
+INCOME_STATEMENT_FIELDS = [
+    "id", "symbol", "date", "fiscal_year", "period", "reported_currency",
+    "revenue", "cost_of_revenue", "gross_profit", "operating_expenses", "operating_income",
+    "net_income", "eps", "eps_diluted", "ebitda", "ebit",
+]
+
+COMPANY_FIELDS = [
+    "id", "symbol", "company_name", "sector", "industry", "country", "full_time_employees",
+    "ceo", "price", "market_cap", "beta", "volume", "average_volume", "range_52_week",
+    "last_dividend", "is_actively_trading", "created_at", "updated_at",
+]
+
+@cached("company")
 def get_company_profile(db: Session, symbol: str) -> Dict[str, Any]:
     """Get company profile from database."""
-    company = get_company_by_symbol(db, symbol)
+    company = db.query(*_projection(Company, COMPANY_FIELDS)).filter(Company.symbol == symbol).first()
     if not company:
         raise HTTPException(status_code=404, detail=f"Company with symbol {symbol} not found")
-    
-    return {
-        "id": company.id,
-        "symbol": company.symbol,
-        "company_name": company.company_name,
-        "sector": company.sector,
-        "industry": company.industry,
-        "country": company.country,
-        "full_time_employees": company.full_time_employees,
-        "ceo": company.ceo,
-        "price": float(company.price) if company.price else None,
-        "market_cap": float(company.market_cap) if company.market_cap else None,
-        "beta": float(company.beta) if company.beta else None,
-        "volume": float(company.volume) if company.volume else None,
-        "average_volume": float(company.average_volume) if company.average_volume else None,
-        "range_52_week": company.range_52_week,
-        "last_dividend": float(company.last_dividend) if company.last_dividend else None,
-        "is_actively_trading": company.is_actively_trading,
-        "created_at": company.created_at.isoformat() if company.created_at else None,
-        "updated_at": company.updated_at.isoformat() if company.updated_at else None,
-    }
+    return company._asdict()
 
-def get_income_statements(db: Session, symbol: str, skip: int = 0, limit: int = 20) -> Dict[str, Any]:
-    """Get paginated income statements for a symbol."""
-    # Get total count
-    total = db.query(IncomeStatement).filter(IncomeStatement.symbol == symbol).count()
-    
-    # Get paginated data
-    statements = (
-        db.query(IncomeStatement)
-        .filter(IncomeStatement.symbol == symbol)
-        .order_by(desc(IncomeStatement.date))
-        .offset(skip)
-        .limit(limit)
-        .all()
+# period filter of the listings -> stored period values; annual rows are FY, quarters Q1-Q4
+QUARTERS = ("Q1", "Q2", "Q3", "Q4")
+LISTING_PERIODS = {"annual": ("FY",), "quarter": QUARTERS, "all": None}
+
+def _period_filter(model, period: str) -> List[Any]:
+    """Criteria restricting a financial query to one period type; none for "all"."""
+    if period not in LISTING_PERIODS:
+        raise HTTPException(status_code=400, detail=f"Invalid period: {period}")
+    values = LISTING_PERIODS[period]
+    return [model.period.in_(values)] if values else []
+
+def _encode_cursor(row, period: str) -> str:
+    """Opaque keyset cursor for the (date, id) position of a row within a period filter."""
+    raw = json.dumps([row.date.isoformat(), row.id, period]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str, period: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date_str, row_id, cursor_period = json.loads(raw)
+        position = datetime.strptime(date_str, '%Y-%m-%d').date(), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if cursor_period != period:
+        raise HTTPException(status_code=400, detail=f"Pagination cursor belongs to period {cursor_period}, not {period}")
+    return position
+
+def _count_rows(db: Session, model, dataset: str, symbol: str, period: str) -> int:
+    """Row count per symbol and period filter, cached until the next sync writes that dataset."""
+    return read_through(
+        dataset, symbol, {"symbol": symbol, "period": period, "count": "total"},
+        lambda: db.query(func.count(model.id)).filter(model.symbol == symbol, *_period_filter(model, period)).scalar(),
     )
-    
-    if not statements:
-        raise HTTPException(status_code=404, detail=f"No income statements found for symbol {symbol}")
-    
-    items = []
-    for stmt in statements:
-        items.append({
-            "id": stmt.id,
-            "symbol": stmt.symbol,
-            "date": stmt.date.isoformat() if stmt.date else None,
-            "fiscal_year": stmt.fiscal_year,
-            "period": stmt.period,
-            "reported_currency": stmt.reported_currency,
-            "revenue": float(stmt.revenue) if stmt.revenue else None,
-            "cost_of_revenue": float(stmt.cost_of_revenue) if stmt.cost_of_revenue else None,
-            "gross_profit": float(stmt.gross_profit) if stmt.gross_profit else None,
-            "operating_expenses": float(stmt.operating_expenses) if stmt.operating_expenses else None,
-            "operating_income": float(stmt.operating_income) if stmt.operating_income else None,
-            "net_income": float(stmt.net_income) if stmt.net_income else None,
-            "eps": float(stmt.eps) if stmt.eps else None,
-            "eps_diluted": float(stmt.eps_diluted) if stmt.eps_diluted else None,
-            "ebitda": float(stmt.ebitda) if stmt.ebitda else None,
-            "ebit": float(stmt.ebit) if stmt.ebit else None,
-        })
-    
-    return {
-        "items": items,
-        "total": total,
-        "skip": skip,
+
+def _paginate_financials(
+    db: Session,
+    model,
+    dataset: str,
+    label: str,
+    symbol: str,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    paginate: str,
+    include_total: Optional[bool],
+    period: str = "annual",
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Page through a financial dataset newest first, ordered by (date, id).
+    Offset mode keeps the original skip/limit response; cursor mode seeks past the
+    (date, id) in the cursor, so deep pages cost the same as the first one, and only
+    counts rows when include_total is requested. Only the projected columns are read.
+    period keeps annual rows, quarterly rows or both; cursors are tied to it.
+    """
+    query = db.query(*_projection(model, fields)).filter(model.symbol == symbol, *_period_filter(model, period))
+    ordering = (desc(model.date), desc(model.id))
+
+    if cursor is None and paginate != "cursor":
+        rows = query.order_by(*ordering).offset(skip).limit(limit).all()
+        if not rows:
+            raise HTTPException(status_code=404, detail=f"No {label} found for symbol {symbol}")
+        total = _count_rows(db, model, dataset, symbol, period)
+        return {
+            "items": [row._asdict() for row in rows],
+            "total": total,
+            "skip": skip,
+            "limit": limit,
+            "has_more": skip + limit < total,
+        }
+
+    if cursor is not None:
+        after_date, after_id = _decode_cursor(cursor, period)
+        query = query.filter(or_(
+            model.date < after_date,
+            and_(model.date == after_date, model.id < after_id),
+        ))
+    rows = query.order_by(*ordering).limit(limit + 1).all()
+    if not rows and cursor is None:
+        raise HTTPException(status_code=404, detail=f"No {label} found for symbol {symbol}")
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    page = {
+        "items": [row._asdict() for row in rows],
         "limit": limit,
-        "has_more": skip + limit < total
+        "has_more": has_more,
+        "next_cursor": _encode_cursor(rows[-1], period) if has_more else None,
     }
+    if include_total:
+        page["total"] = _count_rows(db, model, dataset, symbol, period)
+    return page
 
-def get_key_metrics(db: Session, symbol: str, skip: int = 0, limit: int = 20) -> Dict[str, Any]:
+@cached("income_statements")
+def get_income_statements(
+    db: Session,
+    symbol: str,
+    skip: int = 0,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    paginate: str = "offset",
+    include_total: Optional[bool] = None,
+    period: str = "annual",
+) -> Dict[str, Any]:
+    """Get paginated income statements for a symbol."""
+    return _paginate_financials(
+        db, IncomeStatement, "income_statements", "income statements", symbol,
+        skip, limit, cursor, paginate, include_total, period, INCOME_STATEMENT_FIELDS,
+    )
+
+@cached("key_metrics")
+def get_key_metrics(
+    db: Session,
+    symbol: str,
+    skip: int = 0,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    paginate: str = "offset",
+    include_total: Optional[bool] = None,
+    period: str = "annual",
+) -> Dict[str, Any]:
     """Get paginated key metrics for a symbol."""
-    total = db.query(KeyMetric).filter(KeyMetric.symbol == symbol).count()
-    metrics = (
-        db.query(KeyMetric)
-        .filter(KeyMetric.symbol == symbol)
-        .order_by(desc(KeyMetric.date))
-        .offset(skip)
-        .limit(limit)
-        .all()
+    return _paginate_financials(
+        db, KeyMetric, "key_metrics", "key metrics", symbol,
+        skip, limit, cursor, paginate, include_total, period,
     )
-    if not metrics:
-        raise HTTPException(status_code=404, detail=f"No key metrics found for symbol {symbol}")
-    return {
-        "items": [m.__dict__ for m in metrics],
-        "total": total, "skip": skip, "limit": limit
-    }
 
-def get_financial_ratios(db: Session, symbol: str, skip: int = 0, limit: int = 20) -> Dict[str, Any]:
+@cached("financial_ratios")
+def get_financial_ratios(
+    db: Session,
+    symbol: str,
+    skip: int = 0,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    paginate: str = "offset",
+    include_total: Optional[bool] = None,
+    period: str = "annual",
+) -> Dict[str, Any]:
     """Get paginated financial ratios for a symbol."""
-    total = db.query(FinancialRatio).filter(FinancialRatio.symbol == symbol).count()
-    ratios = (
-        db.query(FinancialRatio)
-        .filter(FinancialRatio.symbol == symbol)
-        .order_by(desc(FinancialRatio.date))
-        .offset(skip)
+    return _paginate_financials(
+        db, FinancialRatio, "financial_ratios", "financial ratios", symbol,
+        skip, limit, cursor, paginate, include_total, period,
+    )
+
+# TRAILING TWELVE MONTHS: rolling four-quarter aggregates computed by the database
+# dataset -> (model, label, whether its figures are flows to be summed rather than averaged)
+TTM_DATASETS = {
+    "income_statements": (IncomeStatement, "income statements", True),
+    "key_metrics": (KeyMetric, "key metrics", False),
+    "financial_ratios": (FinancialRatio, "financial ratios", False),
+}
+
+# share counts are levels, not flows: averaged even on the income statement
+TTM_AVERAGED = {"weighted_average_shs_out", "weighted_average_shs_out_dil"}
+
+def _ttm_rows(db: Session, model, label: str, summed: bool, symbol: str, limit: int) -> Dict[str, Any]:
+    """
+    One query: each quarterly row is aggregated with the three quarters before it by
+    window functions over (symbol, date). Flows are summed, and only when all four
+    quarters report the field; levels and ratios are averaged. A window counts only
+    when its quarters are consecutive, i.e. the fiscal quarter four rows back is
+    exactly three quarters earlier, so a missing quarter never produces a TTM row.
+    """
+    window = {"partition_by": model.symbol, "order_by": model.date}
+    rolling = {**window, "rows": (-3, 0)}
+    quarter_index = cast(model.fiscal_year, Integer) * 4 + cast(func.substr(model.period, 2, 1), Integer)
+
+    figures = []
+    for column in model.__table__.columns:
+        if not isinstance(column.type, Numeric):
+            continue
+        if summed and column.key not in TTM_AVERAGED:
+            value = case((func.count(column).over(**rolling) == 4, func.sum(column).over(**rolling)))
+        else:
+            value = func.avg(column).over(**rolling)
+        figures.append(type_coerce(value, Numeric(asdecimal=False)).label(column.key))
+
+    ttm = (
+        select(
+            model.symbol, model.date, model.fiscal_year, model.period, model.reported_currency,
+            func.lag(model.date, 3, type_=Date).over(**window).label("from_date"),
+            (quarter_index - func.lag(quarter_index, 3).over(**window)).label("span"),
+            *figures,
+        )
+        .where(model.symbol == symbol, model.period.in_(QUARTERS))
+        .subquery()
+    )
+    rows = db.execute(
+        select(*(column for column in ttm.c if column.key != "span"))
+        .where(ttm.c.span == 3)
+        .order_by(desc(ttm.c.date))
         .limit(limit)
-        .all()
+    ).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"No four consecutive quarters of {label} for symbol {symbol}")
+    return {"items": [row._asdict() for row in rows], "limit": limit}
+
+def get_ttm_financials(db: Session, symbol: str, dataset: str, limit: int = 4) -> Dict[str, Any]:
+    """
+    Trailing-twelve-month figures for a symbol, newest first, one per quarter end.
+    Cached under the dataset's tag, so they are recomputed only after a sync or
+    import writes new or restated rows for the symbol.
+    """
+    model, label, summed = TTM_DATASETS[dataset]
+    return read_through(
+        dataset, symbol, {"symbol": symbol, "ttm": limit},
+        lambda: _ttm_rows(db, model, label, summed, symbol, limit),
     )
-    if not ratios:
-        raise HTTPException(status_code=404, detail=f"No financial ratios found for symbol {symbol}")
+
+# BATCH SERVICE FUNCTIONS: one IN query per dataset, errors reported per symbol
+FINANCIAL_DATASETS = {
+    "income_statements": (IncomeStatement, INCOME_STATEMENT_FIELDS),
+    "key_metrics": (KeyMetric, None),
+    "financial_ratios": (FinancialRatio, None),
+}
+
+def _batch_error(status_code: int, detail: str) -> Dict[str, Any]:
+    return {"error": {"status_code": status_code, "detail": detail}}
+
+def get_company_profiles_batch(db: Session, symbols: List[str]) -> Dict[str, Any]:
+    """Company profiles keyed by symbol, in request order; unknown symbols get an error entry."""
+    rows = db.query(*_projection(Company, COMPANY_FIELDS)).filter(Company.symbol.in_(symbols)).all()
+    found = {row.symbol: row._asdict() for row in rows}
+    return {
+        symbol: found.get(symbol) or _batch_error(404, f"Company with symbol {symbol} not found")
+        for symbol in symbols
+    }
+
+def get_financials_batch(
+    db: Session, symbols: List[str], datasets: List[str], limit: int = 4, period: str = "annual",
+) -> Dict[str, Any]:
+    """
+    The latest `limit` rows of the period type per symbol for each dataset, keyed by
+    symbol then dataset. row_number() over each symbol's (date, id) ordering caps the
+    rows per symbol inside the single query. Symbols with no rows in any dataset get
+    an error entry.
+    """
+    results: Dict[str, Dict[str, Any]] = {symbol: {dataset: [] for dataset in datasets} for symbol in symbols}
+    for dataset in datasets:
+        model, fields = FINANCIAL_DATASETS[dataset]
+        rank = func.row_number().over(
+            partition_by=model.symbol,
+            order_by=(desc(model.date), desc(model.id)),
+        ).label("rank")
+        ranked = (
+            db.query(*_projection(model, fields), rank)
+            .filter(model.symbol.in_(symbols), *_period_filter(model, period))
+            .subquery()
+        )
+        rows = (
+            db.query(*(column for column in ranked.c if column.key != "rank"))
+            .filter(ranked.c.rank <= limit)
+            .order_by(ranked.c.symbol, desc(ranked.c.date), desc(ranked.c.id))
+        )
+        for row in rows:
+            results[row.symbol][dataset].append(row._asdict())
+
     return {
-        "items": [r.__dict__ for r in ratios],
-        "total": total, "skip": skip, "limit": limit
+        symbol: data if any(data.values()) else _batch_error(404, f"No financial data found for symbol {symbol}")
+        for symbol, data in results.items()
     }
 
+@cached("news")
 def get_stock_news(db: Session, symbol: str, limit: int = 20) -> List[Dict[str, Any]]:
     """Get stock news from the database."""
-    articles = get_articles_by_symbol(db, symbol, limit)
+    articles = (
+        db.query(*_projection(NewsArticle))
+        .filter(NewsArticle.symbol == symbol)
+        .order_by(NewsArticle.published_date.desc())
+        .limit(limit)
+        .all()
+    )
     if not articles:
         raise HTTPException(status_code=404, detail=f"No news found for symbol {symbol}")
-    return [article.__dict__ for article in articles]
\ No newline at end of file
+    return [article._asdict() for article in articles]
\ No newline at end of file
@@ -0,0 +1,102 @@
+# per-endpoint circuit breakers for the FMP API, with their state published as gauges
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitBreaker:
+    """
+    Stops calling an endpoint that keeps failing.
+    Closed until `failure_threshold` consecutive failures (429s, 5xx, timeouts), then open:
+    calls are refused for `reset_timeout` seconds without touching the network. The
+    first call after that is a half-open probe; its success closes the breaker, its
+    failure opens it again. A probe that never reports back is replaced after another
+    `reset_timeout`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.fmp_breaker_failure_threshold
+        self.reset_timeout = settings.fmp_breaker_reset_timeout if reset_timeout is None else reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._changed_at = clock()  # when the breaker opened, or when the current probe started
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe is let through."""
+        if self._state == CLOSED:
+            return 0.0
+        return max(0.0, self._changed_at + self.reset_timeout - self._clock())
+
+    def allow(self) -> bool:
+        """Whether a call may go out now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            now = self._clock()
+            if now - self._changed_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._changed_at = now
+                return True
+        metrics.incr("fmp_circuit_rejected_total", endpoint=self.name)
+        return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"FMP {self.name} circuit closed")
+            self._state = CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning(f"FMP {self.name} circuit open for {self.reset_timeout:g}s "
+                                   f"after {self._failures} consecutive failures")
+                    metrics.incr("fmp_circuit_opened_total", endpoint=self.name)
+                self._state = OPEN
+                self._changed_at = self._clock()
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(endpoint: str) -> CircuitBreaker:
+    """The breaker for an endpoint, keyed by its first path segment (stock_news/AAPL -> stock_news)."""
+    name = endpoint.split("/", 1)[0]
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+def reset_circuit_breakers():
+    """Forget every breaker (tests)."""
+    with _breakers_lock:
+        _breakers.clear()
+
+def _breaker_states() -> Dict[str, float]:
+    return {f"fmp_circuit_state{{endpoint={name}}}": STATE_VALUES[b.state] for name, b in list(_breakers.items())}
+
+metrics.register_collector(_breaker_states)
@@ -0,0 +1,70 @@
+# symbol -> company id resolution shared by every dataset of a sync run
+
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Union
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import run_db
+from app.crud.crud_company import bulk_create_companies, get_company_ids
+from app.services.fmp_client import FMPClient
+
+logger = logging.getLogger(__name__)
+
+class CompanyResolver:
+    """
+    Maps symbols to company ids for one sync run. The first lookup loads every symbol
+    of the run in one query and creates the missing companies in one bulk insert;
+    every later lookup, from any dataset, is a dictionary hit.
+    """
+
+    def __init__(self, symbols: Iterable[str], fmp_client: FMPClient):
+        self.symbols = list(dict.fromkeys(symbols))
+        self.fmp_client = fmp_client
+        self._ids: Dict[str, int] = {}
+        self._loaded = False
+        self._lock: Optional[asyncio.Lock] = None
+
+    def remember(self, symbol: str, company_id: int):
+        """Record an id learned elsewhere, e.g. from the profile sync."""
+        self._ids[symbol] = company_id
+
+    async def company_id(self, db: Union[Session, AsyncSession], symbol: str) -> int:
+        if symbol not in self._ids:
+            await self.load(db, [symbol])
+        return self._ids[symbol]
+
+    async def load(self, db: Union[Session, AsyncSession], symbols: Optional[List[str]] = None):
+        """Resolve the run's symbols (plus any extra ones), creating missing companies."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            wanted = list(symbols or [])
+            if not self._loaded:
+                wanted = self.symbols + wanted
+            wanted = [s for s in dict.fromkeys(wanted) if s not in self._ids]
+            if not wanted:
+                return
+
+            found = await run_db(db, get_company_ids, wanted)
+            missing = [s for s in wanted if s not in found]
+            if missing:
+                logger.info(f"Creating {len(missing)} new company records")
+                await run_db(db, bulk_create_companies, await self._profile_rows(missing))
+                found.update(await run_db(db, get_company_ids, missing))
+            self._ids.update(found)
+            self._loaded = True
+
+    async def _profile_rows(self, symbols: List[str]) -> List[dict]:
+        """Profile rows for new companies, fetched in batches; a missing profile falls back to a minimal row."""
+        try:
+            profiles = await self.fmp_client.get_company_profiles(symbols)
+        except Exception as e:
+            logger.error(f"Failed to fetch profiles for {len(symbols)} new companies: {str(e)}")
+            profiles = {}
+        return [
+            # Keyed by the requested symbol, whatever casing the profile comes back in
+            {**profiles[symbol].model_dump(), "symbol": symbol} if symbol in profiles
+            else {"symbol": symbol, "company_name": f"Company {symbol}"}
+            for symbol in symbols
+        ]
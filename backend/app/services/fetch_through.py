@@ -0,0 +1,182 @@
+# fetch-through reads: symbols missing from the database are synced from FMP when requested,
+# and rows past their freshness SLA are served as they are while a background sync refreshes them
+
+import asyncio
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from fastapi import HTTPException
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, run_db
+from app.core.metrics import metrics
+from app.crud.crud_sync_state import get_last_fetched
+from app.services.business_service import PERIOD_DATASETS, sync_all
+from app.services.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# what FMP could know; anything else is a plain 404 without an upstream call
+TICKER = re.compile(r"^[A-Z0-9][A-Z0-9.\-]{0,9}$")
+
+class Deadlines:
+    """
+    key -> deadline, bounded to max_entries by dropping the least recently set key.
+    Keys come from client input, so the map must not grow with every distinct ticker.
+    """
+
+    def __init__(self, max_entries: int, clock: Callable[[], float]):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def pending(self, key: Hashable) -> bool:
+        """Whether key's deadline is still ahead; a passed one is dropped."""
+        deadline = self._entries.get(key)
+        if deadline is None:
+            return False
+        if deadline > self._clock():
+            return True
+        del self._entries[key]
+        return False
+
+    def set(self, key: Hashable, seconds: float):
+        self._entries[key] = self._clock() + seconds
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class FetchThrough:
+    """
+    On-demand syncs of single symbols, at most one in flight per (symbol, dataset).
+    Each sync runs on its own session through sync_all, so it outlives the request
+    that started it and shares the app's FMP client and rate limit.
+    """
+
+    def __init__(self, session_factory: Callable = AsyncSessionLocal, clock: Callable[[], float] = time.monotonic):
+        self.session_factory = session_factory
+        self._clock = clock
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._checked = Deadlines(settings.fetch_through_max_tracked, clock)  # until the next freshness lookup
+        self._unknown = Deadlines(settings.fetch_through_max_tracked, clock)  # until FMP may know the symbol
+        # first fetches of symbols missing from the database, which any client can ask for
+        rate = settings.fetch_through_new_per_minute
+        self._new_symbols = TokenBucket(rate, burst=max(1, int(rate)), clock=clock)
+
+    def refresh(self, symbol: str, dataset: str) -> asyncio.Task:
+        """Start a sync of the symbol's dataset, or return the one already running."""
+        key = (symbol, dataset)
+        task = self._tasks.get(key)
+        if task is not None and not task.done():
+            metrics.incr("fetch_through_syncs_total", dataset=dataset, result="deduplicated")
+            return task
+        task = asyncio.get_running_loop().create_task(self._sync(symbol, dataset))
+        self._tasks[key] = task
+        task.add_done_callback(lambda done: self._tasks.pop(key) if self._tasks.get(key) is done else None)
+        return task
+
+    async def _sync(self, symbol: str, dataset: str) -> bool:
+        started = time.perf_counter()
+        try:
+            async with self.session_factory() as db:
+                result = (await sync_all(db, [symbol], datasets=[dataset]))[dataset]
+            ok = not result["failed"]
+            if not ok:
+                logger.warning(f"Fetch-through of {dataset} for {symbol} failed: {result['failed'][symbol]}")
+        except Exception as e:
+            logger.error(f"Fetch-through of {dataset} for {symbol} failed: {str(e)}")
+            ok = False
+        metrics.incr("fetch_through_syncs_total", dataset=dataset, result="succeeded" if ok else "failed")
+        metrics.observe("fetch_through_sync_seconds", time.perf_counter() - started, dataset=dataset)
+        return ok
+
+    async def _is_stale(self, db, symbol: str, dataset: str) -> bool:
+        """Past the dataset's freshness SLA, looked up at most once per fetch_through_check_interval."""
+        key = (symbol, dataset)
+        if self._checked.pending(key):
+            return False
+        self._checked.set(key, settings.fetch_through_check_interval)
+
+        fetched = await run_db(db, get_last_fetched, symbol, dataset)
+        expected = settings.fmp_sync_periods if dataset in PERIOD_DATASETS else ["all"]
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.freshness_sla[dataset])
+        for period in expected:
+            fetched_at = fetched.get(period)
+            if fetched_at is None:  # rows from before watermarks, or a bulk import
+                return True
+            if fetched_at.tzinfo is None:  # SQLite returns naive datetimes
+                fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+            if fetched_at < cutoff:
+                return True
+        return False
+
+    async def serve(self, db, symbol: str, dataset: str, read: Callable[[], Awaitable[Any]]) -> Tuple[int, Any]:
+        """
+        Answer a read as (status code, body). A 404 for a plausible ticker starts a sync
+        of the symbol and waits up to fetch_through_wait seconds for it: the rows if it
+        finished in time, else 202 with a retry hint. Rows past the dataset's freshness
+        SLA are returned as they are, and a background sync refreshes them. Syncs of
+        symbols missing from the database are capped at fetch_through_new_per_minute;
+        past the cap the 404 stands.
+        """
+        if not settings.fetch_through_enabled:
+            return 200, await read()
+        key = (symbol, dataset)
+        try:
+            body = await read()
+        except HTTPException as e:
+            if e.status_code != 404 or not TICKER.match(symbol) or self._unknown.pending(key):
+                raise
+            if key not in self._tasks and not self._new_symbols.try_acquire():
+                metrics.incr("fetch_through_requests_total", dataset=dataset, result="throttled")
+                raise
+            task = self.refresh(symbol, dataset)
+            try:
+                await asyncio.wait_for(asyncio.shield(task), settings.fetch_through_wait)
+            except asyncio.TimeoutError:
+                metrics.incr("fetch_through_requests_total", dataset=dataset, result="pending")
+                return 202, {
+                    "status": "pending",
+                    "symbol": symbol,
+                    "detail": f"Fetching {symbol} from the data provider",
+                    "retry_after": max(1, math.ceil(settings.fetch_through_wait)),
+                }
+            try:
+                body = await read()
+            except HTTPException as missing:
+                if missing.status_code == 404:
+                    self._unknown.set(key, settings.fetch_through_negative_ttl)
+                raise
+            metrics.incr("fetch_through_requests_total", dataset=dataset, result="fetched")
+            return 200, body
+
+        if await self._is_stale(db, symbol, dataset):
+            self.refresh(symbol, dataset)
+            metrics.incr("fetch_through_requests_total", dataset=dataset, result="stale")
+        return 200, body
+
+    async def close(self):
+        """Cancel the syncs still running (app shutdown)."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+_fetch_through: Optional[FetchThrough] = None
+
+def get_fetch_through() -> FetchThrough:
+    """Process-wide fetch-through, created on first use."""
+    global _fetch_through
+    if _fetch_through is None:
+        _fetch_through = FetchThrough()
+    return _fetch_through
+
+def set_fetch_through(fetch_through: Optional[FetchThrough]):
+    global _fetch_through
+    _fetch_through = fetch_through
@@ -1,30 +1,114 @@
 import aiohttp
+import asyncio
 import logging
-from typing import Optional, Dict, List, Any
+import time
+import orjson
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Optional, Dict, List, Any, Tuple, Type, Union
 from fastapi import HTTPException
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.circuit_breaker import get_circuit_breaker
+from app.services.fmp_transport import make_transport
+from app.services.rate_limiter import TokenBucket, backoff_delay, get_rate_limiter, parse_retry_after
 from app.schemas import fmp_schemas
 from pydantic import ValidationError
 
 logger = logging.getLogger(__name__)
 
+def _transport_trace_config() -> aiohttp.TraceConfig:
+    """Connection reuse, DNS cache and payload size counters for every FMP request."""
+    trace = aiohttp.TraceConfig()
+
+    async def on_connection_create_end(session, context, params):
+        metrics.incr("fmp_connections_created_total")
+
+    async def on_connection_reuseconn(session, context, params):
+        metrics.incr("fmp_connections_reused_total")
+
+    async def on_dns_cache_hit(session, context, params):
+        metrics.incr("fmp_dns_cache_total", result="hit")
+
+    async def on_dns_cache_miss(session, context, params):
+        metrics.incr("fmp_dns_cache_total", result="miss")
+
+    async def on_response_chunk_received(session, context, params):
+        metrics.incr("fmp_response_bytes_total", len(params.chunk))  # after decompression
+
+    async def on_request_end(session, context, params):
+        headers = params.response.headers
+        encoding = headers.get("Content-Encoding", "identity")
+        metrics.incr("fmp_responses_total", encoding=encoding)
+        if headers.get("Content-Length"):
+            metrics.incr("fmp_wire_bytes_total", int(headers["Content-Length"]))
+
+    trace.on_connection_create_end.append(on_connection_create_end)
+    trace.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace.on_dns_cache_hit.append(on_dns_cache_hit)
+    trace.on_dns_cache_miss.append(on_dns_cache_miss)
+    trace.on_response_chunk_received.append(on_response_chunk_received)
+    trace.on_request_end.append(on_request_end)
+    return trace
+
+def _reuse_ratio() -> Dict[str, float]:
+    reused = metrics.counter("fmp_connections_reused_total")
+    total = reused + metrics.counter("fmp_connections_created_total")
+    return {"fmp_connection_reuse_ratio": round(reused / total, 4)} if total else {}
+
+metrics.register_collector(_reuse_ratio)
+
+# Variants of the news endpoint, in the order they are tried; which one answers depends on the plan
+NEWS_ENDPOINTS = ("stock_news", "stock_news/{symbol}", "general_news")
+
+_endpoint_memory: Dict[str, Tuple[str, float]] = {}
+
+def remember_endpoint(feature: str, variant: str):
+    """Record the endpoint variant that answered, for settings.fmp_endpoint_memory_ttl seconds."""
+    _endpoint_memory[feature] = (variant, time.monotonic() + settings.fmp_endpoint_memory_ttl)
+
+def recall_endpoint(feature: str) -> Optional[str]:
+    remembered = _endpoint_memory.get(feature)
+    if remembered is None or remembered[1] <= time.monotonic():
+        metrics.incr("fmp_endpoint_memory_total", result="miss")
+        return None
+    metrics.incr("fmp_endpoint_memory_total", result="hit")
+    return remembered[0]
+
+def forget_endpoints():
+    """Clear the endpoint memory (tests)."""
+    _endpoint_memory.clear()
+
 class FMPClient:
     """
     An asynchronous client for the FMP API.
     """
     BASE_URL = settings.fmp_base_url
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, rate_limiter: Optional[TokenBucket] = None, transport=None):
         if not api_key:
             raise ValueError("FMPClient requires an API key")
         self.api_key = api_key
         self.session: Optional[aiohttp.ClientSession] = None
+        # HTTP, or record/replay against fixtures on disk (settings.fmp_transport)
+        self.transport = transport or make_transport()
+        # Shared by default, so concurrent clients stay inside one plan budget; replays spend none
+        self.rate_limiter = rate_limiter or (
+            get_rate_limiter() if self.transport.metered else TokenBucket(requests_per_minute=0)
+        )
 
     async def __aenter__(self):
         """Asynchronous context manager to manage the client session."""
         self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=10),
-            headers={'User-Agent': 'Foresight-Analytics/1.0'}
+            connector=aiohttp.TCPConnector(
+                limit=settings.fmp_connection_limit,
+                limit_per_host=settings.fmp_connection_limit_per_host,
+                ttl_dns_cache=settings.fmp_dns_cache_ttl,
+                keepalive_timeout=settings.fmp_keepalive_timeout,
+            ),
+            timeout=self._timeout_for(""),
+            headers={'User-Agent': 'Foresight-Analytics/1.0', 'Accept-Encoding': 'gzip, deflate'},
+            trace_configs=[_transport_trace_config()],
         )
         return self
     
@@ -32,100 +116,261 @@ class FMPClient:
         if self.session:
             await self.session.close()
 
-    async def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        """Make an authenticated request to the FMP API."""
+    @staticmethod
+    def _timeout_for(endpoint: str) -> aiohttp.ClientTimeout:
+        """Timeout profile for an endpoint, keyed by its first path segment (stock_news/AAPL -> stock_news)."""
+        total = settings.fmp_timeouts.get(endpoint.split("/", 1)[0], settings.fmp_timeout_default)
+        return aiohttp.ClientTimeout(total=total, sock_connect=settings.fmp_connect_timeout)
+
+    async def _request_body(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> bytes:
+        """
+        Make an authenticated request to the FMP API and return the raw JSON body.
+        Every attempt takes a token from the shared rate limiter. 429s, 5xx responses and
+        timeouts are retried with jittered exponential backoff, never shorter than the
+        provider's Retry-After, which also pauses the other requests in flight. They also
+        count against the endpoint's circuit breaker; while it is open, calls fail fast
+        with a 503.
+        """
         if not self.session:
             raise RuntimeError("FMPClient must be used as an async context manager")
         
-        url = f"{self.BASE_URL}/{endpoint}"
         request_params = {"apikey": self.api_key}
         if params:
             request_params.update(params)
         
+        breaker = get_circuit_breaker(endpoint)
+        for attempt in range(settings.fmp_max_retries + 1):
+            if not breaker.allow():
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"FMP {breaker.name} circuit open, retrying in {breaker.retry_in():.0f}s",
+                )
+            await self.rate_limiter.acquire()
+            retry_after = None
+            try:
+                logger.info(f"Requesting data from FMP endpoint: {endpoint}")
+                response = await self.transport.get(
+                    self.session, self.BASE_URL, endpoint, request_params, self._timeout_for(endpoint)
+                )
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as e:
+                error = HTTPException(status_code=504, detail=f"FMP API unavailable: {type(e).__name__}")
+                breaker.record_failure()
+            else:
+                if response.status == 429 or response.status >= 500:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if response.status == 429:
+                        error = HTTPException(status_code=429, detail="FMP API rate limit exceeded")
+                        await self.rate_limiter.pause_async(retry_after if retry_after is not None else backoff_delay(attempt))
+                    else:
+                        error = HTTPException(status_code=response.status, detail=f"FMP API error: {response.reason}")
+                    breaker.record_failure()
+                elif response.status >= 400:
+                    # the endpoint is up and answered; a 402/404 is about this request
+                    breaker.record_success()
+                    raise HTTPException(status_code=response.status, detail=f"FMP API error: {response.reason}")
+                else:
+                    breaker.record_success()
+                    body = response.body.strip()
+                    # data comes as a list; FMP reports errors, and sometimes nothing, as an object
+                    if body[:1] == b"{":
+                        data = self._parse(body)
+                        if "Error Message" in data:
+                            raise HTTPException(status_code=400, detail=f"FMP API error: {data['Error Message']}")
+                        if not data:
+                            return b"[]"
+                    return body or b"[]"
+
+            if attempt == settings.fmp_max_retries:
+                raise error
+            delay = max(backoff_delay(attempt), retry_after or 0)
+            logger.warning(f"FMP {endpoint} failed ({error.status_code}), retry {attempt + 1} in {delay:.2f}s")
+            metrics.incr("fmp_retries_total", reason=str(error.status_code))
+            metrics.incr("fmp_throttled_seconds_total", delay, reason="backoff")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _parse(body: bytes) -> Any:
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            raise HTTPException(status_code=502, detail="FMP API returned a non-JSON response")
+
+    async def _fetch_list(self, endpoint: str, params: Dict[str, Any], model: Type[fmp_schemas.BaseFMPModel], label: str) -> List[Any]:
+        """Fetch a list payload and validate it as a whole, straight from the response bytes."""
+        body = await self._request_body(endpoint, params)
+        try:
+            return fmp_schemas.list_adapter(model).validate_json(body)
+        except ValidationError as e:
+            logger.error(f"Data validation failed for {label} {model.__name__}: {e.errors()}")
+            raise HTTPException(status_code=422, detail=f"Invalid data format from FMP API for {model.__name__}")
+
+    async def _fetch_items(self, endpoint: str, params: Dict[str, Any], model: Type[fmp_schemas.BaseFMPModel]) -> List[Any]:
+        """Like _fetch_list, but a payload with invalid items keeps the valid ones."""
+        body = await self._request_body(endpoint, params)
         try:
-            logger.info(f"Requesting data from FMP endpoint: {endpoint}")
-            async with self.session.get(url, params=request_params) as response:
-                if response.status == 429:
-                    raise HTTPException(status_code=429, detail="FMP API rate limit exceeded")
-                
-                response.raise_for_status()
-                data = await response.json()
-                
-                if isinstance(data, dict) and "Error Message" in data:
-                    raise HTTPException(status_code=400, detail=f"FMP API error: {data['Error Message']}")
-                
-                return data or []
-                
-        except aiohttp.ClientResponseError as e:
-            raise HTTPException(status_code=e.status, detail=f"FMP API error: {e.message}")
+            return fmp_schemas.list_adapter(model).validate_json(body)
+        except ValidationError:
+            pass
+        valid = []
+        for item in self._parse(body):
+            try:
+                valid.append(model.model_validate(item))
+            except ValidationError as e:
+                logger.error(f"Data validation failed for {model.__name__}: {e.errors()}")
+        return valid
 
     async def get_company_profile(self, symbol: str) -> fmp_schemas.CompanyProfile:
         """Get company profile data."""
-        data = await self._make_request("profile", params={"symbol": symbol})
+        profiles = await self._fetch_list("profile", {"symbol": symbol}, fmp_schemas.CompanyProfile, symbol)
         
-        if not data:
+        if not profiles:
             raise HTTPException(status_code=404, detail=f"No profile data found for symbol: {symbol}")
-        
-        try:
-            return fmp_schemas.CompanyProfile.model_validate(data[0])
-        except ValidationError as e:
-            logger.error(f"Data validation failed for {symbol} CompanyProfile: {e.errors()}")
-            raise HTTPException(status_code=422, detail="Invalid data format from FMP API")
+        return profiles[0]
 
-    async def get_income_statement(self, symbol: str, period: str = "annual", limit: int = 5):
+    @staticmethod
+    def _chunks(symbols: List[str], size: int) -> List[List[str]]:
+        return [symbols[i:i + size] for i in range(0, len(symbols), size)]
+
+    async def get_company_profiles(self, symbols: List[str]) -> Dict[str, fmp_schemas.CompanyProfile]:
+        """
+        Get profiles for many symbols, settings.fmp_batch_size per comma-separated request.
+        Symbols FMP returns nothing for are absent from the result. A chunk that fails
+        as a batch is retried one symbol at a time, so one bad ticker costs only itself.
+        """
+        requested = {symbol.upper(): symbol for symbol in symbols}
+
+        async def fetch(chunk: List[str]) -> List[fmp_schemas.CompanyProfile]:
+            try:
+                return await self._fetch_items("profile", {"symbol": ",".join(chunk)}, fmp_schemas.CompanyProfile)
+            except HTTPException as e:
+                if len(chunk) == 1:
+                    logger.warning(f"No profile for {chunk[0]}: {e.detail}")
+                    return []
+                logger.warning(f"Batched profile request failed ({e.detail}); retrying {len(chunk)} symbols one by one")
+                return [profile for found in await asyncio.gather(*(fetch([s]) for s in chunk)) for profile in found]
+
+        chunks = self._chunks(list(requested.values()), settings.fmp_batch_size)
+        profiles = {}
+        for found in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+            for profile in found:
+                symbol = requested.get(profile.symbol.upper())
+                if symbol is not None:
+                    profiles[symbol] = profile
+
+        missing = len(requested) - len(profiles)
+        if missing:
+            logger.warning(f"No profile data returned for {missing} of {len(requested)} symbols")
+        return profiles
+
+    async def get_income_statement(self, symbol: str, period: str = "annual", limit: int = 5) -> List[fmp_schemas.IncomeStatement]:
         """Get income statement data."""
         params = {"symbol": symbol,"period": period, "limit": limit}
-        data = await self._make_request("income-statement", params)
-        
-        try:
-            return [fmp_schemas.IncomeStatement.model_validate(item) for item in data]
-        except ValidationError as e:
-            logger.error(f"Data validation failed for {symbol} IncomeStatement: {e.errors()}")
-            raise HTTPException(status_code=422, detail="Invalid data format from FMP API")
+        return await self._fetch_list("income-statement", params, fmp_schemas.IncomeStatement, symbol)
         
     async def get_financial_ratios(self, symbol: str, period: str = "annual", limit: int = 5) -> List[fmp_schemas.FinancialRatios]:
         """Get financial ratios data."""
         params = {"symbol": symbol, "period": period, "limit": limit}
-        data = await self._make_request("ratios", params)
-        try:
-            return [fmp_schemas.FinancialRatios.model_validate(item) for item in data]
-        except ValidationError as e:
-            logger.error(f"Data validation failed for {symbol} FinancialRatios: {e.errors()}")
-            raise HTTPException(status_code=422, detail="Invalid data format from FMP API for Ratios")
+        return await self._fetch_list("ratios", params, fmp_schemas.FinancialRatios, symbol)
 
     async def get_key_metrics(self, symbol: str, period: str = "annual", limit: int = 5) -> List[fmp_schemas.KeyMetrics]:
         """Get key metrics data."""
         params = {"symbol": symbol, "period": period, "limit": limit}
-        data = await self._make_request("key-metrics", params)
-        try:
-            return [fmp_schemas.KeyMetrics.model_validate(item) for item in data]
-        except ValidationError as e:
-            logger.error(f"Data validation failed for {symbol} KeyMetrics: {e.errors()}")
-            raise HTTPException(status_code=422, detail="Invalid data format from FMP API for Key Metrics")
+        return await self._fetch_list("key-metrics", params, fmp_schemas.KeyMetrics, symbol)
 
-    async def get_stock_news(self, symbol: str, limit: int = 20) -> List[fmp_schemas.FMPArticle]:
-        """Get stock news articles."""
+    async def get_stock_news(self, symbol: str, limit: int = 20, from_date: Optional[date] = None) -> List[fmp_schemas.FMPArticle]:
+        """
+        Get stock news articles, optionally only those published on or after from_date.
+        The NEWS_ENDPOINTS variants are tried in order while they 404. The one that
+        answers is remembered, so later calls go straight to it until the memory expires.
+        """
         params = {"tickers": symbol, "limit": limit}
+        if from_date:
+            params["from"] = from_date.isoformat()
         
-        try:
-            data = await self._make_request("stock_news", params)
-        except HTTPException as e:
-            if e.status_code == 404:
-                try:
-                    logger.warning(f"Trying alternative news endpoint for {symbol}")
-                    data = await self._make_request(f"stock_news/{symbol}", {"limit": limit})
-                except HTTPException:
-                    logger.warning(f"Trying general news endpoint for {symbol}")
-                    data = await self._make_request("general_news", {"tickers": symbol, "limit": limit})
-            else:
-                raise
+        remembered = recall_endpoint("news")
+        variants = [v for v in NEWS_ENDPOINTS if v == remembered] + [v for v in NEWS_ENDPOINTS if v != remembered]
+        for variant in variants:
+            # the path variant names the ticker itself
+            variant_params = {k: v for k, v in params.items() if k != "tickers"} if "{symbol}" in variant else params
+            try:
+                articles = await self._fetch_items(variant.format(symbol=symbol), variant_params, fmp_schemas.FMPArticle)
+            except HTTPException as e:
+                if e.status_code != 404 or variant == variants[-1]:
+                    raise
+                logger.warning(f"News endpoint {variant} not found for {symbol}, trying the next one")
+                continue
+            remember_endpoint("news", variant)
+            break
         
-        if not data:
+        if not articles:
             logger.warning(f"No news data found for {symbol}")
-            return []
-        
-        try:
-            return [fmp_schemas.FMPArticle.model_validate(item) for item in data]
-        except ValidationError as e:
-            logger.error(f"Data validation failed for {symbol} FMPArticle: {e.errors()}")
-            return []  # Return empty list instead of raising exception
\ No newline at end of file
+        return articles
+
+    async def get_stock_news_batch(
+        self, symbols: List[str], limit: int = 20, from_date: Optional[date] = None
+    ) -> Dict[str, Union[List[fmp_schemas.FMPArticle], Exception]]:
+        """
+        Get news for many symbols, settings.fmp_batch_size tickers per request, split back
+        per symbol by each article's tickers and capped at `limit` per symbol. FMP's limit
+        counts articles across all tickers of a request, so busy tickers can crowd out
+        quiet ones. A chunk that fails as a batch falls back to get_stock_news per symbol,
+        as does every chunk while the endpoint memory says stock_news 404s on this plan.
+        A symbol whose own request fails maps to the exception instead of a list, so
+        callers can tell an outage from a symbol without news.
+        """
+        requested = {symbol.upper(): symbol for symbol in symbols}
+        news: Dict[str, Union[List[fmp_schemas.FMPArticle], Exception]] = {symbol: [] for symbol in symbols}
+        batched = recall_endpoint("news") in (None, "stock_news")
+
+        async def one_by_one(chunk: List[str]):
+            for symbol, articles in zip(chunk, await asyncio.gather(
+                *(self.get_stock_news(s, limit, from_date) for s in chunk), return_exceptions=True
+            )):
+                if isinstance(articles, Exception):
+                    logger.warning(f"No news for {symbol}: {articles}")
+                news[symbol] = articles
+
+        async def fetch(chunk: List[str]):
+            if not batched:
+                return await one_by_one(chunk)
+            params = {"tickers": ",".join(chunk), "limit": limit * len(chunk)}
+            if from_date:
+                params["from"] = from_date.isoformat()
+            try:
+                articles = await self._fetch_items("stock_news", params, fmp_schemas.FMPArticle)
+            except HTTPException as e:
+                logger.warning(f"Batched news request failed ({e.detail}); retrying {len(chunk)} symbols one by one")
+                return await one_by_one(chunk)
+            remember_endpoint("news", "stock_news")
+
+            for article in articles:
+                for ticker in article.tickers.split(","):
+                    symbol = requested.get(ticker.rsplit(":", 1)[-1].strip().upper())
+                    if symbol is not None and len(news[symbol]) < limit:
+                        news[symbol].append(article)
+
+        await asyncio.gather(*(fetch(chunk) for chunk in self._chunks(list(requested.values()), settings.fmp_batch_size)))
+        return news
+
+_shared_client: Optional[FMPClient] = None
+
+def get_shared_fmp_client() -> Optional[FMPClient]:
+    """The app-scoped client opened by the FastAPI lifespan, if the app is running."""
+    return _shared_client
+
+def set_shared_fmp_client(client: Optional[FMPClient]):
+    global _shared_client
+    _shared_client = client
+
+@asynccontextmanager
+async def fmp_session(fmp_client: Optional[FMPClient] = None):
+    """
+    Yield the caller's client, else the app-scoped one, else a dedicated client that is
+    closed on exit (CLI runs, tests). Only the dedicated client pays new connections.
+    """
+    client = fmp_client or get_shared_fmp_client()
+    if client is not None:
+        yield client
+        return
+    async with FMPClient(api_key=settings.fmp_api_key) as client:
+        yield client
@@ -0,0 +1,153 @@
+# pluggable transports for FMPClient: live HTTP, record to fixtures, replay from fixtures
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+import aiohttp
+import orjson
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class TransportResponse(NamedTuple):
+    status: int
+    reason: str
+    headers: Mapping[str, str]
+    body: bytes
+
+class HTTPTransport:
+    """Sends requests over the client's aiohttp session."""
+
+    metered = True  # spends the FMP plan's request budget
+
+    async def get(
+        self, session: aiohttp.ClientSession, base_url: str, endpoint: str,
+        params: Dict[str, Any], timeout: aiohttp.ClientTimeout,
+    ) -> TransportResponse:
+        async with session.get(f"{base_url}/{endpoint}", params=params, timeout=timeout) as response:
+            body = await response.read()
+            return TransportResponse(response.status, response.reason or "", response.headers, body)
+
+def _fixture_params(params: Dict[str, Any]) -> Dict[str, str]:
+    # the API key never reaches disk, and values are compared as the query string sends them
+    return {k: str(v) for k, v in sorted(params.items()) if k != "apikey"}
+
+def _symbol_param(params: Dict[str, Any]) -> Tuple[Optional[str], str]:
+    for key in ("symbol", "tickers"):
+        if key in params:
+            return key, str(params[key])
+    return None, ""
+
+def fixture_path(root: Path, endpoint: str, params: Dict[str, Any]) -> Path:
+    """
+    root/<endpoint>/<symbol>-<digest>.json, where digest covers every parameter except
+    the API key. Batched requests are filed under "batch" rather than a symbol list.
+    """
+    fixture_params = _fixture_params(params)
+    _, symbols = _symbol_param(fixture_params)
+    label = "batch" if "," in symbols else (symbols or "_")
+    digest = hashlib.sha1(json.dumps(fixture_params).encode()).hexdigest()[:12]
+    return root / endpoint / f"{label}-{digest}.json"
+
+def write_fixture(root: Path, endpoint: str, params: Dict[str, Any], data: Any) -> Path:
+    path = fixture_path(root, endpoint, params)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fixture = {"endpoint": endpoint, "params": _fixture_params(params), "data": data}
+    path.write_text(json.dumps(fixture, indent=2, ensure_ascii=False) + "\n")
+    return path
+
+class RecordTransport(HTTPTransport):
+    """Sends requests over HTTP and saves every successful response as a fixture."""
+
+    def __init__(self, fixtures_dir: Path):
+        self.fixtures_dir = Path(fixtures_dir)
+
+    async def get(self, session, base_url, endpoint, params, timeout) -> TransportResponse:
+        response = await super().get(session, base_url, endpoint, params, timeout)
+        if response.status == 200 and response.body:
+            path = write_fixture(self.fixtures_dir, endpoint, params, orjson.loads(response.body))
+            logger.info(f"Recorded FMP fixture {path}")
+        return response
+
+class ReplayTransport:
+    """
+    Answers requests from fixtures, never touching the network.
+    A request without an exact fixture falls back to any fixture recorded for the same
+    endpoint and symbol, since limits and date filters vary between sync runs. Batched
+    requests are assembled from per-symbol fixtures; symbols without one are dropped,
+    as FMP drops unknown tickers. Requests nothing matches get a 404.
+    """
+
+    metered = False
+
+    def __init__(self, fixtures_dir: Path):
+        self.fixtures_dir = Path(fixtures_dir)
+
+    def _load(self, endpoint: str, params: Dict[str, Any]) -> Optional[List[Any]]:
+        path = fixture_path(self.fixtures_dir, endpoint, params)
+        if not path.exists():
+            _, symbol = _symbol_param(params)
+            matches = sorted(path.parent.glob(f"{symbol or '_'}-*.json"))
+            if not matches:
+                return None
+            path = matches[0]
+        return json.loads(path.read_text())["data"]
+
+    async def get(self, session, base_url, endpoint, params, timeout) -> TransportResponse:
+        data = self._load(endpoint, params)
+        key, symbols = _symbol_param(params)
+        if data is None and "," in symbols:
+            parts = [self._load(endpoint, {**params, key: symbol}) for symbol in symbols.split(",")]
+            if any(part is not None for part in parts):
+                data = [item for part in parts if part for item in part]
+                if "limit" in params:
+                    data = data[:int(params["limit"])]
+        if data is None:
+            logger.warning(f"No FMP fixture for {endpoint} {_fixture_params(params)}")
+            return TransportResponse(404, "No fixture recorded", {}, b"")
+        return TransportResponse(200, "OK", {"Content-Type": "application/json"}, orjson.dumps(data))
+
+def make_transport(mode: Optional[str] = None, fixtures_dir: Optional[str] = None):
+    """Transport for settings.fmp_transport: http (default), record or replay."""
+    mode = mode or settings.fmp_transport
+    fixtures_dir = Path(fixtures_dir or settings.fmp_fixtures_dir)
+    if mode == "http":
+        return HTTPTransport()
+    if mode == "record":
+        return RecordTransport(fixtures_dir)
+    if mode == "replay":
+        return ReplayTransport(fixtures_dir)
+    raise ValueError(f"Unknown FMP transport: {mode}")
+
+# docs/api-endpoints sample file -> endpoint and the request parameters it answers
+SAMPLE_ENDPOINTS: Dict[str, Tuple[str, str, Dict[str, Any]]] = {
+    "Company Profile Data API.json": ("profile", "symbol", {}),
+    "Income Statement API.json": ("income-statement", "symbol", {"period": "annual", "limit": 5}),
+    "Key Metrics API.json": ("key-metrics", "symbol", {"period": "annual", "limit": 5}),
+    "Financial Ratios API.json": ("ratios", "symbol", {"period": "annual", "limit": 5}),
+    "FMP Articles API.json": ("stock_news", "tickers", {"limit": 20}),
+}
+
+def _load_sample(path: Path) -> List[Dict[str, Any]]:
+    # the samples are excerpts: a bare object or a comma-terminated list element
+    text = path.read_text().strip().rstrip(",")
+    return json.loads(text if text.startswith("[") else f"[{text}]")
+
+def seed_fixtures(samples_dir: Path, fixtures_dir: Path) -> List[Path]:
+    """Write replay fixtures from the sample payloads under docs/api-endpoints."""
+    written = []
+    for sample in sorted(Path(samples_dir).rglob("*.json")):
+        if sample.name not in SAMPLE_ENDPOINTS:
+            logger.info(f"Skipping {sample.name}: FMPClient does not call that endpoint")
+            continue
+        endpoint, key, params = SAMPLE_ENDPOINTS[sample.name]
+        by_symbol: Dict[str, List[Dict[str, Any]]] = {}
+        for item in _load_sample(sample):
+            # news articles name their tickers as EXCHANGE:SYMBOL
+            for ticker in str(item.get(key) or item.get("symbol", "")).split(","):
+                by_symbol.setdefault(ticker.rsplit(":", 1)[-1].strip(), []).append(item)
+        for symbol, items in by_symbol.items():
+            written.append(write_fixture(Path(fixtures_dir), endpoint, {key: symbol, **params}, items))
+    return written
@@ -0,0 +1,212 @@
+# sync pipeline: runs the sync stages as a dependency DAG, each stage on its own session,
+# checkpointing every (symbol, stage) so an interrupted run can be resumed
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, run_db
+from app.crud.crud_sync_runs import (
+    clear_dead_letters,
+    create_sync_run,
+    finish_sync_run,
+    get_checkpointed,
+    get_due_dead_letters,
+    get_sync_run,
+    get_unfinished_run,
+    record_checkpoints,
+    record_dead_letters,
+)
+from app.services.business_service import PERIOD_DATASETS, SYNC_FUNCTIONS
+from app.services.company_resolver import CompanyResolver
+from app.services.fmp_client import FMPClient, fmp_session
+
+logger = logging.getLogger(__name__)
+
+# stage -> stages that must finish first. Financial statements need their companies;
+# news rows are keyed by symbol only, so news starts alongside profiles.
+STAGE_DEPENDENCIES: Dict[str, List[str]] = {
+    "profiles": [],
+    "income_statements": ["profiles"],
+    "key_metrics": ["profiles"],
+    "financial_ratios": ["profiles"],
+    "news": [],
+}
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+async def _record(session_factory: Callable, fn: Callable, *args) -> Any:
+    """Run-bookkeeping call on a short session of its own."""
+    async with session_factory() as db:
+        return await run_db(db, fn, *args)
+
+async def _stage_with_retries(
+    name: str,
+    symbols: List[str],
+    kwargs: Dict[str, Any],
+    session_factory: Callable,
+    run_id: Optional[int],
+) -> Dict[str, Any]:
+    """
+    Sync a stage's symbols, retrying the failed ones up to settings.sync_retry_attempts
+    times with a doubling delay. In a recorded run the symbols go in chunks of
+    settings.sync_checkpoint_chunk with every outcome checkpointed after each chunk,
+    and the symbols still failing at the end are dead-lettered.
+    """
+    result = {"dataset": name, "symbols": len(symbols), "succeeded": 0, "rows": 0, "failed": {}, "retried": 0}
+    chunk = settings.sync_checkpoint_chunk if run_id is not None else max(1, len(symbols))
+    pending = symbols
+    for attempt in range(settings.sync_retry_attempts + 1):
+        if attempt:
+            delay = settings.sync_retry_delay * 2 ** (attempt - 1)
+            logger.info(f"Retrying {name} for {len(pending)} symbols in {delay:g}s")
+            await asyncio.sleep(delay)
+            result["retried"] += len(pending)
+        failed: Dict[str, str] = {}
+        for start in range(0, len(pending), chunk):
+            batch = pending[start:start + chunk]
+            async with session_factory() as db:
+                outcome = await SYNC_FUNCTIONS[name](db, batch, **kwargs)
+            succeeded = [symbol for symbol in batch if symbol not in outcome["failed"]]
+            result["succeeded"] += len(succeeded)
+            result["rows"] += outcome["rows"]
+            failed.update(outcome["failed"])
+            if run_id is not None:
+                await _record(session_factory, record_checkpoints, run_id, name, succeeded, outcome["failed"])
+                await _record(session_factory, clear_dead_letters, name, succeeded)
+        pending = list(failed)
+        if not pending:
+            break
+
+    result["failed"] = failed
+    if run_id is not None and failed:
+        logger.warning(f"Dead-lettering {name} for {len(failed)} symbols after {attempt + 1} attempts")
+        await _record(session_factory, record_dead_letters, run_id, name, failed,
+                      settings.sync_dead_letter_backoff, settings.sync_dead_letter_backoff_max)
+    return result
+
+async def run_pipeline(
+    symbols: List[str],
+    stages: Optional[List[str]] = None,
+    concurrency: Optional[int] = None,
+    force_refresh: bool = False,
+    periods: Optional[List[str]] = None,
+    session_factory: Callable = AsyncSessionLocal,
+    fmp_client: Optional[FMPClient] = None,
+    checkpoint: bool = True,
+    resume: Optional[int] = None,
+    trigger: str = "manual",
+) -> Dict[str, Any]:
+    """
+    Run the selected sync stages and return a JSON-serializable run report.
+    Each stage starts as soon as its selected dependencies have succeeded, so the
+    wall time approaches the longest dependency chain rather than the sum of stages.
+    A stage whose dependency failed is skipped. All stages share one FMP client, one
+    bound on in-flight symbols and one CompanyResolver. periods narrows the period
+    types of the financial stages (default: settings.fmp_sync_periods).
+
+    With checkpoint the run is recorded in sync_runs and every symbol's outcome per
+    stage in sync_checkpoints; resume=<run id> continues that run, skipping what it
+    already synced. Dead-lettered symbols whose backoff has passed join their stage.
+    trigger marks who started the run; only manual runs are resumed by default.
+    """
+    stages = stages or list(STAGE_DEPENDENCIES)
+    unknown = [s for s in stages if s not in STAGE_DEPENDENCIES]
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(unknown)}")
+
+    report: Dict[str, Any] = {
+        "symbols": symbols,
+        "stages": {},
+        "started_at": _utc_now(),
+    }
+    semaphore = asyncio.Semaphore(concurrency or settings.sync_concurrency)
+    started = time.perf_counter()
+
+    run_id = resume
+    if checkpoint and run_id is None:
+        run_id = await _record(session_factory, create_sync_run, symbols, stages, periods, force_refresh, trigger)
+    report["run_id"] = run_id
+
+    async with fmp_session(fmp_client) as client:
+        resolver = CompanyResolver(symbols, client)
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str) -> Dict[str, Any]:
+            for dependency in STAGE_DEPENDENCIES[name]:
+                if dependency in tasks and (await tasks[dependency])["status"] != "succeeded":
+                    logger.warning(f"Skipping {name}: dependency {dependency} did not succeed")
+                    return {"status": "skipped", "reason": f"{dependency} did not succeed"}
+
+            kwargs = {"fmp_client": client, "concurrency": semaphore, "resolver": resolver}
+            if name != "profiles":
+                kwargs["force_refresh"] = force_refresh
+            if name in PERIOD_DATASETS and periods:
+                kwargs["periods"] = periods
+            outcome: Dict[str, Any] = {"started_at": _utc_now()}
+            stage_start = time.perf_counter()
+            logger.info(f"Stage {name} started")
+            try:
+                stage_symbols, resumed = symbols, 0
+                if run_id is not None:
+                    done = await _record(session_factory, get_checkpointed, run_id, name)
+                    due = await _record(session_factory, get_due_dead_letters, name,
+                                        settings.sync_dead_letter_max_failures)
+                    stage_symbols = [s for s in dict.fromkeys([*symbols, *due]) if s not in done]
+                    resumed = len(done)
+                result = await _stage_with_retries(name, stage_symbols, kwargs, session_factory, run_id)
+                result["resumed"] = resumed
+                outcome.update(status="succeeded", result=result)
+            except Exception as e:
+                logger.error(f"Stage {name} failed: {str(e)}")
+                outcome.update(status="failed", error=str(e))
+            outcome["seconds"] = round(time.perf_counter() - stage_start, 3)
+            logger.info(f"Stage {name} {outcome['status']} in {outcome['seconds']}s")
+            return outcome
+
+        # dict order of STAGE_DEPENDENCIES lists every stage after its dependencies
+        for name in STAGE_DEPENDENCIES:
+            if name in stages:
+                tasks[name] = asyncio.create_task(run_stage(name))
+        for name, task in tasks.items():
+            report["stages"][name] = await task
+
+    outcomes = report["stages"].values()
+    report["finished_at"] = _utc_now()
+    report["wall_seconds"] = round(time.perf_counter() - started, 3)
+    report["stage_seconds_total"] = round(sum(o.get("seconds", 0) for o in outcomes), 3)
+    if all(o["status"] == "succeeded" and not o["result"]["failed"] for o in outcomes):
+        report["status"] = "succeeded"
+    elif any(o["status"] == "succeeded" for o in outcomes):
+        report["status"] = "partial"
+    else:
+        report["status"] = "failed"
+    if run_id is not None:
+        await _record(session_factory, finish_sync_run, run_id, report["status"], report)
+    return report
+
+async def resume_pipeline(
+    run_id: Optional[int] = None,
+    session_factory: Callable = AsyncSessionLocal,
+    fmp_client: Optional[FMPClient] = None,
+    concurrency: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Continue a recorded run with its own symbols and options; by default the newest manual one still running."""
+    async with session_factory() as db:
+        run = await run_db(db, get_sync_run, run_id) if run_id is not None else await run_db(db, get_unfinished_run)
+    if run is None:
+        raise ValueError(f"No sync run {run_id}" if run_id is not None else "No unfinished sync run to resume")
+    logger.info(f"Resuming sync run {run.id} ({len(run.symbols)} symbols, stages {', '.join(run.stages)})")
+    return await run_pipeline(
+        run.symbols,
+        stages=run.stages,
+        concurrency=concurrency,
+        force_refresh=run.force_refresh,
+        periods=run.periods,
+        session_factory=session_factory,
+        fmp_client=fmp_client,
+        resume=run.id,
+    )
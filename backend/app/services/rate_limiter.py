@@ -0,0 +1,202 @@
+# shared request budget for the FMP API: token bucket, backoff and Retry-After handling
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+from app.core.cache import connect_redis
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """
+    Async token bucket shared by every FMPClient in the process.
+    Each acquire() reserves a token up front, letting the balance go negative, and
+    sleeps until its reservation is covered, so waiters are served in arrival order
+    without holding a lock across awaits. pause() holds back every caller until a
+    provider-imposed Retry-After has passed.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        burst: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = requests_per_minute / 60.0  # tokens per second; 0 disables limiting
+        self.burst = burst or max(1, int(self.rate))
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def try_acquire(self) -> bool:
+        """
+        Take a token only if one is available now, for callers that would rather skip than
+        wait. Works on this process's balance, so it is meant for in-process buckets.
+        """
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1 or self._paused_until > now:
+                return False
+            self._tokens -= 1
+            return True
+
+    async def acquire(self) -> float:
+        """Wait for a token; returns the seconds spent throttled."""
+        wait = await self._reserve_async()
+        if wait > 0:
+            metrics.incr("fmp_throttled_seconds_total", wait, reason="rate_limit")
+            await asyncio.sleep(wait)
+        return wait
+
+    async def _reserve_async(self) -> float:
+        """reserve() as acquire() awaits it; buckets whose state is remote override it."""
+        return self.reserve()
+
+    def pause(self, seconds: float):
+        """Hold back all callers for `seconds` (a Retry-After from the provider)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    async def pause_async(self, seconds: float):
+        """pause() for coroutines."""
+        self.pause(seconds)
+
+class RedisTokenBucket(TokenBucket):
+    """
+    The same token bucket kept in Redis, so every process and node syncing from FMP
+    draws on one plan budget. Reservations run as a script against the server clock;
+    a Retry-After pause is stored alongside and holds back every holder of the bucket.
+    The client is synchronous, so the async paths run its round trips in a worker thread.
+    """
+
+    KEY = "foresight:fmp:rate_limit"
+
+    RESERVE_SCRIPT = """
+    local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate) - 1
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], 3600)
+    local wait = 0
+    if tokens < 0 then wait = -tokens / rate end
+    local paused_until = tonumber(redis.call('GET', KEYS[2]) or '0')
+    return tostring(math.max(wait, paused_until - now))
+    """
+
+    PAUSE_SCRIPT = """
+    local time = redis.call('TIME')
+    local resume = tonumber(time[1]) + tonumber(time[2]) / 1000000 + tonumber(ARGV[1])
+    if resume > tonumber(redis.call('GET', KEYS[1]) or '0') then
+        redis.call('SET', KEYS[1], tostring(resume), 'PX', math.ceil(tonumber(ARGV[1]) * 1000) + 1)
+    end
+    return 0
+    """
+
+    def __init__(self, client, requests_per_minute: float, burst: Optional[int] = None):
+        super().__init__(requests_per_minute, burst)
+        self.client = client
+        self._reserve = client.register_script(self.RESERVE_SCRIPT)
+        self._pause = client.register_script(self.PAUSE_SCRIPT)
+
+    def reserve(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        return max(0.0, float(self._reserve(keys=[self.KEY, f"{self.KEY}:paused"], args=[self.rate, self.burst])))
+
+    async def _reserve_async(self) -> float:
+        return await asyncio.to_thread(self.reserve)
+
+    def pause(self, seconds: float):
+        self._pause(keys=[f"{self.KEY}:paused"], args=[seconds])
+
+    async def pause_async(self, seconds: float):
+        await asyncio.to_thread(self.pause, seconds)
+
+def requests_per_minute() -> float:
+    """The configured FMP budget: explicit override, else the plan tier's published limit."""
+    if settings.fmp_requests_per_minute is not None:
+        return settings.fmp_requests_per_minute
+    if settings.fmp_plan_tier == "free":
+        return 60 / settings.fmp_rate_limit_delay
+    try:
+        return settings.fmp_plan_rate_limits[settings.fmp_plan_tier]
+    except KeyError:
+        raise ValueError(f"Unknown FMP plan tier: {settings.fmp_plan_tier}")
+
+def backoff_delay(attempt: int, base: Optional[float] = None, cap: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter: uniform over [0, min(cap, base * 2**attempt)]."""
+    base = settings.fmp_backoff_base if base is None else base
+    cap = settings.fmp_backoff_max if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, given as delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def _build_limiter() -> TokenBucket:
+    if settings.fmp_rate_limit_backend == "redis":
+        try:
+            limiter = RedisTokenBucket(connect_redis(), requests_per_minute(), settings.fmp_rate_limit_burst)
+            logger.info("FMP rate limit shared through Redis")
+            return limiter
+        except Exception as e:
+            logger.warning(f"Redis unavailable ({e}); FMP rate limit is per process")
+    return TokenBucket(requests_per_minute(), settings.fmp_rate_limit_burst)
+
+_limiter: Optional[TokenBucket] = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> TokenBucket:
+    """Process-wide limiter, sized from settings on first use."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = _build_limiter()
+    return _limiter
+
+def set_rate_limiter(limiter: Optional[TokenBucket]):
+    """Swap the process-wide limiter (tests, benchmarks against the local stub)."""
+    global _limiter
+    _limiter = limiter
@@ -0,0 +1,319 @@
+# background sync scheduler: cron schedules per job, one runner per job across replicas
+
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, run_db
+from app.core.metrics import metrics
+from app.crud.crud_company import get_company_symbols
+from app.crud.crud_sync_runs import prune_sync_runs
+from app.services.business_service import PERIOD_DATASETS
+from app.services.pipeline import run_pipeline
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "foresight:scheduler"
+
+# job -> pipeline stages it runs; schedules come from settings.scheduler_jobs
+JOB_STAGES: Dict[str, List[str]] = {
+    "profiles": ["profiles"],
+    "financials": list(PERIOD_DATASETS),
+    "news": ["news"],
+}
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+class CronSchedule:
+    """
+    Five-field cron expression (minute hour day-of-month month day-of-week) in UTC.
+    Fields take *, numbers, a-b ranges, comma lists and /step. Sunday is 0 or 7.
+    As in cron, a day matches when either day field matches if both are restricted.
+    """
+
+    FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day of month", 1, 31), ("month", 1, 12), ("day of week", 0, 7))
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(parts)}: {expression!r}")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(part, *field) for part, field in zip(parts, self.FIELDS)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(part: str, name: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+        for item in part.split(","):
+            span, _, step = item.partition("/")
+            try:
+                step = int(step) if step else 1
+                if span == "*":
+                    start, end = low, high
+                elif "-" in span:
+                    start, end = (int(v) for v in span.split("-", 1))
+                else:
+                    start = end = int(span)
+                    if step > 1:  # "5/15" means from 5 to the end of the range
+                        end = high
+            except ValueError:
+                raise ValueError(f"Invalid {name} field: {part!r}") from None
+            if step < 1 or not low <= start <= end <= high:
+                raise ValueError(f"Invalid {name} field: {part!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_month = moment.day in self.days
+        in_week = moment.isoweekday() % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, moment: datetime) -> datetime:
+        """The first matching minute strictly after moment."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)  # e.g. "0 0 30 2 *" never matches
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+class Job:
+    """A named set of pipeline stages on a cron schedule."""
+
+    def __init__(self, name: str, schedule: str, stages: Optional[List[str]] = None):
+        if stages is None and name not in JOB_STAGES:
+            raise ValueError(f"Unknown job {name!r}; expected one of {', '.join(JOB_STAGES)}")
+        self.name = name
+        self.schedule = CronSchedule(schedule)
+        self.stages = stages or JOB_STAGES[name]
+
+def configured_jobs() -> Dict[str, Job]:
+    return {name: Job(name, schedule) for name, schedule in settings.scheduler_jobs.items()}
+
+class Scheduler:
+    """
+    Runs each job's pipeline stages at its scheduled minutes, delayed by a random jitter
+    so replicas and jobs do not hit FMP at the same instant. Every replica schedules
+    every job; the one that claims a run's slot key in the cache backend runs it, and a
+    renewed lease keeps a second replica from starting the job while it is still going.
+    With the in-process cache fallback the claims are per process. Each run's outcome
+    is stored in the backend as well, so /admin/jobs shows runs from every replica.
+    """
+
+    def __init__(
+        self,
+        jobs: Optional[Dict[str, Job]] = None,
+        session_factory: Callable = AsyncSessionLocal,
+        backend=None,
+        now: Callable[[], datetime] = _utc_now,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ):
+        self.jobs = jobs if jobs is not None else configured_jobs()
+        self.session_factory = session_factory
+        self._backend = backend
+        self._now = now
+        self._sleep = sleep
+        self.runner_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._next_runs: Dict[str, datetime] = {}
+        self._running: Set[str] = set()
+        self._stats: Dict[str, Dict[str, Any]] = {}  # this process's copy, for when the backend has none
+
+    @property
+    def backend(self):
+        return self._backend or get_cache()
+
+    def start(self):
+        for name in self.jobs:
+            if name not in self._tasks:
+                self._tasks[name] = asyncio.get_running_loop().create_task(self._loop(self.jobs[name]))
+        logger.info(f"Scheduler started with jobs {', '.join(self.jobs)}")
+
+    async def stop(self):
+        """Cancel the job loops, including runs in progress (app shutdown)."""
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _loop(self, job: Job):
+        while True:
+            slot = job.schedule.next_after(self._now())
+            self._next_runs[job.name] = slot
+            delay = (slot - self._now()).total_seconds() + random.uniform(0, settings.scheduler_jitter)
+            await self._sleep(max(0.0, delay))
+            try:
+                await self.run_job(job.name, slot)
+            except Exception as e:
+                logger.error(f"Scheduled job {job.name} crashed: {str(e)}")
+
+    async def _symbols(self) -> List[str]:
+        """Every company in the database, so symbols added by fetch-through stay fresh too."""
+        async with self.session_factory() as db:
+            known = await run_db(db, get_company_symbols)
+        return list(dict.fromkeys([*settings.FAANG_SYMBOLS, *known]))
+
+    async def _prune_runs(self):
+        """Keep only the newest scheduled runs in sync_runs; every slot records one."""
+        try:
+            async with self.session_factory() as db:
+                pruned = await run_db(db, prune_sync_runs, "scheduled", settings.scheduler_runs_kept)
+        except Exception as e:
+            logger.warning(f"Pruning scheduled sync runs failed: {e}")
+            return
+        if pruned:
+            logger.info(f"Pruned {pruned} scheduled sync runs")
+
+    async def _hold(self, key: str, token: str):
+        """Renew the job's lease until cancelled."""
+        while True:
+            await asyncio.sleep(settings.scheduler_lease_ttl / 3)
+            try:
+                if not self.backend.extend(key, token, settings.scheduler_lease_ttl):
+                    logger.warning(f"Lost the lease {key}; another replica may start the job")
+                    return
+            except Exception as e:
+                logger.warning(f"Lease renewal failed for {key}: {e}")
+
+    async def run_job(self, name: str, slot: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Run a job for one scheduled slot (default: now, a manual run) unless another
+        replica already claimed the slot or is still running the job. Returns the run
+        record, or None when the run was left to someone else.
+        """
+        job = self.jobs[name]
+        slot = slot or self._now().replace(second=0, microsecond=0)
+        backend = self.backend
+        try:
+            claimed = backend.acquire(f"{KEY_PREFIX}:{name}:slot:{slot.isoformat()}", settings.scheduler_lease_ttl)
+            lease_key = f"{KEY_PREFIX}:{name}:lease"
+            token = backend.acquire(lease_key, settings.scheduler_lease_ttl) if claimed else None
+        except Exception as e:
+            logger.error(f"Scheduler could not take the lease for {name}: {e}")
+            metrics.incr("scheduler_runs_total", job=name, status="lease_error")
+            return None
+        if not claimed:
+            metrics.incr("scheduler_runs_total", job=name, status="claimed_elsewhere")
+            return None
+        if token is None:
+            logger.warning(f"Skipping {name} at {slot.isoformat()}: the previous run is still going")
+            metrics.incr("scheduler_runs_total", job=name, status="overlapping")
+            return None
+
+        heartbeat = asyncio.create_task(self._hold(lease_key, token))
+        self._running.add(name)
+        run: Dict[str, Any] = {
+            "slot": slot.isoformat(),
+            "started_at": self._now().isoformat(),
+            "runner": self.runner_id,
+            "status": "cancelled",  # until the pipeline returns; shutdown cancels runs in progress
+            "rows": 0,
+        }
+        started = time.perf_counter()
+        logger.info(f"Scheduled job {name} started")
+        try:
+            report = await run_pipeline(
+                await self._symbols(), stages=job.stages, session_factory=self.session_factory, trigger="scheduled",
+            )
+            await self._prune_runs()
+            outcomes = report["stages"].values()
+            results = [o["result"] for o in outcomes if o["status"] == "succeeded"]
+            run.update(
+                status=report["status"],
+                symbols=len(report["symbols"]),
+                rows=sum(result["rows"] for result in results),
+                failed_symbols=sum(len(result["failed"]) for result in results),
+                failed_stages=[stage for stage, o in report["stages"].items() if o["status"] != "succeeded"],
+            )
+        except Exception as e:
+            logger.error(f"Scheduled job {name} failed: {str(e)}")
+            run.update(status="failed", error=str(e))
+        finally:
+            heartbeat.cancel()
+            self._running.discard(name)
+            run["finished_at"] = self._now().isoformat()
+            run["seconds"] = round(time.perf_counter() - started, 3)
+            # still under the lease, so the read-modify-write of the totals is not racing another replica
+            self._record(name, run)
+            try:
+                backend.release(lease_key, token)
+            except Exception as e:
+                logger.warning(f"Lease release failed for {name}: {e}")
+        logger.info(f"Scheduled job {name} {run['status']} in {run['seconds']}s, {run['rows']} rows")
+        metrics.incr("scheduler_runs_total", job=name, status=run["status"])
+        metrics.observe("scheduler_run_seconds", run["seconds"], job=name)
+        return run
+
+    def _load_stats(self, name: str) -> Dict[str, Any]:
+        try:
+            stored = self.backend.get(f"{KEY_PREFIX}:{name}:stats")
+        except Exception as e:
+            logger.warning(f"Reading scheduler stats for {name} failed: {e}")
+            stored = None
+        if stored is not None:
+            return json.loads(stored)
+        return self._stats.get(name, {"runs": 0, "failures": 0, "last_run": None, "last_failure": None})
+
+    def _record(self, name: str, run: Dict[str, Any]):
+        stats = self._load_stats(name)
+        stats["runs"] += 1
+        stats["last_run"] = run
+        if run["status"] != "succeeded":
+            stats["failures"] += 1
+            stats["last_failure"] = run
+        self._stats[name] = stats
+        try:
+            self.backend.set(f"{KEY_PREFIX}:{name}:stats", json.dumps(stats), settings.scheduler_stats_ttl)
+        except Exception as e:
+            logger.warning(f"Storing scheduler stats for {name} failed: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        """Per job: schedule, next run on this replica, totals and the last run across replicas."""
+        jobs = {}
+        for name, job in self.jobs.items():
+            next_run = self._next_runs.get(name) or job.schedule.next_after(self._now())
+            jobs[name] = {
+                "schedule": job.schedule.expression,
+                "stages": job.stages,
+                "next_run_at": next_run.isoformat(),
+                "running_here": name in self._running,
+                **self._load_stats(name),
+            }
+        return {"enabled": bool(self._tasks), "runner": self.runner_id, "jobs": jobs}
+
+_scheduler: Optional[Scheduler] = None
+
+def get_scheduler() -> Scheduler:
+    """Process-wide scheduler, created on first use (it only runs jobs once started)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler()
+    return _scheduler
+
+def set_scheduler(scheduler: Optional[Scheduler]):
+    global _scheduler
+    _scheduler = scheduler
@@ -0,0 +1,391 @@
+# sharded sync: a producer enqueues (symbol, dataset) tasks, any number of worker processes consume them
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from app.core.cache import connect_redis
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, run_db
+from app.core.metrics import metrics
+from app.crud.crud_company import get_company_symbols
+from app.services.business_service import SYNC_FUNCTIONS
+from app.services.company_resolver import CompanyResolver
+from app.services.fmp_client import FMPClient
+from app.services.pipeline import STAGE_DEPENDENCIES
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "foresight:queue"
+
+def task_id(dataset: str, symbol: str) -> str:
+    return f"{dataset}:{symbol}"
+
+def parse_task(task: str) -> Tuple[str, str]:
+    dataset, _, symbol = task.partition(":")
+    return dataset, symbol
+
+class InMemoryBroker:
+    """
+    The queue in one process, for tests and single-process runs. Tasks move between a
+    ready list and an in-flight set ordered by when each becomes visible again: a
+    claimed task after its visibility timeout, a failed one after its retry delay.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._ready: deque = deque()
+        self._in_flight: Dict[str, float] = {}  # task -> when it becomes claimable again
+        self._queued: set = set()  # ready or in flight, so re-enqueueing does not duplicate
+        self._attempts: Dict[str, int] = {}
+        self._dead: List[Dict[str, Any]] = []
+        self._stats: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, value: int = 1):
+        self._stats[name] = self._stats.get(name, 0) + value
+
+    def enqueue(self, tasks: Iterable[str]) -> int:
+        with self._lock:
+            added = 0
+            for task in tasks:
+                if task not in self._queued:
+                    self._queued.add(task)
+                    self._ready.append(task)
+                    added += 1
+            self._count("enqueued", added)
+            return added
+
+    def claim(self, count: int, visibility_timeout: float) -> List[Tuple[str, int]]:
+        """Up to count (task, attempt) pairs, invisible to other workers for visibility_timeout."""
+        with self._lock:
+            now = self._clock()
+            for task, visible_at in sorted(self._in_flight.items(), key=lambda item: item[1]):
+                if visible_at > now:
+                    break
+                del self._in_flight[task]
+                self._ready.append(task)
+            claimed = []
+            while self._ready and len(claimed) < count:
+                task = self._ready.popleft()
+                self._in_flight[task] = now + visibility_timeout
+                self._attempts[task] = self._attempts.get(task, 0) + 1
+                claimed.append((task, self._attempts[task]))
+            return claimed
+
+    def ack(self, tasks: List[str], rows: int = 0):
+        with self._lock:
+            for task in tasks:
+                self._in_flight.pop(task, None)
+                self._queued.discard(task)
+                self._attempts.pop(task, None)
+            self._count("succeeded", len(tasks))
+            self._count("rows", rows)
+
+    def fail(self, task: str, error: str, max_attempts: int, retry_delay: float) -> str:
+        """Retry the task after retry_delay * 2**(attempts - 1), or dead-letter it; returns which."""
+        with self._lock:
+            attempts = self._attempts.get(task, 0)
+            if attempts >= max_attempts:
+                self._in_flight.pop(task, None)
+                self._queued.discard(task)
+                self._attempts.pop(task, None)
+                self._dead.append({
+                    "task": task,
+                    "error": error,
+                    "attempts": attempts,
+                    "failed_at": datetime.now(timezone.utc).isoformat(),
+                })
+                self._count("dead")
+                return "dead"
+            self._in_flight[task] = self._clock() + retry_delay * 2 ** max(0, attempts - 1)
+            self._count("retried")
+            return "retried"
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._dead)
+
+    def requeue_dead(self) -> int:
+        """Give every dead-lettered task a fresh set of attempts."""
+        with self._lock:
+            tasks = [entry["task"] for entry in self._dead]
+            self._dead.clear()
+        return self.enqueue(tasks)
+
+    def progress(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "ready": len(self._ready),
+                "in_flight": len(self._in_flight),
+                "dead": len(self._dead),
+                **{name: self._stats.get(name, 0) for name in ("enqueued", "succeeded", "retried", "rows")},
+            }
+
+    def clear(self):
+        with self._lock:
+            self._ready.clear()
+            self._in_flight.clear()
+            self._queued.clear()
+            self._attempts.clear()
+            self._dead.clear()
+            self._stats.clear()
+
+class RedisBroker:
+    """
+    The same queue in Redis, shared by workers on any number of nodes. The in-flight
+    set is a sorted set scored by the server time at which each task becomes visible
+    again; claims and failures are scripts, so two workers never take the same task.
+    """
+
+    ENQUEUE_SCRIPT = """
+    local added = 0
+    for _, task in ipairs(ARGV) do
+        if redis.call('SADD', KEYS[2], task) == 1 then
+            redis.call('RPUSH', KEYS[1], task)
+            added = added + 1
+        end
+    end
+    redis.call('HINCRBY', KEYS[3], 'enqueued', added)
+    return added
+    """
+
+    CLAIM_SCRIPT = """
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    for _, task in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', tostring(now))) do
+        redis.call('ZREM', KEYS[2], task)
+        redis.call('RPUSH', KEYS[1], task)
+    end
+    local claimed = {}
+    for _ = 1, tonumber(ARGV[1]) do
+        local task = redis.call('LPOP', KEYS[1])
+        if not task then break end
+        redis.call('ZADD', KEYS[2], tostring(now + tonumber(ARGV[2])), task)
+        table.insert(claimed, task)
+        table.insert(claimed, redis.call('HINCRBY', KEYS[3], task, 1))
+    end
+    return claimed
+    """
+
+    FAIL_SCRIPT = """
+    local attempts = tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or '0')
+    if attempts >= tonumber(ARGV[2]) then
+        redis.call('ZREM', KEYS[1], ARGV[1])
+        redis.call('SREM', KEYS[2], ARGV[1])
+        redis.call('HDEL', KEYS[3], ARGV[1])
+        redis.call('RPUSH', KEYS[5], cjson.encode({task=ARGV[1], error=ARGV[4], attempts=attempts, failed_at=ARGV[5]}))
+        redis.call('HINCRBY', KEYS[4], 'dead', 1)
+        return 'dead'
+    end
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    redis.call('ZADD', KEYS[1], tostring(now + tonumber(ARGV[3]) * 2 ^ math.max(0, attempts - 1)), ARGV[1])
+    redis.call('HINCRBY', KEYS[4], 'retried', 1)
+    return 'retried'
+    """
+
+    def __init__(self, client, prefix: str = KEY_PREFIX):
+        self.client = client
+        self.ready, self.in_flight, self.queued = f"{prefix}:ready", f"{prefix}:in_flight", f"{prefix}:queued"
+        self.attempts, self.stats, self.dead = f"{prefix}:attempts", f"{prefix}:stats", f"{prefix}:dead"
+        self._enqueue = client.register_script(self.ENQUEUE_SCRIPT)
+        self._claim = client.register_script(self.CLAIM_SCRIPT)
+        self._fail = client.register_script(self.FAIL_SCRIPT)
+
+    def enqueue(self, tasks: Iterable[str]) -> int:
+        tasks = list(tasks)
+        added = 0
+        for start in range(0, len(tasks), 1000):  # bounded script arguments for large universes
+            added += self._enqueue(keys=[self.ready, self.queued, self.stats], args=tasks[start:start + 1000])
+        return added
+
+    def claim(self, count: int, visibility_timeout: float) -> List[Tuple[str, int]]:
+        flat = self._claim(keys=[self.ready, self.in_flight, self.attempts], args=[count, visibility_timeout])
+        return [(task.decode(), int(attempt)) for task, attempt in zip(flat[::2], flat[1::2])]
+
+    def ack(self, tasks: List[str], rows: int = 0):
+        if not tasks:
+            return
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zrem(self.in_flight, *tasks)
+        pipe.srem(self.queued, *tasks)
+        pipe.hdel(self.attempts, *tasks)
+        pipe.hincrby(self.stats, "succeeded", len(tasks))
+        pipe.hincrby(self.stats, "rows", rows)
+        pipe.execute()
+
+    def fail(self, task: str, error: str, max_attempts: int, retry_delay: float) -> str:
+        keys = [self.in_flight, self.queued, self.attempts, self.stats, self.dead]
+        failed_at = datetime.now(timezone.utc).isoformat()
+        outcome = self._fail(keys=keys, args=[task, max_attempts, retry_delay, error, failed_at])
+        return outcome.decode() if isinstance(outcome, bytes) else outcome
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        return [json.loads(entry) for entry in self.client.lrange(self.dead, 0, -1)]
+
+    def requeue_dead(self) -> int:
+        pipe = self.client.pipeline(transaction=True)
+        pipe.lrange(self.dead, 0, -1)
+        pipe.delete(self.dead)
+        entries, _ = pipe.execute()
+        return self.enqueue(json.loads(entry)["task"] for entry in entries)
+
+    def progress(self) -> Dict[str, int]:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.llen(self.ready)
+        pipe.zcard(self.in_flight)
+        pipe.llen(self.dead)
+        pipe.hgetall(self.stats)
+        ready, in_flight, dead, stats = pipe.execute()
+        stats = {k.decode(): int(v) for k, v in stats.items()}
+        return {
+            "ready": ready,
+            "in_flight": in_flight,
+            "dead": dead,
+            **{name: stats.get(name, 0) for name in ("enqueued", "succeeded", "retried", "rows")},
+        }
+
+    def clear(self):
+        self.client.delete(self.ready, self.in_flight, self.queued, self.attempts, self.stats, self.dead)
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    """
+    Process-wide broker. Unlike the response cache there is no silent fallback: a queue
+    private to one process would drop every task when it exits, so Redis must answer.
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = RedisBroker(connect_redis()) if settings.work_queue_backend == "redis" else InMemoryBroker()
+    return _broker
+
+def set_broker(broker):
+    global _broker
+    _broker = broker
+
+async def produce(
+    broker,
+    symbols: Optional[List[str]] = None,
+    datasets: Optional[List[str]] = None,
+    session_factory: Callable = AsyncSessionLocal,
+) -> int:
+    """
+    Enqueue a (symbol, dataset) task for each pair; returns how many were new, since
+    tasks still queued are not added twice. Symbols default to every company in the
+    database plus settings.FAANG_SYMBOLS. Profiles go first, so workers usually create
+    a company from its profile before its financial tasks are claimed.
+    """
+    datasets = datasets or list(STAGE_DEPENDENCIES)
+    unknown = [d for d in datasets if d not in SYNC_FUNCTIONS]
+    if unknown:
+        raise ValueError(f"Unknown datasets: {', '.join(unknown)}")
+    if symbols is None:
+        async with session_factory() as db:
+            symbols = list(dict.fromkeys([*settings.FAANG_SYMBOLS, *await run_db(db, get_company_symbols)]))
+    added = broker.enqueue(
+        task_id(dataset, symbol) for dataset in STAGE_DEPENDENCIES if dataset in datasets for symbol in symbols
+    )
+    metrics.incr("work_queue_tasks_total", added, result="enqueued")
+    logger.info(f"Enqueued {added} sync tasks for {len(symbols)} symbols and {len(datasets)} datasets")
+    return added
+
+class SyncWorker:
+    """
+    Claims batches of tasks and runs them through the sync functions with its own FMP
+    client and a session per dataset. The tasks of one claim are grouped by dataset, so
+    profile and news tasks still share multi-symbol FMP requests, and profiles run
+    before the claim's other datasets. A failed symbol is retried with backoff until
+    settings.work_queue_max_attempts, then dead-lettered. With a shared FMP budget
+    (fmp_rate_limit_backend="redis") throughput grows with workers until the plan's
+    rate limit is reached.
+    """
+
+    def __init__(
+        self,
+        broker,
+        session_factory: Callable = AsyncSessionLocal,
+        fmp_client: Optional[FMPClient] = None,
+        claim_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ):
+        self.broker = broker
+        self.session_factory = session_factory
+        self.fmp_client = fmp_client
+        self.claim_size = claim_size or settings.work_queue_claim_size
+        self.concurrency = concurrency or settings.sync_concurrency
+        self.processed = {"succeeded": 0, "retried": 0, "dead": 0, "rows": 0}
+
+    async def run(self, drain: bool = False) -> Dict[str, int]:
+        """Work until cancelled, or with drain=True until nothing is ready or in flight."""
+        if self.fmp_client is not None:
+            return await self._work(self.fmp_client, drain)
+        async with FMPClient(api_key=settings.fmp_api_key) as client:
+            return await self._work(client, drain)
+
+    async def _work(self, client: FMPClient, drain: bool) -> Dict[str, int]:
+        while True:
+            claimed = self.broker.claim(self.claim_size, settings.work_queue_visibility_timeout)
+            if claimed:
+                await self.process(client, claimed)
+                continue
+            if drain:
+                progress = self.broker.progress()
+                if not progress["ready"] and not progress["in_flight"]:
+                    return self.processed
+            await asyncio.sleep(settings.work_queue_poll_interval)
+
+    async def process(self, client: FMPClient, claimed: List[Tuple[str, int]]):
+        groups: Dict[str, List[str]] = {}
+        for task, _ in claimed:
+            dataset, symbol = parse_task(task)
+            groups.setdefault(dataset, []).append(symbol)
+        resolver = CompanyResolver([symbol for symbols in groups.values() for symbol in symbols], client)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        if "profiles" in groups:
+            await self._sync(client, "profiles", groups.pop("profiles"), semaphore, resolver)
+        await asyncio.gather(*(
+            self._sync(client, dataset, symbols, semaphore, resolver) for dataset, symbols in groups.items()
+        ))
+
+    async def _sync(self, client: FMPClient, dataset: str, symbols: List[str], semaphore, resolver):
+        started = time.perf_counter()
+        kwargs = {"fmp_client": client, "concurrency": semaphore, "resolver": resolver}
+        try:
+            if dataset not in SYNC_FUNCTIONS:
+                raise ValueError(f"Unknown dataset: {dataset}")
+            async with self.session_factory() as db:
+                result = await SYNC_FUNCTIONS[dataset](db, symbols, **kwargs)
+            failed = result["failed"]
+            rows = result["rows"]
+        except Exception as e:
+            logger.error(f"Sync of {dataset} for {len(symbols)} symbols failed: {str(e)}")
+            failed = {symbol: str(e) for symbol in symbols}
+            rows = 0
+
+        self.broker.ack([task_id(dataset, s) for s in symbols if s not in failed], rows)
+        succeeded = len(symbols) - len(failed)
+        self.processed["succeeded"] += succeeded
+        self.processed["rows"] += rows
+        metrics.incr("work_queue_tasks_total", succeeded, dataset=dataset, result="succeeded")
+        for symbol, error in failed.items():
+            outcome = self.broker.fail(task_id(dataset, symbol), error, settings.work_queue_max_attempts,
+                                       settings.work_queue_retry_delay)
+            if outcome == "dead":
+                logger.warning(f"Dead-lettered {dataset} for {symbol}: {error}")
+            self.processed[outcome] += 1
+            metrics.incr("work_queue_tasks_total", dataset=dataset, result=outcome)
+        metrics.observe("work_queue_batch_seconds", time.perf_counter() - started, dataset=dataset)
+
+async def run_workers(broker, count: int, drain: bool = False, **options) -> List[Dict[str, int]]:
+    """Run count workers in this process, each with its own FMP client."""
+    return await asyncio.gather(*(SyncWorker(broker, **options).run(drain=drain) for _ in range(count)))
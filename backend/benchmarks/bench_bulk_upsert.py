@@ -0,0 +1,101 @@
+# Row-at-a-time vs. set-based upsert of income statements.
+# run with command: python benchmarks/bench_bulk_upsert.py --rows 10000 1000000
+# pass --database-url postgresql://... to benchmark against PostgreSQL instead of SQLite.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.crud.crud_financials import bulk_upsert
+from app.models.company import Company
+from app.models.financials import IncomeStatement
+
+def legacy_upsert(db, statements):
+    """The pre-bulk implementation: one SELECT per row, ORM add/setattr, one commit."""
+    for data_dict in statements:
+        existing = db.query(IncomeStatement).filter_by(
+            symbol=data_dict['symbol'],
+            date=data_dict['date'],
+            period=data_dict['period']
+        ).first()
+        if existing:
+            for key, value in data_dict.items():
+                if hasattr(existing, key):
+                    setattr(existing, key, value)
+        else:
+            db.add(IncomeStatement(**data_dict))
+    db.commit()
+
+def synthetic_rows(count, revision=0):
+    """Quarterly history, 40 quarters per symbol, shaped like the sync payloads."""
+    rows = []
+    for i in range(count):
+        symbol = f"S{i // 40:05d}"
+        quarter = i % 40
+        revenue = 1_000_000 * (quarter + 1) + revision
+        rows.append({
+            "symbol": symbol,
+            "date": date(2024, 12, 31) - timedelta(days=91 * quarter),
+            "fiscal_year": str(2024 - quarter // 4),
+            "period": f"Q{4 - quarter % 4}",
+            "reported_currency": "USD",
+            "revenue": revenue,
+            "cost_of_revenue": revenue / 2,
+            "gross_profit": revenue / 2,
+            "operating_expenses": revenue / 5,
+            "operating_income": revenue / 4,
+            "net_income": revenue / 6,
+            "eps": 1.2345,
+            "eps_diluted": 1.2,
+            "ebitda": revenue / 3,
+            "ebit": revenue / 4,
+        })
+    return rows
+
+def timed(label, fn, rows):
+    start = time.perf_counter()
+    fn(rows)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:9.2f} s  {len(rows) / elapsed:12,.0f} rows/s")
+    return elapsed
+
+def run(database_url, count, legacy_max, batch_size):
+    engine = create_engine(database_url)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    print(f"\n{count:,} rows")
+    for label, fn in (("legacy", legacy_upsert), ("bulk", lambda db, rows: bulk_upsert(db, IncomeStatement, rows, batch_size))):
+        if label == "legacy" and count > legacy_max:
+            print(f"  legacy skipped (> --legacy-max {legacy_max:,}); it scales linearly with rows")
+            continue
+        Base.metadata.drop_all(bind=engine, tables=[IncomeStatement.__table__])
+        Base.metadata.create_all(bind=engine, tables=[Company.__table__, IncomeStatement.__table__])
+        db = Session()
+        try:
+            timed(f"{label} insert", lambda rows: fn(db, rows), synthetic_rows(count))
+            timed(f"{label} update", lambda rows: fn(db, rows), synthetic_rows(count, revision=1))
+        finally:
+            db.close()
+    engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Legacy vs. bulk upsert benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--legacy-max", type=int, default=100_000,
+                        help="largest row count to run the row-at-a-time path on")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        for count in args.rows:
+            run(url, count, args.legacy_max, args.batch_size)
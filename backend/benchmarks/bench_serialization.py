@@ -0,0 +1,80 @@
+# Per-row cost of serializing a financial page: ORM entities through jsonable_encoder
+# vs. projected column rows encoded by orjson.
+# run with command: python benchmarks/bench_serialization.py --rows 5000 --page 100 --repeat 200
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, desc
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.crud.crud_financials import bulk_upsert
+from app.models.financials import KeyMetric
+from app.services.business_service import _projection
+
+def seed(db, count):
+    rows = [{
+        "symbol": "BENCH",
+        "date": date(2024, 12, 31) - timedelta(days=i),
+        "fiscal_year": str(2024 - i // 365),
+        "period": "FY",
+        "reported_currency": "USD",
+        "market_cap": 3_000_000_000_000 + i,
+        "enterprise_value": 3_100_000_000_000 + i,
+        "pe_ratio": 30.1234,
+        "pb_ratio": 45.5678,
+        "dividend_yield": 0.0044,
+        "free_cash_flow_yield": 0.0321,
+        "return_on_equity": 1.5678,
+        "debt_to_equity": 1.8765,
+        "company_id": 1,
+    } for i in range(count)]
+    bulk_upsert(db, KeyMetric, rows)
+
+def orm_page(db, page):
+    """The previous path: full entities, a dict per row, then FastAPI's generic encoder."""
+    rows = db.query(KeyMetric).filter(KeyMetric.symbol == "BENCH").order_by(desc(KeyMetric.date)).limit(page).all()
+    items = [{column.key: getattr(row, column.key) for column in KeyMetric.__table__.columns} for row in rows]
+    return json.dumps(jsonable_encoder({"items": items})).encode()
+
+def projected_page(db, page):
+    """Column tuples with floats from the result processor, encoded once by orjson."""
+    rows = db.query(*_projection(KeyMetric)).filter(KeyMetric.symbol == "BENCH").order_by(desc(KeyMetric.date)).limit(page).all()
+    return orjson.dumps({"items": [row._asdict() for row in rows]})
+
+def run(count, page, repeat):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    try:
+        seed(db, count)
+        print(f"\n{count:,} rows stored, pages of {page}, {repeat} pages per path")
+        for label, fn in (("orm + jsonable_encoder", orm_page), ("projection + orjson", projected_page)):
+            fn(db, page)  # warm up statement caches
+            start = time.perf_counter()
+            for _ in range(repeat):
+                db.expunge_all()
+                fn(db, page)
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<26} {elapsed * 1e6 / (page * repeat):8.2f} us/row")
+    finally:
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Financial page serialization benchmark")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.rows, args.page, args.repeat)
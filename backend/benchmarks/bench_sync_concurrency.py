@@ -0,0 +1,93 @@
+# Sequential vs. concurrent sync against the local FMP stub server.
+# run with command: python benchmarks/bench_sync_concurrency.py --sizes 5 500 5000 --latency-ms 20
+# add --error-rate 0.02 --rate-limit-rate 0.01 --seed 1 to measure the cost of retries under injected faults
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.core.metrics import metrics
+from app.services.fmp_client import FMPClient
+from app.services.rate_limiter import TokenBucket, set_rate_limiter
+from app.services.business_service import SYNC_FUNCTIONS, sync_all
+from tests.fmp_stub_server import run_stub_server
+
+def fresh_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+async def run_sequential(symbols):
+    """The pre-engine behaviour: one dataset after another, one symbol at a time."""
+    db = fresh_session()
+    try:
+        for sync_function in SYNC_FUNCTIONS.values():
+            await sync_function(db, symbols, concurrency=1)
+    finally:
+        db.close()
+
+async def run_concurrent(symbols, concurrency):
+    db = fresh_session()
+    try:
+        await sync_all(db, symbols, concurrency=concurrency)
+    finally:
+        db.close()
+
+async def main(args):
+    logging.disable(logging.CRITICAL)
+    faults = dict(error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                  retry_after=args.retry_after, seed=args.seed)
+    async with run_stub_server(latency=args.latency_ms / 1000, **faults) as base_url:
+        FMPClient.BASE_URL = base_url
+        set_rate_limiter(TokenBucket(requests_per_minute=0))  # the stub has no plan limit
+        print(f"stub latency {args.latency_ms:.0f} ms, concurrency {args.concurrency}, "
+              f"{args.error_rate:.1%} 500s, {args.rate_limit_rate:.1%} 429s")
+        print(f"{'symbols':>8} {'sequential s':>14} {'concurrent s':>14} {'speedup':>9}")
+        per_symbol = None
+        for size in args.sizes:
+            symbols = [f"S{i:05d}" for i in range(size)]
+
+            if size <= args.baseline_max:
+                start = time.perf_counter()
+                await run_sequential(symbols)
+                sequential = time.perf_counter() - start
+                per_symbol = sequential / size
+                sequential_label = f"{sequential:14.2f}"
+            else:
+                # The sequential path is linear in symbols; extrapolate instead of waiting on it.
+                sequential = per_symbol * size if per_symbol else float("nan")
+                sequential_label = f"{sequential:13.2f}*"
+
+            start = time.perf_counter()
+            await run_concurrent(symbols, args.concurrency)
+            concurrent = time.perf_counter() - start
+
+            print(f"{size:>8} {sequential_label} {concurrent:14.2f} {sequential / concurrent:8.1f}x")
+        if any(size > args.baseline_max for size in args.sizes):
+            print("* extrapolated from the largest measured sequential run")
+        retries = {k: v for k, v in metrics.snapshot()["counters"].items() if k.startswith("fmp_retries_total")}
+        if retries:
+            print(f"retries: {', '.join(f'{k}={v:.0f}' for k, v in sorted(retries.items()))}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sequential vs. concurrent sync benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 500, 5000])
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--baseline-max", type=int, default=500,
+                        help="largest universe to run the sequential baseline on")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub responses that are 500s")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of stub responses that are 429s")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After seconds on injected 429s")
+    parser.add_argument("--seed", type=int, default=1, help="seed for repeatable fault injection")
+    asyncio.run(main(parser.parse_args()))
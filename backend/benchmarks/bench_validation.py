@@ -0,0 +1,63 @@
+# Rows/sec turning a raw FMP income-statement payload into rows for the bulk writer:
+# per-item model_validate + model_dump + strptime vs. one list-level validate_json + dump_python.
+# run with command: python benchmarks/bench_validation.py --rows 100000 --repeat 3
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.schemas.fmp_schemas import IncomeStatement, list_adapter
+from tests.fmp_stub_server import _income_statement
+
+class StringDateIncomeStatement(IncomeStatement):
+    """The schema as it was: dates left as strings for the service to parse."""
+    date: str
+
+def payload(count):
+    latest = date(2024, 12, 31)
+    items = []
+    for i in range(count):
+        d = latest - timedelta(days=i)
+        items.append(_income_statement(f"S{i % 5000:05d}", d, str(d.year), "FY"))
+    return json.dumps(items).encode()
+
+def previous_path(body):
+    """Decode, validate item by item, dump item by item, then parse each date."""
+    rows = []
+    for item in [StringDateIncomeStatement.model_validate(item) for item in json.loads(body)]:
+        row = item.model_dump()
+        row["date"] = datetime.strptime(row["date"], "%Y-%m-%d").date()
+        rows.append(row)
+    return rows
+
+def list_adapter_path(body):
+    """Validate the raw bytes as a list in one call; dates come out as date objects."""
+    adapter = list_adapter(IncomeStatement)
+    return adapter.dump_python(adapter.validate_json(body))
+
+def run(count, repeat):
+    body = payload(count)
+    print(f"\n{count:,} income statements, {len(body) / 1e6:.1f} MB of JSON, best of {repeat}")
+    results = {}
+    for label, fn in (("model_validate per item", previous_path), ("TypeAdapter.validate_json", list_adapter_path)):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = fn(body)
+            best = min(best, time.perf_counter() - start)
+        results[label] = rows
+        print(f"  {label:<27} {count / best:>12,.0f} rows/s  ({best:.2f}s)")
+    previous, current = results.values()
+    assert previous == current, "both paths must produce identical rows"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FMP payload validation benchmark")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,48 @@
+import pytest
+from app.core.cache import InMemoryCache, set_cache
+from app.core.config import settings
+from app.services.circuit_breaker import reset_circuit_breakers
+from app.services.fmp_client import forget_endpoints
+from app.services.rate_limiter import TokenBucket, set_rate_limiter
+
+@pytest.fixture(autouse=True)
+def isolated_cache():
+    """Give every test a private in-process cache instead of the shared Redis."""
+    set_cache(InMemoryCache())
+    yield
+    set_cache(None)
+
+@pytest.fixture(autouse=True)
+def unthrottled_fmp():
+    """The local FMP stub has no plan limit, so tests run without the shared token bucket."""
+    set_rate_limiter(TokenBucket(requests_per_minute=0))
+    yield
+    set_rate_limiter(None)
+
+@pytest.fixture(autouse=True)
+def fresh_fmp_endpoints():
+    """Start every test with closed circuit breakers and no remembered news endpoint."""
+    reset_circuit_breakers()
+    forget_endpoints()
+    yield
+    reset_circuit_breakers()
+    forget_endpoints()
+
+@pytest.fixture(autouse=True)
+def no_fetch_through(monkeypatch):
+    """Reads of unknown symbols 404 as before instead of reaching out to FMP; tests opt in."""
+    monkeypatch.setattr(settings, "fetch_through_enabled", False)
+
+class FakeClock:
+    """Stands in for time.monotonic in code that takes a clock; tests move it by setting .now."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    """A FakeClock starting at zero."""
+    return FakeClock()
@@ -0,0 +1,232 @@
+# Local stand-in for the FMP API, used by benchmarks and offline tests.
+# run with command: python tests/fmp_stub_server.py --port 8081 --latency-ms 50 --symbols 500 --error-rate 0.01 --rate-limit-rate 0.02
+
+import argparse
+import asyncio
+import random
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+
+from aiohttp import web
+
+def _profile(symbol: str) -> dict:
+    rng = random.Random(symbol)
+    return {
+        "symbol": symbol,
+        "companyName": f"{symbol} Holdings Inc.",
+        "price": round(rng.uniform(5, 500), 2),
+        "marketCap": rng.randint(10**8, 10**12),
+        "beta": round(rng.uniform(0.5, 2.0), 4),
+        "lastDividend": round(rng.uniform(0, 5), 4),
+        "range": "100.0-200.0",
+        "volume": rng.randint(10**5, 10**8),
+        "averageVolume": rng.randint(10**5, 10**8),
+        "ceo": "Jane Doe",
+        "sector": "Technology",
+        "industry": "Software",
+        "country": "US",
+        "fullTimeEmployees": str(rng.randint(100, 100000)),
+        "isActivelyTrading": True,
+    }
+
+def _period_dates(period: str, limit: int) -> list[tuple[date, str, str]]:
+    """(date, fiscalYear, period) tuples, newest first; quarters end on calendar quarter ends."""
+    latest = date(2024, 12, 31)
+    rows = []
+    for i in range(limit):
+        if period == "quarter":
+            year, quarter = divmod(latest.year * 4 + 3 - i, 4)  # quarter 0-3
+            d = date(year + (quarter == 3), (3 * quarter + 3) % 12 + 1, 1) - timedelta(days=1)
+            rows.append((d, str(year), f"Q{quarter + 1}"))
+        else:
+            d = latest - timedelta(days=365 * i)
+            rows.append((d, str(d.year), "FY"))
+    return rows
+
+def _income_statement(symbol: str, d: date, fiscal_year: str, period: str) -> dict:
+    rng = random.Random(f"{symbol}{d}")
+    revenue = rng.randint(10**8, 10**11)
+    return {
+        "date": d.isoformat(),
+        "symbol": symbol,
+        "reportedCurrency": "USD",
+        "fiscalYear": fiscal_year,
+        "period": period,
+        "revenue": revenue,
+        "costOfRevenue": revenue // 2,
+        "grossProfit": revenue - revenue // 2,
+        "researchAndDevelopmentExpenses": revenue // 10,
+        "sellingGeneralAndAdministrativeExpenses": revenue // 12,
+        "operatingExpenses": revenue // 5,
+        "operatingIncome": revenue // 4,
+        "incomeBeforeTax": revenue // 5,
+        "incomeTaxExpense": revenue // 25,
+        "netIncome": revenue // 6,
+        "eps": round(rng.uniform(0.1, 10), 2),
+        "epsDiluted": round(rng.uniform(0.1, 10), 2),
+        "weightedAverageShsOut": rng.randint(10**7, 10**10),
+        "weightedAverageShsOutDil": rng.randint(10**7, 10**10),
+        "ebitda": revenue // 3,
+        "ebit": revenue // 4,
+        "depreciationAndAmortization": revenue // 30,
+    }
+
+def _key_metrics(symbol: str, d: date, fiscal_year: str, period: str) -> dict:
+    rng = random.Random(f"km{symbol}{d}")
+    return {
+        "symbol": symbol,
+        "date": d.isoformat(),
+        "fiscalYear": fiscal_year,
+        "period": period,
+        "reportedCurrency": "USD",
+        "marketCap": rng.randint(10**8, 10**12),
+        "enterpriseValue": rng.randint(10**8, 10**12),
+        "peRatio": round(rng.uniform(5, 60), 4),
+        "pbRatio": round(rng.uniform(1, 20), 4),
+        "dividendYield": round(rng.uniform(0, 0.05), 4),
+        "freeCashFlowYield": round(rng.uniform(0, 0.1), 4),
+        "returnOnEquity": round(rng.uniform(-0.2, 1.5), 4),
+        "debtToEquity": round(rng.uniform(0, 3), 4),
+    }
+
+def _ratios(symbol: str, d: date, fiscal_year: str, period: str) -> dict:
+    rng = random.Random(f"ratio{symbol}{d}")
+    return {
+        "symbol": symbol,
+        "date": d.isoformat(),
+        "fiscalYear": fiscal_year,
+        "period": period,
+        "reportedCurrency": "USD",
+        "netProfitMargin": round(rng.uniform(-0.1, 0.4), 4),
+        "grossProfitMargin": round(rng.uniform(0.1, 0.8), 4),
+        "returnOnEquity": round(rng.uniform(-0.2, 1.5), 4),
+        "priceToEarningsRatio": round(rng.uniform(5, 60), 4),
+        "priceToBookRatio": round(rng.uniform(1, 20), 4),
+        "priceToSalesRatio": round(rng.uniform(1, 20), 4),
+        "enterpriseValueMultiple": round(rng.uniform(5, 40), 4),
+        "debtToEquityRatio": round(rng.uniform(0, 3), 4),
+        "currentRatio": round(rng.uniform(0.5, 3), 4),
+        "quickRatio": round(rng.uniform(0.3, 2.5), 4),
+        "assetTurnover": round(rng.uniform(0.2, 1.5), 4),
+        "inventoryTurnover": round(rng.uniform(2, 40), 4),
+    }
+
+def _article(symbol: str, i: int) -> dict:
+    return {
+        "title": f"{symbol} headline {i}",
+        "date": f"2024-12-{28 - i % 28:02d} 12:00:00",
+        "content": f"<p>Synthetic news body {i} for {symbol}.</p>",
+        "tickers": f"NASDAQ:{symbol}",
+        "image": f"https://images.example.com/{symbol}/{i}.jpg",
+        "link": f"https://news.example.com/{symbol}/{i}",
+        "author": "Stub Author",
+        "site": "example.com",
+    }
+
+RESPONSES = web.AppKey("responses", Counter)  # status code -> count, for load test reports
+
+def stub_symbols(count: int) -> list[str]:
+    """The tickers a stub started with symbols=count knows about."""
+    return [f"S{i:05d}" for i in range(count)]
+
+def create_stub_app(
+    latency: float = 0.0,
+    articles: int = 5,
+    symbols: int | None = None,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    retry_after: float = 1.0,
+    seed: int | None = None,
+) -> web.Application:
+    """
+    Build an aiohttp app serving synthetic FMP payloads.
+    With symbols=N only stub_symbols(N) exist and other tickers get empty results, as on
+    FMP; otherwise every ticker exists. error_rate and rate_limit_rate are the fractions
+    of requests answered with a 500 or a 429 carrying Retry-After, drawn from a
+    generator seeded with seed so that load runs are repeatable.
+    """
+    universe = set(stub_symbols(symbols)) if symbols is not None else None
+    rng = random.Random(seed)
+
+    @web.middleware
+    async def faults(request: web.Request, handler) -> web.Response:
+        await asyncio.sleep(latency)
+        roll = rng.random()
+        if roll < rate_limit_rate:
+            request.app[RESPONSES]["429"] += 1
+            return web.json_response({"Error Message": "Limit Reach"}, status=429,
+                                     headers={"Retry-After": f"{retry_after:g}"})
+        if roll < rate_limit_rate + error_rate:
+            request.app[RESPONSES]["500"] += 1
+            return web.json_response({"Error Message": "Internal error"}, status=500)
+        request.app[RESPONSES]["200"] += 1
+        return await handler(request)
+
+    def known(symbol: str) -> bool:
+        return universe is None or symbol in universe
+
+    def statements(builder):
+        async def handler(request: web.Request) -> web.Response:
+            symbol = request.query.get("symbol", "")
+            period = request.query.get("period", "annual")
+            limit = int(request.query.get("limit", 5)) if known(symbol) else 0
+            return web.json_response([builder(symbol, *row) for row in _period_dates(period, limit)])
+        return handler
+
+    def requested(request: web.Request, key: str) -> list[str]:
+        return [s for s in request.query.get(key, "").split(",") if s and known(s)]
+
+    async def profile(request: web.Request) -> web.Response:
+        return web.json_response([_profile(symbol) for symbol in requested(request, "symbol")])
+
+    async def news(request: web.Request) -> web.Response:
+        # like FMP, limit caps the articles across all requested tickers, newest first
+        payload = [_article(symbol, i) for symbol in requested(request, "tickers") for i in range(articles)]
+        if "from" in request.query:
+            payload = [a for a in payload if a["date"][:10] >= request.query["from"]]
+        payload.sort(key=lambda a: a["date"], reverse=True)
+        return web.json_response(payload[:int(request.query.get("limit", articles))])
+
+    app = web.Application(middlewares=[faults])
+    app[RESPONSES] = Counter()
+    app.router.add_get("/profile", profile)
+    app.router.add_get("/income-statement", statements(_income_statement))
+    app.router.add_get("/key-metrics", statements(_key_metrics))
+    app.router.add_get("/ratios", statements(_ratios))
+    app.router.add_get("/stock_news", news)
+    return app
+
+@asynccontextmanager
+async def run_stub_server(host: str = "127.0.0.1", port: int = 0, **options):
+    """Serve the stub app in the current event loop and yield its base URL."""
+    runner = web.AppRunner(create_stub_app(**options))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    try:
+        yield f"http://{host}:{bound_port}"
+    finally:
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub of the FMP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--symbols", type=int, default=None,
+                        help="serve only S00000..S{N-1}; default: any ticker")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with a 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with each 429")
+    parser.add_argument("--seed", type=int, default=None, help="seed for repeatable fault injection")
+    args = parser.parse_args()
+    web.run_app(create_stub_app(
+        latency=args.latency_ms / 1000,
+        symbols=args.symbols,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    ), host=args.host, port=args.port)
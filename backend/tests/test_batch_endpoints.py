@@ -0,0 +1,68 @@
+"""
+Verify the multi-symbol batch services and request parsing.
+"""
+
+import pytest
+from datetime import date
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.api.routes import parse_symbols
+from app.core.database import Base
+from app.crud.crud_company import create_minimal_company
+from app.crud.crud_financials import bulk_upsert
+from app.models.financials import IncomeStatement, KeyMetric
+from app.services.business_service import get_company_profiles_batch, get_financials_batch
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def yearly(symbol, years):
+    return [
+        {"symbol": symbol, "date": date(year, 12, 31), "fiscal_year": str(year), "period": "FY", "company_id": 1}
+        for year in years
+    ]
+
+class TestBatchEndpoints:
+
+    def setup_method(self):
+        Base.metadata.create_all(bind=engine)
+        self.db = TestingSessionLocal()
+        for symbol in ("AAPL", "MSFT"):
+            create_minimal_company(self.db, symbol)
+        bulk_upsert(self.db, IncomeStatement, yearly("AAPL", range(2015, 2025)) + yearly("MSFT", range(2022, 2025)))
+        bulk_upsert(self.db, KeyMetric, yearly("AAPL", range(2020, 2025)))
+
+    def teardown_method(self):
+        self.db.close()
+        Base.metadata.drop_all(bind=engine)
+
+    def test_profiles_report_missing_symbols(self):
+        result = get_company_profiles_batch(self.db, ["MSFT", "ZZZ", "AAPL"])
+        assert list(result) == ["MSFT", "ZZZ", "AAPL"]
+        assert result["AAPL"]["symbol"] == "AAPL"
+        assert result["ZZZ"]["error"]["status_code"] == 404
+
+    def test_financials_one_query_per_dataset(self):
+        """Rows are capped per symbol by the window, without a query per symbol"""
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            result = get_financials_batch(self.db, ["AAPL", "MSFT", "ZZZ"], ["income_statements", "key_metrics"], limit=4)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert len(statements) == 2
+        assert [row["fiscal_year"] for row in result["AAPL"]["income_statements"]] == ["2024", "2023", "2022", "2021"]
+        assert len(result["AAPL"]["key_metrics"]) == 4
+        assert len(result["MSFT"]["income_statements"]) == 3
+        assert result["MSFT"]["key_metrics"] == []
+        assert result["ZZZ"]["error"]["status_code"] == 404
+
+    def test_symbol_parsing(self, monkeypatch):
+        assert parse_symbols(" aapl,MSFT,,aapl ") == ["AAPL", "MSFT"]
+        monkeypatch.setattr("app.api.routes.settings.batch_max_symbols", 2)
+        with pytest.raises(HTTPException):
+            parse_symbols("A,B,C")
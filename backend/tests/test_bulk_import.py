@@ -0,0 +1,173 @@
+"""
+Verify the bulk importer: chunked reads, validation, merging and company creation.
+"""
+
+import csv
+import json
+import os
+from unittest.mock import MagicMock
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.crud.bulk import _copy_field, copy_merge
+from app.models.company import Company
+from app.models.financials import IncomeStatement
+from app.models.news import NewsArticle
+from app.services.bulk_import import import_file, read_chunks
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+FIELDS = ["symbol", "date", "fiscalYear", "period", "reportedCurrency", "revenue", "netIncome", "eps"]
+
+def write_statements(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def statement(symbol, year, quarter, revenue):
+    return {
+        "symbol": symbol, "date": f"{year}-{3 * quarter:02d}-28", "fiscalYear": str(year), "period": f"Q{quarter}",
+        "reportedCurrency": "USD", "revenue": revenue, "netIncome": "", "eps": "1.25",
+    }
+
+class TestBulkImport:
+
+    def setup_method(self):
+        Base.metadata.create_all(bind=engine)
+
+    def teardown_method(self):
+        Base.metadata.drop_all(bind=engine)
+
+    def test_csv_statements_in_chunks(self, tmp_path):
+        path = tmp_path / "income.csv"
+        rows = [statement(symbol, year, q, 1000 * year + q)
+                for symbol in ("AAA", "BBB") for year in range(2000, 2005) for q in range(1, 5)]
+        rows.append({**statement("BAD", 2001, 1, 1), "date": "not a date"})
+        write_statements(path, rows)
+
+        db = TestingSessionLocal()
+        try:
+            report = import_file(db, path, "income_statements", chunk_size=7)
+            assert report["chunks"] == 6 and report["read"] == 41
+            assert report["rejected"] == 1
+            assert report["inserted"] == 40 and report["updated"] == 0
+
+            stored = db.query(IncomeStatement).filter_by(symbol="AAA", fiscal_year="2003", period="Q2").one()
+            assert float(stored.revenue) == 2003002 and stored.net_income is None and float(stored.eps) == 1.25
+            assert stored.company_id == db.query(Company.id).filter_by(symbol="AAA").scalar()
+            assert {c.symbol for c in db.query(Company).all()} == {"AAA", "BBB"}
+
+            # a second file restating some quarters updates them in place
+            write_statements(path, [statement("AAA", 2003, 2, 5), statement("AAA", 2005, 1, 6)])
+            report = import_file(db, path, "income_statements", chunk_size=7)
+            assert (report["inserted"], report["updated"]) == (1, 1)
+            assert db.query(IncomeStatement).count() == 41
+        finally:
+            db.close()
+
+    def test_jsonl_news_split_by_ticker(self, tmp_path):
+        path = tmp_path / "news.jsonl"
+        articles = [{
+            "title": f"headline {i}", "date": f"2020-01-{i + 1:02d} 08:30:00", "content": "", "author": "",
+            "tickers": "NASDAQ:AAA, NYSE:BBB" if i % 2 else "NASDAQ:AAA", "image": "", "site": "example.com",
+            "link": f"https://news.example.com/{i}",
+        } for i in range(10)]
+        path.write_text("\n".join(json.dumps(a) for a in articles + articles[:3]) + "\n")
+
+        db = TestingSessionLocal()
+        try:
+            report = import_file(db, path, "news", chunk_size=4)
+            assert report["read"] == 13 and report["rejected"] == 0
+            assert report["inserted"] == 15  # 10 for AAA, 5 for BBB; the repeats are skipped
+            assert db.query(NewsArticle).filter_by(symbol="BBB").count() == 5
+        finally:
+            db.close()
+
+    def test_unknown_format_and_parquet(self, tmp_path):
+        with pytest.raises(ValueError):
+            read_chunks(tmp_path / "data.xlsx", 10)
+
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+        path = tmp_path / "income.parquet"
+        pq.write_table(pa.Table.from_pylist([statement("PQ", 2010, q, q) for q in range(1, 5)]), path)
+        db = TestingSessionLocal()
+        try:
+            assert import_file(db, path, "income_statements", chunk_size=3)["inserted"] == 4
+        finally:
+            db.close()
+
+    def test_copy_field_encoding(self):
+        # COPY csv: NULL is an unquoted empty field, '' a quoted one
+        assert _copy_field(None) == ""
+        assert _copy_field("") == '""'
+        assert _copy_field('say "hi"') == '"say ""hi"""'
+
+    def test_copy_merge_statements(self):
+        # a mocked psycopg2 connection: record the COPY and the merge instead of running them
+        db = MagicMock()
+        connection = db.connection.return_value
+        cursor = connection.connection.cursor.return_value
+        copied = []
+        cursor.copy_expert.side_effect = lambda sql, buffer: copied.append((sql, buffer.read()))
+        db.execute.return_value.scalars.return_value.all.return_value = [True, False]
+
+        rows = [
+            {"symbol": "AAA", "url": "https://news.example.com/1", "title": 'say "hi"', "author": None},
+            {"symbol": "AAA", "url": "https://news.example.com/2", "title": "", "author": "Ann"},
+        ]
+        assert copy_merge(db, NewsArticle, rows, ["symbol", "url"]) == {"inserted": 1, "updated": 1}
+
+        ddl = [call.args[0] for call in connection.exec_driver_sql.call_args_list]
+        stage = ddl[0].split()[6]
+        assert ddl == [
+            f'CREATE TEMP TABLE IF NOT EXISTS {stage} AS SELECT "symbol", "url", "title", "author" '
+            'FROM "news_articles" WITH NO DATA',
+            f"TRUNCATE {stage}",
+        ]
+        assert stage.startswith("import_stage_news_articles_")
+        assert copied == [(
+            f'COPY {stage} ("symbol", "url", "title", "author") FROM STDIN WITH (FORMAT csv)',
+            '"AAA","https://news.example.com/1","say ""hi""",\n'
+            '"AAA","https://news.example.com/2","","Ann"\n',
+        )]
+        cursor.close.assert_called_once()
+
+        merge = " ".join(str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect())).split())
+        assert merge == (
+            "INSERT INTO news_articles (symbol, url, title, author) "
+            f"SELECT {stage}.symbol, {stage}.url, {stage}.title, {stage}.author FROM {stage} "
+            "ON CONFLICT (symbol, url) DO UPDATE SET title = excluded.title, author = excluded.author "
+            "RETURNING xmax = 0"
+        )
+
+        copy_merge(db, NewsArticle, rows, ["symbol", "url"], update=False)
+        merge = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (symbol, url) DO NOTHING" in merge
+
+    def test_copy_merge_on_postgres(self, tmp_path):
+        url = os.environ.get("TEST_POSTGRES_URL")
+        if not url:
+            pytest.skip("TEST_POSTGRES_URL is not set")
+        pg_engine = create_engine(url)
+        Base.metadata.create_all(bind=pg_engine)
+        db = sessionmaker(autoflush=False, bind=pg_engine)()
+        try:
+            path = tmp_path / "income.csv"
+            write_statements(path, [statement("AAA", 2003, q, q) for q in range(1, 5)])
+            assert import_file(db, path, "income_statements")["inserted"] == 4
+
+            write_statements(path, [statement("AAA", 2003, 2, 5), statement("AAA", 2004, 1, 6)])
+            report = import_file(db, path, "income_statements")
+            assert (report["inserted"], report["updated"]) == (1, 1)
+            stored = db.query(IncomeStatement).filter_by(symbol="AAA", fiscal_year="2003", period="Q2").one()
+            assert float(stored.revenue) == 5 and stored.net_income is None
+        finally:
+            db.close()
+            Base.metadata.drop_all(bind=pg_engine)
+            pg_engine.dispose()
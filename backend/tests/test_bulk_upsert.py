@@ -0,0 +1,57 @@
+"""
+Verify the set-based upsert path in crud_financials.
+"""
+
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.crud.crud_financials import bulk_upsert, upsert_key_metrics
+from app.models.financials import IncomeStatement, KeyMetric
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def statement(year, revenue):
+    return {
+        "symbol": "AAPL",
+        "date": date(year, 9, 30),
+        "fiscal_year": str(year),
+        "period": "FY",
+        "revenue": revenue,
+        "company_id": 1,
+    }
+
+class TestBulkUpsert:
+
+    def setup_method(self):
+        Base.metadata.create_all(bind=engine)
+        self.db = TestingSessionLocal()
+
+    def teardown_method(self):
+        self.db.close()
+        Base.metadata.drop_all(bind=engine)
+
+    def test_reports_inserted_and_updated(self):
+        """Second pass updates existing keys in place and inserts only new ones"""
+        first = bulk_upsert(self.db, IncomeStatement, [statement(2022, 100), statement(2023, 200)])
+        assert first == {"inserted": 2, "updated": 0}
+
+        second = bulk_upsert(self.db, IncomeStatement, [statement(2023, 250), statement(2024, 300)], batch_size=1)
+        assert second == {"inserted": 1, "updated": 1}
+
+        rows = {s.fiscal_year: float(s.revenue) for s in self.db.query(IncomeStatement).all()}
+        assert rows == {"2022": 100.0, "2023": 250.0, "2024": 300.0}
+
+    def test_duplicate_keys_in_payload_collapse(self):
+        """Repeated keys in one payload keep the last value instead of failing the statement"""
+        report = bulk_upsert(self.db, IncomeStatement, [statement(2023, 1), statement(2023, 2)])
+        assert report == {"inserted": 1, "updated": 0}
+        assert float(self.db.query(IncomeStatement).one().revenue) == 2.0
+
+    def test_legacy_entry_point_delegates(self):
+        """upsert_key_metrics keeps its signature and uses the bulk path"""
+        metric = {"symbol": "AAPL", "date": date(2024, 9, 30), "fiscal_year": "2024", "period": "FY", "pe_ratio": 30.5}
+        assert upsert_key_metrics(self.db, [metric], 1, "AAPL") == {"inserted": 1, "updated": 0}
+        assert self.db.query(KeyMetric).count() == 1
@@ -0,0 +1,135 @@
+"""
+Verify the read-through response cache.
+"""
+
+import asyncio
+import time
+from sqlalchemy.util.concurrency import greenlet_spawn
+from app.core.cache import InMemoryCache, RedisCache, cached, invalidate, set_cache
+
+class SlowRedis:
+    """Stands in for a redis client whose every round trip takes 50ms."""
+
+    def __init__(self):
+        self.values = {}
+
+    def register_script(self, script):
+        return lambda keys, args: time.sleep(0.05) or 1
+
+    def get(self, key):
+        time.sleep(0.05)
+        return self.values.get(key)
+
+    def set(self, key, value, **options):
+        time.sleep(0.05)
+        self.values[key] = value
+        return True
+
+    def pipeline(self, transaction=True):
+        client, pending = self, []
+
+        class Pipeline:
+            def set(self, key, value, **options):
+                pending.append((key, value))
+
+            def sadd(self, *args):
+                pass
+
+            def expire(self, *args):
+                pass
+
+            def execute(self):
+                time.sleep(0.05)
+                client.values.update(pending)
+
+        return Pipeline()
+
+class TestInMemoryCache:
+
+    def test_entries_expire_after_ttl(self, clock):
+        cache = InMemoryCache(clock=clock)
+        cache.set("k", "v", ttl=10)
+        clock.now = 9.9
+        assert cache.get("k") == "v"
+        clock.now = 10
+        assert cache.get("k") is None
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = InMemoryCache(max_entries=2)
+        cache.set("a", "1", ttl=60)
+        cache.set("b", "2", ttl=60)
+        cache.get("a")
+        cache.set("c", "3", ttl=60)
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.get("c") == "3"
+
+    def test_invalidate_tags_drops_tagged_entries_only(self):
+        cache = InMemoryCache()
+        cache.set("x", "1", ttl=60, tags=["news:AAPL"])
+        cache.set("y", "2", ttl=60, tags=["news:MSFT"])
+        cache.invalidate_tags(["news:AAPL"])
+        assert cache.get("x") is None
+        assert cache.get("y") == "2"
+
+class TestReadThrough:
+
+    def setup_method(self):
+        self.calls = []
+
+        @cached("income_statements")
+        def get_page(db, symbol, skip=0, limit=20):
+            self.calls.append((symbol, skip, limit))
+            return {"symbol": symbol, "skip": skip, "limit": limit}
+
+        self.get_page = get_page
+
+    def test_pages_are_cached_per_skip_and_limit(self):
+        assert self.get_page(None, "AAPL") == {"symbol": "AAPL", "skip": 0, "limit": 20}
+        assert self.get_page(None, "AAPL", skip=0, limit=20) == {"symbol": "AAPL", "skip": 0, "limit": 20}
+        self.get_page(None, "AAPL", 20, 20)
+        assert self.calls == [("AAPL", 0, 20), ("AAPL", 20, 20)]
+
+    def test_sync_invalidation_forces_refetch(self):
+        self.get_page(None, "AAPL")
+        self.get_page(None, "MSFT")
+        invalidate("AAPL", "income_statements")
+        self.get_page(None, "AAPL")
+        self.get_page(None, "MSFT")
+        assert self.calls == [("AAPL", 0, 20), ("MSFT", 0, 20), ("AAPL", 0, 20)]
+
+    def test_broken_backend_degrades_to_direct_call(self):
+        class Broken:
+            def get(self, key):
+                raise ConnectionError("redis down")
+
+            def set(self, *args, **kwargs):
+                raise ConnectionError("redis down")
+
+        set_cache(Broken())
+        assert self.get_page(None, "AAPL")["symbol"] == "AAPL"
+        assert self.get_page(None, "AAPL")["symbol"] == "AAPL"
+        assert len(self.calls) == 2
+
+    def test_redis_round_trips_leave_the_loop_free(self):
+        """Inside AsyncSession.run_sync the Redis calls run in a worker thread"""
+        set_cache(RedisCache(SlowRedis()))
+
+        async def run():
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.005)
+                    ticks += 1
+
+            ticker = asyncio.ensure_future(tick())
+            page = await greenlet_spawn(self.get_page, None, "AAPL")
+            ticker.cancel()
+            return page, ticks
+
+        page, ticks = asyncio.run(run())
+        assert page["symbol"] == "AAPL"
+        # a miss costs four 50ms round trips (get, lock, store, unlock); the loop kept ticking through them
+        assert ticks >= 10
@@ -0,0 +1,109 @@
+"""
+Verify the per-endpoint circuit breaker and the news endpoint memory.
+"""
+
+import asyncio
+import orjson
+import pytest
+from fastapi import HTTPException
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.services.fmp_client import FMPClient
+from app.services.fmp_transport import TransportResponse
+
+class ScriptedTransport:
+    """Answers with status_for(endpoint) and records every endpoint it was asked for."""
+
+    metered = False
+
+    def __init__(self, status_for):
+        self.status_for = status_for
+        self.requests = []
+
+    async def get(self, session, base_url, endpoint, params, timeout):
+        self.requests.append(endpoint)
+        status = self.status_for(endpoint)
+        body = orjson.dumps([{
+            "title": "headline", "date": "2025-01-10 09:00:00", "content": "", "tickers": params.get("tickers", ""),
+            "image": "", "link": "https://news.example.com/1", "author": "", "site": "",
+        }]) if status == 200 else b""
+        return TransportResponse(status, "scripted", {}, body)
+
+def fetch_news(transport, symbols):
+    async def run():
+        async with FMPClient(api_key="test", transport=transport) as client:
+            return [await client.get_stock_news(symbol) for symbol in symbols]
+    return asyncio.run(run())
+
+class TestCircuitBreaker:
+
+    def test_opens_after_consecutive_failures_and_probes(self, clock):
+        breaker = CircuitBreaker("profile", failure_threshold=3, reset_timeout=10, clock=clock)
+
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()  # a success resets the count
+        for _ in range(3):
+            assert breaker.allow()
+            breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert breaker.retry_in() == 10
+
+        clock.now = 10
+        assert breaker.allow() and breaker.state == HALF_OPEN
+        assert not breaker.allow()  # one probe at a time
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+        clock.now = 20
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CLOSED and breaker.allow()
+
+    def test_open_circuit_fails_fast(self, monkeypatch):
+        monkeypatch.setattr(settings, "fmp_breaker_failure_threshold", 2)
+        monkeypatch.setattr(settings, "fmp_max_retries", 0)
+        transport = ScriptedTransport(lambda endpoint: 503)
+
+        async def run():
+            async with FMPClient(api_key="test", transport=transport) as client:
+                errors = []
+                for _ in range(4):
+                    with pytest.raises(HTTPException) as error:
+                        await client.get_company_profile("AAA")
+                    errors.append(error.value.status_code)
+                return errors
+
+        assert asyncio.run(run()) == [503, 503, 503, 503]
+        # the last two never reached the transport
+        assert len(transport.requests) == 2
+        assert metrics.snapshot()["gauges"]["fmp_circuit_state{endpoint=profile}"] == 2
+
+class TestNewsEndpointMemory:
+
+    def test_working_variant_is_remembered(self):
+        transport = ScriptedTransport(lambda endpoint: 404 if endpoint == "stock_news" else 200)
+        news = fetch_news(transport, ["AAA", "BBB", "CCC"])
+
+        assert all(len(articles) == 1 for articles in news)
+        assert transport.requests == ["stock_news", "stock_news/AAA", "stock_news/BBB", "stock_news/CCC"]
+
+    def test_memory_expires(self, monkeypatch):
+        monkeypatch.setattr(settings, "fmp_endpoint_memory_ttl", 0)
+        transport = ScriptedTransport(lambda endpoint: 404 if endpoint == "stock_news" else 200)
+        fetch_news(transport, ["AAA", "BBB"])
+        assert transport.requests == ["stock_news", "stock_news/AAA", "stock_news", "stock_news/BBB"]
+
+    def test_batch_skips_known_missing_endpoint(self):
+        transport = ScriptedTransport(lambda endpoint: 404 if endpoint == "stock_news" else 200)
+        fetch_news(transport, ["AAA"])
+        transport.requests.clear()
+
+        async def run():
+            async with FMPClient(api_key="test", transport=transport) as client:
+                return await client.get_stock_news_batch(["BBB", "CCC"])
+
+        asyncio.run(run())
+        assert sorted(transport.requests) == ["stock_news/BBB", "stock_news/CCC"]
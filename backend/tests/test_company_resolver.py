@@ -0,0 +1,64 @@
+"""
+Verify that a sync run resolves company ids with a constant number of queries.
+"""
+
+import asyncio
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.crud.crud_company import create_minimal_company
+from app.models.company import Company
+from app.models.financials import IncomeStatement, KeyMetric
+from app.services.fmp_client import FMPClient
+from app.services.business_service import sync_all
+from tests.fmp_stub_server import run_stub_server
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class TestCompanyResolver:
+
+    def setup_method(self):
+        Base.metadata.create_all(bind=engine)
+
+    def teardown_method(self):
+        Base.metadata.drop_all(bind=engine)
+
+    def test_companies_resolved_once_per_run(self, monkeypatch):
+        """Existing companies are reused and missing ones created in one bulk insert"""
+        symbols = [f"R{i:03d}" for i in range(12)]
+        db = TestingSessionLocal()
+        existing = create_minimal_company(db, symbols[0]).id
+        db.close()
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+
+        async def run():
+            async with run_stub_server() as base_url:
+                monkeypatch.setattr(FMPClient, "BASE_URL", base_url)
+                db = TestingSessionLocal()
+                event.listen(engine, "before_cursor_execute", listener)
+                try:
+                    return await sync_all(db, symbols, datasets=["income_statements", "key_metrics", "financial_ratios"])
+                finally:
+                    event.remove(engine, "before_cursor_execute", listener)
+                    db.close()
+
+        results = asyncio.run(run())
+        assert all(result["failed"] == {} for result in results.values())
+
+        company_statements = [s for s in statements if "companies" in s]
+        assert len(company_statements) <= 3
+
+        db = TestingSessionLocal()
+        try:
+            ids = dict(db.query(Company.symbol, Company.id).all())
+            assert len(ids) == len(symbols)
+            assert ids[symbols[0]] == existing
+            assert db.query(Company).filter_by(symbol=symbols[1]).one().company_name == f"{symbols[1]} Holdings Inc."
+            for model in (IncomeStatement, KeyMetric):
+                assert {row.company_id for row in db.query(model).all()} == set(ids.values())
+        finally:
+            db.close()
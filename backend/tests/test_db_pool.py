@@ -0,0 +1,69 @@
+"""
+Verify connection pool configuration and telemetry.
+"""
+
+import os
+import tempfile
+import pytest
+from sqlalchemy import create_engine, exc
+from app.core import database
+from app.core.config import settings
+from app.core.database import InstrumentedQueuePool, pool_options
+from app.core.metrics import metrics
+
+class TestPoolTelemetry:
+
+    def setup_method(self):
+        metrics.reset()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(self.tmp.name, 'pool.db')}",
+            poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=1, pool_timeout=0.05,
+        )
+
+    def teardown_method(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_overflow_wait_and_timeout_are_recorded(self):
+        first = self.engine.connect()
+        second = self.engine.connect()  # beyond pool_size: an overflow connection
+        with pytest.raises(exc.TimeoutError):
+            self.engine.connect()
+        first.close()
+        second.close()
+
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"]["db_pool_overflow_total{engine=sync}"] == 1
+        assert snapshot["counters"]["db_pool_checkout_timeouts_total{engine=sync}"] == 1
+        waits = snapshot["summaries"]["db_pool_checkout_wait_seconds{engine=sync}"]
+        assert waits["count"] == 3
+        assert waits["max"] >= 0.05
+
+class TestPoolOptions:
+
+    def test_budget_is_split_across_workers(self, monkeypatch):
+        monkeypatch.setattr(settings, "db_max_connections", 20)
+        monkeypatch.setattr(settings, "web_concurrency", 4)
+        monkeypatch.setattr(settings, "db_pool_size", 10)
+        monkeypatch.setattr(settings, "db_max_overflow", 10)
+        # 5 connections per worker, shared by the worker's async and sync engines
+        async_options = pool_options("postgresql+asyncpg://u:p@db/app", is_async=True)
+        options = pool_options("postgresql://u:p@db/app")
+        assert (async_options["pool_size"], async_options["max_overflow"]) == (3, 0)
+        assert (options["pool_size"], options["max_overflow"]) == (2, 0)
+        assert options["pool_pre_ping"] is settings.db_pool_pre_ping
+
+    def test_each_engine_keeps_a_connection(self, monkeypatch):
+        monkeypatch.setattr(settings, "db_max_connections", 1)
+        assert pool_options("postgresql+asyncpg://u:p@db/app", is_async=True)["pool_size"] == 1
+        assert pool_options("postgresql://u:p@db/app")["pool_size"] == 1
+
+    def test_external_pooler_uses_null_pool(self, monkeypatch):
+        monkeypatch.setattr(settings, "db_external_pooler", True)
+        options = pool_options("postgresql+asyncpg://u:p@db/app", is_async=True)
+        assert options["poolclass"] is database.NullPool
+        assert options["connect_args"]["statement_cache_size"] == 0
+
+    def test_sqlite_keeps_driver_defaults(self):
+        assert pool_options("sqlite:///./test.db") == {}
@@ -0,0 +1,198 @@
+"""
+Verify fetch-through reads against the local FMP stub server.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+import httpx
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.config import settings
+from app.core.database import Base, get_async_db
+from app.core.singleflight import run_db_coalesced
+from app.main import app
+from app.models.sync_state import SyncState
+from app.services.business_service import get_company_profile, get_income_statements, sync_all
+from app.services.fetch_through import Deadlines, FetchThrough, set_fetch_through
+from app.services.fmp_client import FMPClient
+from tests.fmp_stub_server import run_stub_server, stub_symbols
+
+SYMBOL = stub_symbols(1)[0]
+
+@pytest.fixture
+def env(monkeypatch):
+    """Fetch-through on, an in-memory async database and a recorder of FMP requests."""
+    monkeypatch.setattr(settings, "fetch_through_enabled", True)
+    requests = []
+    request_body = FMPClient._request_body
+
+    async def recording(client, endpoint, params=None):
+        requests.append(endpoint)
+        return await request_body(client, endpoint, params)
+
+    monkeypatch.setattr(FMPClient, "_request_body", recording)
+    yield monkeypatch, requests
+    set_fetch_through(None)
+
+def run(monkeypatch, scenario, **stub_options):
+    """Run scenario(SessionLocal, fetch_through) inside one loop with a fresh database and stub."""
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        fetch_through = FetchThrough(session_factory=SessionLocal)
+        set_fetch_through(fetch_through)
+        try:
+            async with run_stub_server(symbols=1, **stub_options) as base_url:
+                monkeypatch.setattr(FMPClient, "BASE_URL", base_url)
+                return await scenario(SessionLocal, fetch_through)
+        finally:
+            await fetch_through.close()
+            await engine.dispose()
+    return asyncio.run(main())
+
+class TestFetchThrough:
+
+    def test_unknown_symbol_is_fetched_once(self, env):
+        monkeypatch, requests = env
+
+        async def scenario(SessionLocal, fetch_through):
+            sessions = [SessionLocal() for _ in range(5)]
+            try:
+                return await asyncio.gather(*(
+                    fetch_through.serve(db, SYMBOL, "profiles", lambda db=db: run_db_coalesced(db, get_company_profile, SYMBOL))
+                    for db in sessions
+                ))
+            finally:
+                for db in sessions:
+                    await db.close()
+
+        answers = run(monkeypatch, scenario)
+        assert [status for status, _ in answers] == [200] * 5
+        assert all(body["symbol"] == SYMBOL for _, body in answers)
+        assert requests == ["profile"]
+
+    def test_slow_fetch_answers_202_then_rows(self, env):
+        monkeypatch, requests = env
+        monkeypatch.setattr(settings, "fetch_through_wait", 0.01)
+        monkeypatch.setattr(settings, "fmp_sync_periods", ["annual"])
+
+        async def scenario(SessionLocal, fetch_through):
+            async with SessionLocal() as db:
+                read = lambda: run_db_coalesced(db, get_income_statements, SYMBOL)
+                first = await fetch_through.serve(db, SYMBOL, "income_statements", read)
+                await fetch_through.refresh(SYMBOL, "income_statements")  # the sync already running
+                second = await fetch_through.serve(db, SYMBOL, "income_statements", read)
+            return first, second
+
+        (status, pending), (status_after, page) = run(monkeypatch, scenario, latency=0.05)
+        assert status == 202 and pending["status"] == "pending" and pending["retry_after"] >= 1
+        assert status_after == 200 and page["total"] == settings.fmp_max_periods
+        assert requests.count("income-statement") == 1
+
+    def test_stale_rows_are_served_then_refreshed(self, env):
+        monkeypatch, requests = env
+
+        async def scenario(SessionLocal, fetch_through):
+            async with SessionLocal() as db:
+                await sync_all(db, [SYMBOL], datasets=["profiles"])
+                old = datetime.now(timezone.utc) - timedelta(seconds=settings.freshness_sla["profiles"] + 60)
+                await db.execute(update(SyncState).values(last_fetched_at=old))
+                await db.commit()
+                requests.clear()
+
+                read = lambda: run_db_coalesced(db, get_company_profile, SYMBOL)
+                status, body = await fetch_through.serve(db, SYMBOL, "profiles", read)
+                refreshing = list(fetch_through._tasks.values())
+                await asyncio.gather(*refreshing)
+                # checked again only after fetch_through_check_interval
+                await fetch_through.serve(db, SYMBOL, "profiles", read)
+                fetched_at = (await db.execute(
+                    SyncState.__table__.select().where(SyncState.dataset == "profiles")
+                )).one().last_fetched_at
+            return status, body, len(refreshing), fetched_at
+
+        status, body, refreshing, fetched_at = run(monkeypatch, scenario)
+        assert status == 200 and body["symbol"] == SYMBOL
+        assert refreshing == 1
+        assert requests == ["profile"]
+        assert datetime.now(timezone.utc) - fetched_at.replace(tzinfo=timezone.utc) < timedelta(minutes=1)
+
+    def test_symbols_fmp_does_not_know(self, env):
+        monkeypatch, requests = env
+
+        async def scenario(SessionLocal, fetch_through):
+            statuses = []
+            async with SessionLocal() as db:
+                for symbol in ("ZZZZ", "ZZZZ", "not a ticker"):
+                    try:
+                        await fetch_through.serve(db, symbol, "profiles",
+                                                  lambda symbol=symbol: run_db_coalesced(db, get_company_profile, symbol))
+                    except HTTPException as e:
+                        statuses.append(e.status_code)
+            return statuses
+
+        assert run(monkeypatch, scenario) == [404, 404, 404]
+        # the repeat is answered from the negative memo, the malformed ticker never leaves the app
+        assert requests == ["profile"]
+
+    def test_first_fetches_are_capped(self, env):
+        monkeypatch, requests = env
+        monkeypatch.setattr(settings, "fetch_through_new_per_minute", 1)
+
+        async def scenario(SessionLocal, fetch_through):
+            statuses = []
+            async with SessionLocal() as db:
+                for symbol in ("ZZZZ", "YYYY"):
+                    try:
+                        await fetch_through.serve(db, symbol, "profiles",
+                                                  lambda symbol=symbol: run_db_coalesced(db, get_company_profile, symbol))
+                    except HTTPException as e:
+                        statuses.append(e.status_code)
+            return statuses
+
+        assert run(monkeypatch, scenario) == [404, 404]
+        # the second unknown symbol found the minute's budget spent and never reached FMP
+        assert requests == ["profile"]
+
+    def test_memory_is_bounded(self):
+        now = [0.0]
+        deadlines = Deadlines(max_entries=2, clock=lambda: now[0])
+        for symbol in ("AAA", "BBB", "CCC"):
+            deadlines.set((symbol, "profiles"), 60)
+        assert len(deadlines) == 2
+        assert not deadlines.pending(("AAA", "profiles"))  # the oldest was dropped
+        assert deadlines.pending(("CCC", "profiles"))
+        now[0] = 60
+        assert not deadlines.pending(("CCC", "profiles")) and len(deadlines) == 1
+
+    def test_route_sets_retry_after(self, env):
+        monkeypatch, requests = env
+        monkeypatch.setattr(settings, "fetch_through_wait", 0.01)
+
+        async def scenario(SessionLocal, fetch_through):
+            async def override_get_async_db():
+                async with SessionLocal() as db:
+                    yield db
+
+            previous = app.dependency_overrides.get(get_async_db)
+            app.dependency_overrides[get_async_db] = override_get_async_db
+            try:
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                    pending = await client.get(f"/api/v1/company/{SYMBOL}")
+                    await asyncio.gather(*fetch_through._tasks.values())
+                    done = await client.get(f"/api/v1/company/{SYMBOL}")
+            finally:
+                if previous is None:
+                    del app.dependency_overrides[get_async_db]
+                else:
+                    app.dependency_overrides[get_async_db] = previous
+            return pending, done
+
+        pending, done = run(monkeypatch, scenario, latency=0.05)
+        assert pending.status_code == 202 and pending.headers["Retry-After"] == "1"
+        assert done.status_code == 200 and done.json()["symbol"] == SYMBOL
@@ -0,0 +1,88 @@
+"""
+Verify multi-symbol FMP requests: chunking, splitting per symbol and partial responses.
+"""
+
+import asyncio
+import orjson
+from fastapi import HTTPException
+from app.core.config import settings
+from app.services.fmp_client import FMPClient
+
+def profile(symbol):
+    return {"symbol": symbol, "companyName": f"{symbol} Inc."}
+
+def article(i, tickers):
+    return {
+        "title": f"headline {i}", "date": f"2025-01-{10 + i:02d} 09:00:00", "content": "", "tickers": tickers,
+        "image": "", "link": f"https://news.example.com/{i}", "author": "", "site": "",
+    }
+
+class FakeFMP(FMPClient):
+    """FMPClient whose transport is a function of (endpoint, params)."""
+
+    def __init__(self, respond):
+        super().__init__(api_key="test")
+        self.respond = respond
+        self.requests = []
+
+    async def _request_body(self, endpoint, params=None):
+        self.requests.append((endpoint, dict(params or {})))
+        return orjson.dumps(self.respond(endpoint, params or {}))
+
+class TestFMPBatching:
+
+    def test_profiles_are_chunked_and_split(self, monkeypatch):
+        monkeypatch.setattr(settings, "fmp_batch_size", 50)
+        symbols = [f"S{i:03d}" for i in range(120)]
+        # FMP silently drops unknown tickers from a batch
+        client = FakeFMP(lambda endpoint, params: [
+            profile(s) for s in params["symbol"].split(",") if s != "S007"
+        ])
+
+        profiles = asyncio.run(client.get_company_profiles(symbols))
+
+        assert len(client.requests) == 3
+        assert len(profiles) == 119 and "S007" not in profiles
+        assert profiles["S100"].company_name == "S100 Inc."
+
+    def test_refused_batch_falls_back_per_symbol(self):
+        def respond(endpoint, params):
+            if "," in params["symbol"]:
+                raise HTTPException(status_code=402, detail="Premium endpoint")
+            if params["symbol"] == "BAD":
+                raise HTTPException(status_code=404, detail="Not found")
+            return [profile(params["symbol"])]
+
+        client = FakeFMP(respond)
+        profiles = asyncio.run(client.get_company_profiles(["AAA", "BAD", "CCC"]))
+        assert set(profiles) == {"AAA", "CCC"}
+        assert len(client.requests) == 4
+
+    def test_news_split_by_tickers(self):
+        client = FakeFMP(lambda endpoint, params: [
+            article(1, "NASDAQ:AAA"),
+            article(2, "NASDAQ:AAA, NYSE:BBB"),
+            article(3, "NYSE:OTHER"),
+            article(4, "NASDAQ:AAA"),
+        ])
+
+        news = asyncio.run(client.get_stock_news_batch(["AAA", "BBB", "CCC"], limit=2))
+
+        assert client.requests == [("stock_news", {"tickers": "AAA,BBB,CCC", "limit": 6})]
+        assert [a.title for a in news["AAA"]] == ["headline 1", "headline 2"]
+        assert [a.title for a in news["BBB"]] == ["headline 2"]
+        assert news["CCC"] == []
+
+    def test_failed_news_symbol_is_reported(self):
+        def respond(endpoint, params):
+            if "," in params["tickers"]:
+                raise HTTPException(status_code=402, detail="Premium endpoint")
+            if params["tickers"] == "BBB":
+                raise HTTPException(status_code=503, detail="Service unavailable")
+            return [article(1, params["tickers"])] if params["tickers"] == "AAA" else []
+
+        news = asyncio.run(FakeFMP(respond).get_stock_news_batch(["AAA", "BBB", "CCC"]))
+
+        assert [a.title for a in news["AAA"]] == ["headline 1"]
+        assert isinstance(news["BBB"], HTTPException) and news["BBB"].status_code == 503
+        assert news["CCC"] == []  # answered, just no news
@@ -0,0 +1,83 @@
+"""
+Verify the record/replay transports and the stub server's fault injection.
+"""
+
+import asyncio
+from pathlib import Path
+import pytest
+from fastapi import HTTPException
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.fmp_client import FMPClient
+from app.services.fmp_transport import RecordTransport, ReplayTransport
+from tests.fmp_stub_server import run_stub_server, stub_symbols
+
+FIXTURES = Path(__file__).parent / "fixtures" / "fmp"
+
+class TestFMPRecordReplay:
+
+    def test_replay_seeded_fixtures(self):
+        async def run():
+            async with FMPClient(api_key="test", transport=ReplayTransport(FIXTURES)) as client:
+                profile = await client.get_company_profile("AAPL")
+                # no fixture for limit=2; the recorded AAPL statements answer it
+                statements = await client.get_income_statement("AAPL", limit=2)
+                news = await client.get_stock_news_batch(["MS", "AAPL"], limit=5)
+                with pytest.raises(HTTPException) as missing:
+                    await client.get_company_profile("NOPE")
+            return profile, statements, news, missing.value
+
+        profile, statements, news, missing = asyncio.run(run())
+        assert profile.company_name == "Apple Inc."
+        assert [s.fiscal_year for s in statements] == ["2024"]
+        assert len(news["MS"]) == 1 and news["AAPL"] == []
+        assert missing.status_code == 404
+
+    def test_record_then_replay_offline(self, monkeypatch, tmp_path):
+        symbols = stub_symbols(3)
+
+        async def fetch(client):
+            profiles = await client.get_company_profiles(symbols)
+            statements = await client.get_key_metrics(symbols[0], limit=2)
+            return {s: p.company_name for s, p in profiles.items()}, [m.date for m in statements]
+
+        async def run():
+            async with run_stub_server(symbols=3) as base_url:
+                monkeypatch.setattr(FMPClient, "BASE_URL", base_url)
+                async with FMPClient(api_key="secret", transport=RecordTransport(tmp_path)) as client:
+                    recorded = await fetch(client)
+            # the stub is gone: only the fixtures can answer
+            async with FMPClient(api_key="secret", transport=ReplayTransport(tmp_path)) as client:
+                return recorded, await fetch(client)
+
+        recorded, replayed = asyncio.run(run())
+        assert replayed == recorded
+        assert len(recorded[0]) == 3
+        fixtures = list(tmp_path.rglob("*.json"))
+        assert len(fixtures) == 2
+        assert not any("secret" in path.read_text() for path in fixtures)
+
+    def test_stub_fault_injection_is_retried(self, monkeypatch):
+        monkeypatch.setattr(settings, "fmp_backoff_base", 0.001)
+        monkeypatch.setattr(settings, "fmp_max_retries", 8)
+        monkeypatch.setattr(settings, "fmp_breaker_failure_threshold", 100)  # retries, not the breaker, under test
+        before = dict(metrics.snapshot()["counters"])
+
+        async def run():
+            async with run_stub_server(symbols=5, error_rate=0.3, rate_limit_rate=0.2, retry_after=0, seed=7) as base_url:
+                monkeypatch.setattr(FMPClient, "BASE_URL", base_url)
+                async with FMPClient(api_key="test") as client:
+                    profiles = [await client.get_company_profile(s) for s in stub_symbols(5)]
+                    with pytest.raises(HTTPException) as unknown:
+                        await client.get_company_profile("S00005")
+            return profiles, unknown.value
+
+        profiles, unknown = asyncio.run(run())
+        after = metrics.snapshot()["counters"]
+        retried = lambda reason: after.get(f"fmp_retries_total{{reason={reason}}}", 0) - before.get(
+            f"fmp_retries_total{{reason={reason}}}", 0)
+
+        assert [p.symbol for p in profiles] == stub_symbols(5)
+        assert retried("500") > 0 and retried("429") > 0
+        # outside the stub's universe, like an unknown ticker on FMP
+        assert unknown.status_code == 404
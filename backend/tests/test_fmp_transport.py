@@ -0,0 +1,71 @@
+"""
+Verify the FMP transport: keep-alive reuse, compressed payloads, timeouts and the shared client.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from aiohttp import web
+from app.core.metrics import metrics
+from app.services.fmp_client import FMPClient, fmp_session, get_shared_fmp_client, set_shared_fmp_client
+
+@asynccontextmanager
+async def gzip_server():
+    async def profile(request):
+        response = web.json_response([{"symbol": request.query["symbol"], "companyName": "Gzip Inc." * 50}])
+        response.enable_compression(web.ContentCoding.gzip)
+        return response
+
+    app = web.Application()
+    app.router.add_get("/profile", profile)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        await runner.cleanup()
+
+class TestFMPTransport:
+
+    def test_connections_are_reused_and_payloads_counted(self, monkeypatch):
+        async def run():
+            async with gzip_server() as base_url:
+                monkeypatch.setattr(FMPClient, "BASE_URL", base_url)
+                async with FMPClient(api_key="test") as client:
+                    return [await client.get_company_profile(f"T{i}") for i in range(5)]
+
+        before = metrics.snapshot()["counters"]
+        profiles = asyncio.run(run())
+        after = metrics.snapshot()["counters"]
+
+        delta = lambda name: after.get(name, 0) - before.get(name, 0)
+        assert [p.symbol for p in profiles] == [f"T{i}" for i in range(5)]
+        assert delta("fmp_connections_created_total") == 1
+        assert delta("fmp_connections_reused_total") == 4
+        assert delta("fmp_responses_total{encoding=gzip}") == 5
+        # decompressed bytes exceed what crossed the wire
+        assert delta("fmp_response_bytes_total") > delta("fmp_wire_bytes_total") > 0
+
+    def test_timeouts_per_endpoint(self):
+        assert FMPClient._timeout_for("stock_news").total == 30
+        assert FMPClient._timeout_for("profile").total == 10
+        assert FMPClient._timeout_for("income-statement/AAPL").total == 15
+
+    def test_fmp_session_prefers_shared_client(self):
+        async def run():
+            shared = FMPClient(api_key="test")
+            set_shared_fmp_client(shared)
+            try:
+                async with fmp_session() as client:
+                    assert client is shared
+            finally:
+                set_shared_fmp_client(None)
+
+            async with fmp_session() as client:
+                assert client is not shared and client.session is not None
+            assert client.session.closed
+
+        asyncio.run(run())
+        assert get_shared_fmp_client() is None
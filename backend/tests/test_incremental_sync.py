@@ -0,0 +1,141 @@
+"""
+Verify watermark-driven incremental sync against the local FMP stub server.
+"""
+
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.core.config import settings
+from app.core.database import Base
+from app.models.sync_state import SyncState
+from app.services.fmp_client import FMPClient
+from app.services.business_service import (
+    _periods_due, get_financials_batch, get_income_statements, sync_all, sync_income_statements,
+)
+from tests.fmp_stub_server import run_stub_server
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+SYMBOLS = ["AAA", "BBB", "CCC"]
+
+class TestIncrementalSync:
+
+    def setup_method(self):
+        Base.metadata.create_all(bind=engine)
+
+    def teardown_method(self):
+        Base.metadata.drop_all(bind=engine)
+
+    def sync(self, monkeypatch):
+        """Run one sync_all pass and return the (endpoint, params) of every FMP request."""
+        requests = []
+        request_body = FMPClient._request_body
+
+        async def recording(client, endpoint, params=None):
+            requests.append((endpoint, dict(params or {})))
+            return await request_body(client, endpoint, params)
+
+        monkeypatch.setattr(FMPClient, "_request_body", recording)
+
+        async def run():
+            async with run_stub_server() as base_url:
+                monkeypatch.setattr(FMPClient, "BASE_URL", base_url)
+                db = TestingSessionLocal()
+                try:
+                    return await sync_all(db, SYMBOLS, datasets=["income_statements", "news"])
+                finally:
+                    db.close()
+
+        return asyncio.run(run()), requests
+
+    def test_watermarks_narrow_requests_and_skip_writes(self, monkeypatch):
+        first, _ = self.sync(monkeypatch)
+        assert first["income_statements"]["rows"] == (settings.fmp_max_periods + settings.fmp_max_quarters) * len(SYMBOLS)
+
+        db = TestingSessionLocal()
+        try:
+            states = db.query(SyncState).filter_by(dataset="income_statements").all()
+            assert {(s.symbol, s.period) for s in states} == {(s, p) for s in SYMBOLS for p in ("annual", "quarter")}
+            assert all(s.last_date == date(2024, 12, 31) and len(s.payload_hash) == 64 for s in states)
+        finally:
+            db.close()
+
+        second, requests = self.sync(monkeypatch)
+        limits = {int(params["limit"]) for endpoint, params in requests
+                  if endpoint == "income-statement" and params["period"] == "annual"}
+        assert max(limits) < settings.fmp_max_periods
+        assert all(params["from"] == "2024-12-28" for endpoint, params in requests if endpoint == "stock_news")
+        assert second["news"]["rows"] == 0
+
+        third, _ = self.sync(monkeypatch)
+        assert third["income_statements"]["rows"] == 0
+        assert third["income_statements"]["succeeded"] == len(SYMBOLS)
+
+    def test_listings_default_to_annual_rows(self, monkeypatch):
+        """Both period types are synced, but listings return annual rows unless asked otherwise"""
+        self.sync(monkeypatch)
+        db = TestingSessionLocal()
+        try:
+            page = get_income_statements(db, "AAA", limit=100)
+            assert page["total"] == settings.fmp_max_periods
+            assert {item["period"] for item in page["items"]} == {"FY"}
+
+            page = get_income_statements(db, "AAA", limit=100, period="quarter")
+            assert page["total"] == settings.fmp_max_quarters
+            assert {item["period"] for item in page["items"]} <= {"Q1", "Q2", "Q3", "Q4"}
+            assert get_income_statements(db, "AAA", period="all")["total"] == settings.fmp_max_periods + settings.fmp_max_quarters
+
+            page = get_income_statements(db, "AAA", limit=2, paginate="cursor")
+            page = get_income_statements(db, "AAA", limit=100, cursor=page["next_cursor"])
+            assert len(page["items"]) == settings.fmp_max_periods - 2
+            assert {item["period"] for item in page["items"]} == {"FY"}
+
+            batch = get_financials_batch(db, ["AAA"], ["income_statements"], limit=4)
+            assert [row["period"] for row in batch["AAA"]["income_statements"]] == ["FY"] * 4
+        finally:
+            db.close()
+
+    def test_failed_fetch_leaves_other_symbols_syncing(self, monkeypatch):
+        """With watermarks loaded, one symbol's failing fetch must not fail the rest of the batch"""
+        symbols = [f"S{i:02d}" for i in range(8)]
+        get_income_statement = FMPClient.get_income_statement
+
+        async def failing(client, symbol, *args, **kwargs):
+            if symbol == "S00":
+                raise RuntimeError("upstream timeout")
+            return await get_income_statement(client, symbol, *args, **kwargs)
+
+        async def run():
+            async_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+            async with async_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            SessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+            try:
+                async with run_stub_server() as base_url:
+                    monkeypatch.setattr(FMPClient, "BASE_URL", base_url)
+                    async with SessionLocal() as db:
+                        await sync_income_statements(db, symbols, periods=["annual"])
+                    monkeypatch.setattr(FMPClient, "get_income_statement", failing)
+                    async with SessionLocal() as db:
+                        return await sync_income_statements(db, symbols, periods=["annual"])
+            finally:
+                await async_engine.dispose()
+
+        monkeypatch.setattr(settings, "sync_state_max_age_days", 0)  # every watermark is due again
+        result = asyncio.run(run())
+        assert list(result["failed"]) == ["S00"]
+        assert result["succeeded"] == len(symbols) - 1
+
+    def test_periods_due(self):
+        recent = datetime.now(timezone.utc) - timedelta(hours=1)
+        today = date(2025, 6, 30)
+        assert _periods_due(None, "annual", today) == settings.fmp_max_periods
+        assert _periods_due(SimpleNamespace(last_date=date(2024, 12, 31), last_fetched_at=recent), "annual", today) == 0
+        assert _periods_due(SimpleNamespace(last_date=date(2024, 12, 31), last_fetched_at=recent), "quarter", today) == 2
+        stale = datetime.now(timezone.utc) - timedelta(days=settings.sync_state_max_age_days + 1)
+        assert _periods_due(SimpleNamespace(last_date=date(2024, 12, 31), last_fetched_at=stale), "annual", today) == 1
@@ -0,0 +1,79 @@
+"""
+Verify batched news ingestion in crud_news.
+"""
+
+import asyncio
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.crud.crud_news import bulk_create_articles
+from app.models.news import NewsArticle
+from app.models.sync_state import SyncState
+from app.schemas.fmp_schemas import FMPArticle
+from app.services.business_service import sync_stock_news
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def article(i):
+    return FMPArticle(
+        title=f"Headline {i}",
+        date=f"2025-07-{i + 1:02d} 17:00:04",
+        content="<p>body</p>",
+        tickers="NASDAQ:AAPL",
+        image="https://images.example.com/a.jpg",
+        link=f"https://news.example.com/{i}",
+        author="Author",
+        site="example.com",
+    )
+
+class NewsOutage:
+    """Client whose news request for BAD fails; the other symbols get one article."""
+
+    async def get_stock_news_batch(self, symbols, limit=20, from_date=None):
+        return {s: HTTPException(status_code=503, detail="Service unavailable") if s == "BAD" else [article(0)]
+                for s in symbols}
+
+class NoNews:
+    """Client that answers every news request with no articles."""
+
+    async def get_stock_news_batch(self, symbols, limit=20, from_date=None):
+        return {s: [] for s in symbols}
+
+class TestNewsIngestion:
+
+    def setup_method(self):
+        Base.metadata.create_all(bind=engine)
+        self.db = TestingSessionLocal()
+
+    def teardown_method(self):
+        self.db.close()
+        Base.metadata.drop_all(bind=engine)
+
+    def test_dedups_in_batch_and_against_db(self):
+        """Repeated links and already-stored links are skipped; other symbols are independent"""
+        assert bulk_create_articles(self.db, [article(0), article(1), article(0)], "AAPL") == 2
+        assert bulk_create_articles(self.db, [article(1), article(2), article(3)], "AAPL", batch_size=2) == 2
+        assert bulk_create_articles(self.db, [article(1)], "MSFT") == 1
+
+        assert self.db.query(NewsArticle).filter_by(symbol="AAPL").count() == 4
+        stored = self.db.query(NewsArticle).filter_by(symbol="AAPL", url="https://news.example.com/2").one()
+        assert stored.published_date.isoformat() == "2025-07-03T17:00:04"
+
+    def test_failed_news_fetch_counts_as_failed(self):
+        """A symbol whose news request failed is reported, not synced as having no news"""
+        result = asyncio.run(sync_stock_news(self.db, ["AAPL", "BAD"], fmp_client=NewsOutage()))
+
+        assert result["succeeded"] == 1 and result["rows"] == 1
+        assert list(result["failed"]) == ["BAD"]
+        assert "Service unavailable" in result["failed"]["BAD"]
+
+    def test_symbol_without_news_is_stamped(self):
+        """An empty answer records the fetch, so freshness checks do not re-sync the symbol"""
+        result = asyncio.run(sync_stock_news(self.db, ["QUIET"], fmp_client=NoNews()))
+
+        assert result["succeeded"] == 1 and result["rows"] == 0
+        state = self.db.query(SyncState).filter_by(symbol="QUIET", dataset="news").one()
+        assert state.last_fetched_at is not None and state.last_date is None
@@ -0,0 +1,74 @@
+"""
+Verify offset and keyset (cursor) pagination for the financial endpoints.
+"""
+
+import pytest
+from datetime import date
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.crud.crud_financials import bulk_upsert
+from app.models.financials import KeyMetric
+from app.services.business_service import get_key_metrics
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class TestPagination:
+
+    def setup_method(self):
+        Base.metadata.create_all(bind=engine)
+        self.db = TestingSessionLocal()
+        # Two periods share each date so the id tie-breaker matters
+        rows = [
+            {"symbol": "AAPL", "date": date(2000 + i // 2, 12, 31), "fiscal_year": str(2000 + i // 2),
+             "period": "FY" if i % 2 else "Q4", "pe_ratio": float(i), "company_id": 1}
+            for i in range(25)
+        ]
+        bulk_upsert(self.db, KeyMetric, rows)
+
+    def teardown_method(self):
+        self.db.close()
+        Base.metadata.drop_all(bind=engine)
+
+    def test_offset_mode_keeps_total(self):
+        """Offset mode still returns skip/limit/total and reports has_more"""
+        page = get_key_metrics(self.db, "AAPL", skip=20, limit=10, period="all")
+        assert page["total"] == 25
+        assert len(page["items"]) == 5
+        assert page["has_more"] is False
+
+    def test_cursor_walks_every_row_once(self):
+        """Following next_cursor visits all rows newest first without duplicates"""
+        seen, cursor = [], None
+        while True:
+            page = get_key_metrics(self.db, "AAPL", limit=7, cursor=cursor, paginate="cursor", period="all")
+            assert "total" not in page
+            seen.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if not page["has_more"]:
+                break
+        assert len(seen) == len(set(seen)) == 25
+        dates = [m.date for m in sorted(self.db.query(KeyMetric).all(), key=lambda m: seen.index(m.id))]
+        assert dates == sorted(dates, reverse=True)
+
+    def test_cursor_total_on_request(self):
+        page = get_key_metrics(self.db, "AAPL", limit=5, paginate="cursor", include_total=True, period="all")
+        assert page["total"] == 25
+        assert page["has_more"] is True
+
+    def test_invalid_cursor_is_rejected(self):
+        with pytest.raises(HTTPException) as error:
+            get_key_metrics(self.db, "AAPL", cursor="not-a-cursor")
+        assert error.value.status_code == 400
+
+    def test_cursor_is_tied_to_its_period(self):
+        """A cursor from the annual listing only pages the annual listing"""
+        page = get_key_metrics(self.db, "AAPL", limit=5, paginate="cursor", include_total=True)
+        assert page["total"] == 12
+        assert {item["period"] for item in page["items"]} == {"FY"}
+        with pytest.raises(HTTPException) as error:
+            get_key_metrics(self.db, "AAPL", limit=5, cursor=page["next_cursor"], period="quarter")
+        assert error.value.status_code == 400
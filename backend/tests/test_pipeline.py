@@ -0,0 +1,64 @@
+"""
+Verify the DAG pipeline runner and its run report.
+"""
+
+import asyncio
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.cli import build_parser
+from app.core.database import Base
+from app.services import pipeline
+from app.services.fmp_client import FMPClient
+from tests.fmp_stub_server import run_stub_server
+
+SYMBOLS = ["P001", "P002", "P003"]
+
+def run_pipeline(monkeypatch, tmp_path, **options):
+    async def run():
+        # a file database: every stage opens its own session and connection
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pipeline.db'}", poolclass=NullPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        try:
+            async with run_stub_server(latency=0.01) as base_url:
+                monkeypatch.setattr(FMPClient, "BASE_URL", base_url)
+                return await pipeline.run_pipeline(
+                    SYMBOLS,
+                    session_factory=async_sessionmaker(engine, autoflush=False, expire_on_commit=False),
+                    **options,
+                )
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+class TestPipeline:
+
+    def test_stages_follow_their_dependencies(self, monkeypatch, tmp_path):
+        report = run_pipeline(monkeypatch, tmp_path)
+        assert report["status"] == "succeeded"
+        assert list(report["stages"]) == list(pipeline.STAGE_DEPENDENCIES)
+        stages = report["stages"]
+        assert all(stages[name]["result"]["succeeded"] == len(SYMBOLS) for name in stages)
+        # news has no dependency and starts with profiles; statements wait for profiles
+        assert stages["news"]["started_at"] < stages["income_statements"]["started_at"]
+        assert stages["key_metrics"]["started_at"] >= stages["profiles"]["started_at"]
+        assert report["wall_seconds"] < report["stage_seconds_total"]
+
+    def test_failed_dependency_skips_dependents(self, monkeypatch, tmp_path):
+        async def broken(*args, **kwargs):
+            raise RuntimeError("profile endpoint down")
+
+        monkeypatch.setitem(pipeline.SYNC_FUNCTIONS, "profiles", broken)
+        report = run_pipeline(monkeypatch, tmp_path, stages=["profiles", "key_metrics", "news"])
+
+        assert report["status"] == "partial"
+        assert report["stages"]["profiles"]["status"] == "failed"
+        assert report["stages"]["profiles"]["error"] == "profile endpoint down"
+        assert report["stages"]["key_metrics"]["status"] == "skipped"
+        assert report["stages"]["news"]["status"] == "succeeded"
+
+    def test_cli_arguments(self):
+        args = build_parser().parse_args(["sync", "--symbols", "aapl, msft", "--stages", "profiles,news", "--report", "-"])
+        assert args.symbols == ["AAPL", "MSFT"]
+        assert args.stages == ["profiles", "news"]
+        assert args.report == "-"
@@ -0,0 +1,121 @@
+"""
+Verify the FMP token bucket and the client's retry/backoff behaviour.
+"""
+
+import asyncio
+import time
+import pytest
+from aiohttp import web
+from fastapi import HTTPException
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.fmp_client import FMPClient
+from app.services.rate_limiter import RedisTokenBucket, TokenBucket, parse_retry_after, requests_per_minute
+
+async def serve(statuses, check):
+    """Answer each request with the next status; 200 returns one profile row."""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.path)
+        status = statuses[min(len(calls), len(statuses)) - 1]
+        if status == 200:
+            return web.json_response([{"symbol": "AAPL", "companyName": "Apple Inc."}])
+        return web.Response(status=status, headers={"Retry-After": "0"})
+
+    app = web.Application()
+    app.router.add_get("/profile", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        port = runner.addresses[0][1]
+        FMPClient.BASE_URL = f"http://127.0.0.1:{port}"
+        async with FMPClient(api_key="test") as client:
+            return await check(client), calls
+    finally:
+        await runner.cleanup()
+
+class TestRateLimiter:
+
+    def test_bucket_spaces_requests_at_the_configured_rate(self, clock):
+        bucket = TokenBucket(requests_per_minute=60, clock=clock)
+        assert [bucket.reserve() for _ in range(3)] == [0.0, 1.0, 2.0]
+        clock.now = 2.0
+        assert bucket.reserve() == 1.0
+
+    def test_pause_holds_back_every_caller(self, clock):
+        bucket = TokenBucket(requests_per_minute=6000, clock=clock)
+        bucket.pause(5)
+        assert bucket.reserve() == 5.0
+        clock.now = 5.0
+        assert bucket.reserve() == 0.0
+
+    def test_redis_round_trips_leave_the_loop_free(self):
+        class SlowRedis:
+            """Every script call is a 50ms round trip; reservations never wait."""
+
+            def register_script(self, script):
+                return lambda keys, args: time.sleep(0.05) or "0"
+
+        bucket = RedisTokenBucket(SlowRedis(), requests_per_minute=60)
+
+        async def run():
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.005)
+                    ticks += 1
+
+            ticker = asyncio.ensure_future(tick())
+            await bucket.acquire()
+            await bucket.acquire()
+            await bucket.pause_async(1)
+            ticker.cancel()
+            return ticks
+
+        assert asyncio.run(run()) >= 10
+
+    def test_tier_and_override(self, monkeypatch):
+        monkeypatch.setattr(settings, "fmp_plan_tier", "free")
+        monkeypatch.setattr(settings, "fmp_rate_limit_delay", 2)
+        assert requests_per_minute() == 30
+        monkeypatch.setattr(settings, "fmp_plan_tier", "premium")
+        assert requests_per_minute() == 750
+        monkeypatch.setattr(settings, "fmp_requests_per_minute", 100)
+        assert requests_per_minute() == 100
+
+    def test_retry_after_formats(self):
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+        assert parse_retry_after("soon") is None
+
+class TestClientRetries:
+
+    @pytest.fixture(autouse=True)
+    def fast_backoff(self, monkeypatch):
+        monkeypatch.setattr(settings, "fmp_backoff_base", 0.001)
+        monkeypatch.setattr(FMPClient, "BASE_URL", FMPClient.BASE_URL)
+
+    def test_recovers_after_throttling(self):
+        """429s and 5xx are retried instead of dropping the symbol"""
+        before = metrics.counter("fmp_retries_total", reason="429")
+        profile, calls = asyncio.run(serve([429, 503, 200], lambda client: client.get_company_profile("AAPL")))
+        assert profile.symbol == "AAPL"
+        assert len(calls) == 3
+        assert metrics.counter("fmp_retries_total", reason="429") == before + 1
+
+    def test_gives_up_after_max_retries(self, monkeypatch):
+        monkeypatch.setattr(settings, "fmp_max_retries", 2)
+
+        async def check(client):
+            with pytest.raises(HTTPException) as error:
+                await client.get_company_profile("AAPL")
+            return error.value.status_code
+
+        status, calls = asyncio.run(serve([502], check))
+        assert status == 502
+        assert len(calls) == 3
@@ -0,0 +1,189 @@
+"""
+Verify the background sync scheduler: cron parsing, one runner per job and the job report.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+import httpx
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.cache import InMemoryCache
+from app.core.config import settings
+from app.core.database import Base
+from app.crud.crud_sync_runs import create_sync_run
+from app.main import app
+from app.models.sync_run import SyncRun
+from app.services import scheduler as scheduler_module
+from app.services.scheduler import CronSchedule, Job, Scheduler, set_scheduler
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+def report(rows=3, failed=None, status="succeeded"):
+    result = {"dataset": "news", "symbols": 2, "succeeded": 2, "rows": rows, "failed": failed or {}}
+    return {"symbols": ["AAPL", "MSFT"], "status": status, "stages": {"news": {"status": "succeeded", "result": result}}}
+
+@pytest.fixture
+def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    asyncio.run(create())
+    yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Replace the sync pipeline with a recorder; set .delay or .result to shape the runs."""
+    class FakePipeline:
+        calls = []
+        triggers = []
+        delay = 0
+        result = report()
+
+        async def __call__(self, symbols, stages, session_factory, trigger):
+            self.calls.append((symbols, stages))
+            self.triggers.append(trigger)
+            await asyncio.sleep(self.delay)
+            if isinstance(self.result, Exception):
+                raise self.result
+            return self.result
+
+    fake = FakePipeline()
+    monkeypatch.setattr(scheduler_module, "run_pipeline", fake)
+    return fake
+
+class TestCronSchedule:
+
+    def test_next_after(self):
+        assert CronSchedule("*/15 * * * *").next_after(utc(2024, 5, 1, 10, 7, 30)) == utc(2024, 5, 1, 10, 15)
+        assert CronSchedule("30 6 * * *").next_after(utc(2024, 5, 1, 6, 30)) == utc(2024, 5, 2, 6, 30)
+        assert CronSchedule("0 */6 * * *").next_after(utc(2024, 12, 31, 19, 0)) == utc(2025, 1, 1, 0, 0)
+        assert CronSchedule("0 9 * * 1-5").next_after(utc(2024, 5, 3, 10, 0)) == utc(2024, 5, 6, 9, 0)  # Fri -> Mon
+        assert CronSchedule("0 0 29 2 *").next_after(utc(2023, 3, 1)) == utc(2024, 2, 29)
+        assert CronSchedule("5/20 8,20 * * 7").next_after(utc(2024, 5, 5, 8, 30)) == utc(2024, 5, 5, 8, 45)
+        # both day fields restricted: either one matches, as in cron
+        assert CronSchedule("0 0 1 * 1").next_after(utc(2024, 5, 2)) == utc(2024, 5, 6)
+
+    @pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *", "a * * * *", "0 0 30 2 *"])
+    def test_invalid(self, expression):
+        with pytest.raises(ValueError):
+            CronSchedule(expression).next_after(utc(2024, 1, 1))
+
+class TestScheduler:
+
+    def test_one_replica_runs_each_slot(self, session_factory, pipeline):
+        backend = InMemoryCache()  # shared, as replicas share Redis
+        replicas = [Scheduler(session_factory=session_factory, backend=backend) for _ in range(3)]
+        slot = utc(2024, 5, 1, 10, 15)
+
+        async def run():
+            first = await asyncio.gather(*(r.run_job("news", slot) for r in replicas))
+            second = await asyncio.gather(*(r.run_job("news", utc(2024, 5, 1, 10, 30)) for r in replicas))
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert sum(run is not None for run in first) == 1
+        assert sum(run is not None for run in second) == 1
+        assert len(pipeline.calls) == 2
+        symbols, stages = pipeline.calls[0]
+        assert symbols == settings.FAANG_SYMBOLS and stages == ["news"]
+
+        # every replica reports the runs, wherever they happened
+        status = replicas[2].status()["jobs"]["news"]
+        assert status["runs"] == 2 and status["failures"] == 0
+        assert status["last_run"]["rows"] == 3 and status["last_run"]["slot"] == "2024-05-01T10:30:00+00:00"
+
+    def test_running_job_is_not_started_again(self, session_factory, pipeline, monkeypatch):
+        monkeypatch.setattr(settings, "scheduler_lease_ttl", 0.03)
+        pipeline.delay = 0.1  # the lease is renewed past its ttl while the job runs
+        backend = InMemoryCache()
+        a, b = (Scheduler(session_factory=session_factory, backend=backend) for _ in range(2))
+
+        async def run():
+            long_run = asyncio.create_task(a.run_job("profiles", utc(2024, 5, 1, 0, 0)))
+            await asyncio.sleep(0.06)
+            overlapping = await b.run_job("profiles", utc(2024, 5, 1, 6, 0))
+            return await long_run, overlapping
+
+        finished, overlapping = asyncio.run(run())
+        assert finished["status"] == "succeeded"
+        assert overlapping is None
+        assert len(pipeline.calls) == 1
+
+    def test_failures_are_counted(self, session_factory, pipeline):
+        scheduler = Scheduler(session_factory=session_factory, backend=InMemoryCache())
+
+        async def run():
+            pipeline.result = report(failed={"MSFT": "timeout"}, status="partial")
+            partial = await scheduler.run_job("news", utc(2024, 5, 1, 10, 0))
+            pipeline.result = RuntimeError("database is down")
+            crashed = await scheduler.run_job("news", utc(2024, 5, 1, 10, 15))
+            return partial, crashed
+
+        partial, crashed = asyncio.run(run())
+        assert partial["status"] == "partial" and partial["failed_symbols"] == 1
+        assert crashed["status"] == "failed" and crashed["error"] == "database is down"
+        status = scheduler.status()["jobs"]["news"]
+        assert (status["runs"], status["failures"]) == (2, 2)
+        assert status["last_failure"]["slot"] == "2024-05-01T10:15:00+00:00"
+
+    def test_scheduled_runs_are_pruned(self, session_factory, pipeline, monkeypatch):
+        monkeypatch.setattr(settings, "scheduler_runs_kept", 2)
+        scheduler = Scheduler(session_factory=session_factory, backend=InMemoryCache())
+
+        async def run():
+            async with session_factory() as db:
+                for trigger in ("scheduled", "manual", "scheduled", "scheduled"):
+                    await db.run_sync(create_sync_run, ["AAPL"], ["news"], trigger=trigger)
+            await scheduler.run_job("news")
+            async with session_factory() as db:
+                return (await db.execute(select(SyncRun.id, SyncRun.trigger).order_by(SyncRun.id))).all()
+
+        assert asyncio.run(run()) == [(2, "manual"), (3, "scheduled"), (4, "scheduled")]
+        assert pipeline.triggers[-1] == "scheduled"
+
+    def test_loop_waits_for_the_slot_plus_jitter(self, session_factory, pipeline, monkeypatch):
+        monkeypatch.setattr(settings, "scheduler_jitter", 10)
+        now = utc(2024, 5, 1, 10, 14, 30)
+        delays = []
+
+        async def sleep(seconds):
+            delays.append(seconds)
+            if len(delays) > 1:
+                raise asyncio.CancelledError
+
+        scheduler = Scheduler({"news": Job("news", "*/15 * * * *")}, session_factory, InMemoryCache(),
+                              now=lambda: now, sleep=sleep)
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(scheduler._loop(scheduler.jobs["news"]))
+        assert 30 <= delays[0] <= 40
+        assert scheduler.status()["jobs"]["news"]["last_run"]["slot"] == "2024-05-01T10:15:00+00:00"
+
+    def test_admin_jobs_endpoint(self, session_factory, pipeline, monkeypatch):
+        scheduler = Scheduler(session_factory=session_factory, backend=InMemoryCache())
+        set_scheduler(scheduler)
+
+        async def run(*tokens):
+            await scheduler.run_job("financials")
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return [await client.get("/admin/jobs", headers={"X-Admin-Token": t} if t else None) for t in tokens]
+
+        try:
+            disabled, = asyncio.run(run("s3cret"))
+            monkeypatch.setattr(settings, "admin_token", "s3cret")
+            missing, wrong, response = asyncio.run(run(None, "guess", "s3cret"))
+        finally:
+            set_scheduler(None)
+        assert disabled.status_code == 404
+        assert missing.status_code == wrong.status_code == 401
+        assert response.status_code == 200
+        jobs = response.json()["jobs"]
+        assert set(jobs) == set(settings.scheduler_jobs)
+        assert jobs["financials"]["stages"] == ["income_statements", "key_metrics", "financial_ratios"]
+        assert jobs["financials"]["last_run"]["rows"] == 3 and jobs["financials"]["last_run"]["seconds"] >= 0
+        assert jobs["news"]["runs"] == 0 and jobs["news"]["last_run"] is None
@@ -0,0 +1,222 @@
+"""
+Verify request coalescing: in-process singleflight and the cross-worker cache-fill lock.
+"""
+
+import asyncio
+import threading
+import time
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.util.concurrency import await_only, greenlet_spawn
+from app.core.cache import InMemoryCache, get_cache, read_through
+from app.core.config import settings
+from app.core.database import Base
+from app.core.metrics import metrics
+from app.core.singleflight import SingleFlight, run_db_coalesced, singleflight
+from app.crud.crud_company import create_minimal_company
+from app.services.business_service import get_company_profile
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one_execution(self):
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"symbol": "AAPL"}
+
+        async def run():
+            group = SingleFlight()
+            results = await asyncio.gather(*(group.do("AAPL", load) for _ in range(10)))
+            assert len(group) == 0
+            # finished calls are not remembered: the next one runs again
+            await group.do("AAPL", load)
+            return results
+
+        results = asyncio.run(run())
+        assert len(calls) == 2
+        assert all(result is results[0] for result in results)
+
+    def test_errors_are_shared_and_not_remembered(self):
+        calls = []
+
+        async def missing():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise HTTPException(status_code=404, detail="not found")
+
+        async def run():
+            group = SingleFlight()
+            return await asyncio.gather(*(group.do("ZZZ", missing) for _ in range(5)), return_exceptions=True)
+
+        outcomes = asyncio.run(run())
+        assert len(calls) == 1
+        assert all(isinstance(o, HTTPException) and o.status_code == 404 for o in outcomes)
+
+    def test_cancelled_caller_does_not_cancel_the_others(self):
+        async def load():
+            await asyncio.sleep(0.05)
+            return 42
+
+        async def run():
+            group = SingleFlight()
+            first = asyncio.ensure_future(group.do("k", load))
+            second = asyncio.ensure_future(group.do("k", load))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(run()) == 42
+
+    def test_service_calls_on_async_sessions(self):
+        """Ten concurrent profile reads cost one query"""
+        statements = []
+
+        async def run():
+            engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+            event.listen(engine.sync_engine, "before_cursor_execute",
+                         lambda conn, cursor, statement, *args: statements.append(statement))
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+            try:
+                async with SessionLocal() as db:
+                    await db.run_sync(create_minimal_company, "AAPL")
+                statements.clear()
+                sessions = [SessionLocal() for _ in range(10)]
+                profiles = await asyncio.gather(*(run_db_coalesced(db, get_company_profile, "AAPL") for db in sessions))
+                for db in sessions:
+                    await db.close()
+                return profiles
+            finally:
+                await engine.dispose()
+
+        before = metrics.counter("singleflight_calls_total", role="follower")
+        profiles = asyncio.run(run())
+        assert [p["symbol"] for p in profiles] == ["AAPL"] * 10
+        assert len(statements) == 1
+        assert metrics.counter("singleflight_calls_total", role="follower") - before == 9
+        assert 0 < metrics.snapshot()["gauges"]["singleflight_coalesced_ratio"] <= 1
+        assert len(singleflight) == 0
+
+    def test_cancelled_leader_does_not_break_followers(self):
+        """The shared read owns its session, so the leader's request ending mid-read is harmless"""
+
+        def slow_profile(db, symbol):
+            connection = db.connection()  # a query in flight holds the session's connection
+            await_only(asyncio.sleep(0.05))
+            connection.exec_driver_sql("SELECT 1")
+            return get_company_profile(db, symbol)
+
+        async def read(SessionLocal):
+            async with SessionLocal() as db:
+                return await run_db_coalesced(db, slow_profile, "AAPL")
+
+        async def run():
+            engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+            try:
+                async with SessionLocal() as db:
+                    await db.run_sync(create_minimal_company, "AAPL")
+                leader = asyncio.ensure_future(read(SessionLocal))
+                await asyncio.sleep(0.01)
+                follower = asyncio.ensure_future(read(SessionLocal))
+                await asyncio.sleep(0.01)
+                leader.cancel()  # the client disconnected; its session is closed
+                return await follower, leader.cancelled()
+            finally:
+                await engine.dispose()
+
+        profile, cancelled = asyncio.run(run())
+        assert cancelled and profile["symbol"] == "AAPL"
+        assert len(singleflight) == 0
+
+class TestCacheFillLock:
+
+    def test_other_workers_wait_for_the_fill(self):
+        """Threads sharing one backend stand in for workers sharing Redis"""
+        calls = []
+
+        def slow_loader():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"revenue": 1}
+
+        results = []
+        workers = [
+            threading.Thread(target=lambda: results.append(
+                read_through("income_statements", "AAPL", {"symbol": "AAPL"}, slow_loader)))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert len(calls) == 1
+        assert results == [{"revenue": 1}] * 4
+
+    def test_failed_fill_lets_a_waiter_take_over(self, monkeypatch):
+        monkeypatch.setattr(settings, "cache_lock_wait", 5)
+        calls = []
+
+        def failing_then_ok():
+            calls.append(1)
+            time.sleep(0.05)
+            if len(calls) == 1:
+                raise HTTPException(status_code=404, detail="not yet")
+            return {"ok": True}
+
+        outcomes = []
+
+        def worker():
+            try:
+                outcomes.append(read_through("company", "AAPL", {"symbol": "AAPL"}, failing_then_ok))
+            except HTTPException as e:
+                outcomes.append(e.status_code)
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # the waiter took the released lock instead of sitting out cache_lock_wait
+        assert time.monotonic() - started < 1
+        assert sorted(outcomes, key=str) == [404, {"ok": True}]
+
+    def test_waiting_inside_run_sync_does_not_block_the_loop(self):
+        cache = get_cache()
+        lock_key = "foresight:cache:news:symbol=AAPL:lock"
+        token = cache.acquire(lock_key, 10)
+        calls = []
+
+        async def other_worker_fills():
+            await asyncio.sleep(0.05)
+            cache.set("foresight:cache:news:symbol=AAPL", '["filled"]', ttl=60)
+            cache.release(lock_key, token)
+
+        async def run():
+            waiter = greenlet_spawn(read_through, "news", "AAPL", {"symbol": "AAPL"}, lambda: calls.append(1))
+            return (await asyncio.gather(waiter, other_worker_fills()))[0]
+
+        assert asyncio.run(run()) == ["filled"]
+        assert calls == []
+
+    def test_expired_lock_can_be_taken(self, clock):
+        cache = InMemoryCache(clock=clock)
+        token = cache.acquire("k:lock", ttl=10)
+        assert token and cache.acquire("k:lock", ttl=10) is None
+        clock.now = 10
+        second = cache.acquire("k:lock", ttl=10)
+        assert second
+        cache.release("k:lock", token)  # a stale holder cannot release the new lock
+        assert cache.acquire("k:lock", ttl=10) is None
+        cache.release("k:lock", second)
+        assert cache.acquire("k:lock", ttl=10)
@@ -0,0 +1,118 @@
+"""
+Verify the concurrent sync engine against the local FMP stub server.
+"""
+
+import asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.core.database import Base
+from app.models.company import Company
+from app.models.financials import IncomeStatement, KeyMetric
+from app.services.fmp_client import FMPClient
+from app.services import business_service
+from app.services.business_service import sync_all, sync_company_profiles, sync_income_statements
+from tests.fmp_stub_server import run_stub_server
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class TestSyncEngine:
+
+    @classmethod
+    def setup_class(cls):
+        Base.metadata.create_all(bind=engine)
+
+    @classmethod
+    def teardown_class(cls):
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+
+    def test_sync_all_fans_out_over_stub(self, monkeypatch):
+        """Every symbol and dataset is synced through one shared client"""
+        symbols = [f"T{i:03d}" for i in range(20)]
+
+        async def run():
+            async with run_stub_server() as base_url:
+                monkeypatch.setattr(FMPClient, "BASE_URL", base_url)
+                db = TestingSessionLocal()
+                try:
+                    return await sync_all(db, symbols, concurrency=8)
+                finally:
+                    db.close()
+
+        results = asyncio.run(run())
+
+        assert set(results) == {"profiles", "income_statements", "key_metrics", "financial_ratios", "news"}
+        for result in results.values():
+            assert result["succeeded"] == len(symbols)
+            assert result["failed"] == {}
+
+        db = TestingSessionLocal()
+        try:
+            assert db.query(Company).count() == len(symbols)
+            assert db.query(IncomeStatement).count() == results["income_statements"]["rows"]
+            assert db.query(KeyMetric).count() == results["key_metrics"]["rows"]
+        finally:
+            db.close()
+
+    def test_sync_all_on_async_session(self, monkeypatch):
+        """The same pipeline runs on an AsyncSession without blocking the loop"""
+        symbols = [f"A{i:03d}" for i in range(10)]
+
+        async def run():
+            async_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+            async with async_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+            try:
+                async with run_stub_server() as base_url:
+                    monkeypatch.setattr(FMPClient, "BASE_URL", base_url)
+                    async with AsyncTestingSessionLocal() as db:
+                        results = await sync_all(db, symbols, concurrency=4)
+                        companies = await db.run_sync(lambda s: s.query(Company).count())
+                return results, companies
+            finally:
+                await async_engine.dispose()
+
+        results, companies = asyncio.run(run())
+        assert companies == len(symbols)
+        assert all(result["failed"] == {} for result in results.values())
+        assert results["income_statements"]["rows"] == (5 + 8) * len(symbols)  # five fiscal years and eight quarters
+
+    def test_failed_symbol_is_isolated(self, monkeypatch):
+        """A symbol whose write fails is rolled back on its own session; the caller's session is untouched"""
+        symbols = [f"F{i:03d}" for i in range(6)]
+        upsert = business_service.upsert_income_statements
+
+        def failing_upsert(db, rows, company_id, symbol):
+            if symbol == "F000":
+                raise RuntimeError("disk full")
+            return upsert(db, rows, company_id, symbol)
+
+        monkeypatch.setattr(business_service, "upsert_income_statements", failing_upsert)
+
+        async def run():
+            async_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+            async with async_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+            try:
+                async with run_stub_server() as base_url:
+                    monkeypatch.setattr(FMPClient, "BASE_URL", base_url)
+                    async with AsyncTestingSessionLocal() as db:
+                        await sync_company_profiles(db, symbols)
+                        company = await db.run_sync(lambda s: s.query(Company).filter_by(symbol="F001").one())
+                        result = await sync_income_statements(db, symbols, periods=["annual"], concurrency=3)
+                        # still loaded: reading it needs no lazy refresh outside the greenlet
+                        name = company.company_name
+                        statements = await db.run_sync(lambda s: s.query(IncomeStatement).count())
+                return result, name, statements
+            finally:
+                await async_engine.dispose()
+
+        result, name, statements = asyncio.run(run())
+        assert result["failed"] == {"F000": "disk full"}
+        assert result["succeeded"] == len(symbols) - 1
+        assert name and statements == result["rows"]
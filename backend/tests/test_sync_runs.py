@@ -0,0 +1,162 @@
+"""
+Verify recorded sync runs: checkpoints, resuming an interrupted run and the dead-letter table.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+from app.cli import build_parser
+from app.core.config import settings
+from app.core.database import Base
+from app.crud.crud_sync_runs import prune_sync_runs
+from app.models.sync_run import SyncCheckpoint, SyncDeadLetter, SyncRun
+from app.services import pipeline
+from app.services.fmp_client import FMPClient
+from tests.fmp_stub_server import run_stub_server, stub_symbols
+
+class Crash(BaseException):
+    """Stands in for the process dying mid-run: nothing in the pipeline catches it."""
+
+@pytest.fixture
+def database(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'runs.db'}", poolclass=NullPool)
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    asyncio.run(create())
+    yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+@pytest.fixture(autouse=True)
+def quick_retries(monkeypatch):
+    monkeypatch.setattr(settings, "sync_retry_delay", 0)
+    monkeypatch.setattr(settings, "fmp_sync_periods", ["annual"])
+
+def run(monkeypatch, scenario, **stub_options):
+    async def main():
+        async with run_stub_server(**stub_options) as base_url:
+            monkeypatch.setattr(FMPClient, "BASE_URL", base_url)
+            return await scenario()
+    return asyncio.run(main())
+
+async def query(SessionLocal, statement):
+    async with SessionLocal() as db:
+        return (await db.execute(statement)).scalars().all()
+
+class TestSyncRuns:
+
+    def test_run_and_checkpoints_are_recorded(self, monkeypatch, database):
+        symbols = stub_symbols(3)
+
+        async def scenario():
+            report = await pipeline.run_pipeline(symbols, stages=["profiles", "news"], session_factory=database)
+            return report, await query(database, select(SyncRun)), await query(database, select(SyncCheckpoint))
+
+        report, [sync_run], checkpoints = run(monkeypatch, scenario, symbols=3)
+        assert report["run_id"] == sync_run.id
+        assert sync_run.status == "succeeded" and sync_run.finished_at is not None
+        assert sync_run.created_at is not None and sync_run.created_at <= sync_run.finished_at
+        assert sync_run.report["stages"]["news"]["result"]["succeeded"] == 3
+        assert sorted((c.dataset, c.symbol, c.status) for c in checkpoints) == sorted(
+            (dataset, symbol, "succeeded") for dataset in ("profiles", "news") for symbol in symbols
+        )
+
+    def test_interrupted_run_resumes_where_it_stopped(self, monkeypatch, database):
+        monkeypatch.setattr(settings, "sync_checkpoint_chunk", 2)
+        symbols = stub_symbols(5)
+        sync_key_metrics = pipeline.SYNC_FUNCTIONS["key_metrics"]
+        calls = []
+
+        async def crashing(db, batch, **kwargs):
+            calls.append(list(batch))
+            if len(calls) == 2:
+                raise Crash()
+            return await sync_key_metrics(db, batch, **kwargs)
+
+        monkeypatch.setitem(pipeline.SYNC_FUNCTIONS, "key_metrics", crashing)
+
+        async def scenario():
+            with pytest.raises(Crash):
+                await pipeline.run_pipeline(symbols, stages=["profiles", "key_metrics"], session_factory=database)
+            [interrupted] = await query(database, select(SyncRun.status))
+            report = await pipeline.resume_pipeline(session_factory=database)
+            return interrupted, report
+
+        interrupted, report = run(monkeypatch, scenario, symbols=5)
+        assert interrupted == "running"
+        # the first chunk was checkpointed; the resumed run starts at the chunk that crashed
+        assert calls == [symbols[:2], symbols[2:4], symbols[2:4], symbols[4:]]
+        assert report["status"] == "succeeded"
+        assert report["stages"]["profiles"]["result"]["resumed"] == 5
+        assert report["stages"]["key_metrics"]["result"]["resumed"] == 2
+        assert report["stages"]["key_metrics"]["result"]["succeeded"] == 3
+
+    def test_repeated_failures_are_dead_lettered_and_retried_later(self, monkeypatch, database):
+        known, missing = stub_symbols(3), stub_symbols(4)[3]
+
+        async def first_run():
+            report = await pipeline.run_pipeline(known + [missing], stages=["profiles"], session_factory=database)
+            return report, await query(database, select(SyncDeadLetter)), await query(database, select(SyncCheckpoint))
+
+        report, [letter], checkpoints = run(monkeypatch, first_run, symbols=3)
+        result = report["stages"]["profiles"]["result"]
+        assert report["status"] == "partial"
+        assert result["retried"] == settings.sync_retry_attempts and list(result["failed"]) == [missing]
+        assert (letter.symbol, letter.dataset, letter.failures) == (missing, "profiles", 1)
+        assert "No profile data" in letter.error
+        [failed] = [c for c in checkpoints if c.status == "failed"]
+        assert failed.symbol == missing and failed.attempts == settings.sync_retry_attempts + 1
+
+        async def second_run():
+            # the backoff has passed, and the provider knows the symbol by now
+            async with database() as db:
+                await db.execute(update(SyncDeadLetter).values(
+                    next_retry_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+                await db.commit()
+            report = await pipeline.run_pipeline(known[:1], stages=["profiles"], session_factory=database)
+            return report, await query(database, select(SyncDeadLetter))
+
+        report, letters = run(monkeypatch, second_run, symbols=4)
+        assert report["stages"]["profiles"]["result"]["succeeded"] == 2
+        assert letters == []
+
+    def test_scheduled_runs_are_not_resumed_and_get_pruned(self, monkeypatch, database):
+        symbols = stub_symbols(2)
+        sync_news = pipeline.SYNC_FUNCTIONS["news"]
+        calls = []
+
+        async def crashing(db, batch, **kwargs):
+            calls.append(list(batch))
+            if len(calls) == 1:
+                raise Crash()
+            return await sync_news(db, batch, **kwargs)
+
+        monkeypatch.setitem(pipeline.SYNC_FUNCTIONS, "news", crashing)
+
+        async def scenario():
+            with pytest.raises(Crash):
+                await pipeline.run_pipeline(symbols, stages=["news"], session_factory=database, trigger="scheduled")
+            with pytest.raises(ValueError):
+                await pipeline.resume_pipeline(session_factory=database)
+            for _ in range(3):
+                await pipeline.run_pipeline(symbols, stages=["news"], session_factory=database, trigger="scheduled")
+            await pipeline.run_pipeline(symbols, stages=["news"], session_factory=database)
+            async with database() as db:
+                pruned = await db.run_sync(prune_sync_runs, "scheduled", 2)
+            runs = await query(database, select(SyncRun).order_by(SyncRun.id))
+            return pruned, runs, await query(database, select(SyncCheckpoint.run_id))
+
+        pruned, runs, checkpointed = run(monkeypatch, scenario, symbols=2)
+        assert pruned == 2  # the crashed run and the oldest finished one
+        assert [(r.id, r.trigger) for r in runs] == [(3, "scheduled"), (4, "scheduled"), (5, "manual")]
+        assert set(checkpointed) == {3, 4, 5}
+
+    def test_cli_resume_arguments(self):
+        parser = build_parser()
+        assert parser.parse_args(["sync", "--resume"]).resume == 0  # the newest unfinished run
+        assert parser.parse_args(["sync", "--resume", "7"]).resume == 7
+        assert parser.parse_args(["sync"]).resume is None
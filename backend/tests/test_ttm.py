@@ -0,0 +1,99 @@
+"""
+Verify the trailing-twelve-month aggregation over quarterly rows.
+"""
+
+import pytest
+from datetime import date
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.cache import invalidate
+from app.core.database import Base
+from app.crud.crud_company import create_minimal_company
+from app.crud.crud_financials import bulk_upsert
+from app.models.financials import FinancialRatio, IncomeStatement
+from app.services.business_service import get_ttm_financials
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+QUARTER_ENDS = {1: (3, 31), 2: (6, 30), 3: (9, 30), 4: (12, 31)}
+
+def quarter(symbol, year, q, **figures):
+    month, day = QUARTER_ENDS[q]
+    return {"symbol": symbol, "date": date(year, month, day), "fiscal_year": str(year), "period": f"Q{q}",
+            "company_id": 1, **figures}
+
+class TestTTM:
+
+    def setup_method(self):
+        Base.metadata.create_all(bind=engine)
+        self.db = TestingSessionLocal()
+        create_minimal_company(self.db, "AAPL")
+        # revenue 1..8 over 2023-2024, plus an annual row that must not be mixed in
+        rows = [quarter("AAPL", year, q, revenue=(year - 2023) * 4 + q, net_income=10,
+                        weighted_average_shs_out=100 * q)
+                for year in (2023, 2024) for q in range(1, 5)]
+        rows[5]["net_income"] = None  # 2024 Q2 did not report net income
+        rows.append({**quarter("AAPL", 2024, 4, revenue=1000), "period": "FY"})
+        bulk_upsert(self.db, IncomeStatement, rows)
+
+    def teardown_method(self):
+        self.db.close()
+        Base.metadata.drop_all(bind=engine)
+
+    def test_rolling_sums_newest_first(self):
+        items = get_ttm_financials(self.db, "AAPL", "income_statements", limit=10)["items"]
+
+        # five windows of four quarters fit in eight quarters
+        assert [(i["date"], i["from_date"]) for i in items][:2] == [
+            (date(2024, 12, 31), date(2024, 3, 31)), (date(2024, 9, 30), date(2023, 12, 31)),
+        ]
+        assert len(items) == 5
+        assert [i["revenue"] for i in items] == [26, 22, 18, 14, 10]
+        # a flow is summed only when all four quarters report it
+        assert [i["net_income"] for i in items] == [None, None, None, 40, 40]
+        # share counts are averaged, not summed
+        assert items[0]["weighted_average_shs_out"] == 250
+
+    def test_gap_in_quarters_breaks_windows(self):
+        self.db.query(IncomeStatement).filter_by(fiscal_year="2024", period="Q3").delete()
+        self.db.commit()
+
+        items = get_ttm_financials(self.db, "AAPL", "income_statements", limit=10)["items"]
+        assert [i["date"] for i in items] == [date(2024, 6, 30), date(2024, 3, 31), date(2023, 12, 31)]
+
+    def test_ratios_are_averaged(self):
+        bulk_upsert(self.db, FinancialRatio, [
+            quarter("AAPL", 2024, q, current_ratio=q, net_profit_margin=0.1 * q) for q in range(1, 5)
+        ])
+        [item] = get_ttm_financials(self.db, "AAPL", "financial_ratios")["items"]
+        assert item["current_ratio"] == 2.5
+        assert item["net_profit_margin"] == pytest.approx(0.25)
+
+    def test_cached_until_invalidated(self):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            get_ttm_financials(self.db, "AAPL", "income_statements")
+            cached = get_ttm_financials(self.db, "AAPL", "income_statements")
+            assert len(statements) == 1
+            assert cached["items"][0]["date"] == "2024-12-31"
+
+            bulk_upsert(self.db, IncomeStatement, [quarter("AAPL", 2025, 1, revenue=9)])
+            invalidate("AAPL", "income_statements")  # as the sync does after writing new rows
+            statements.clear()
+            refreshed = get_ttm_financials(self.db, "AAPL", "income_statements")
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert len(statements) == 1
+        assert refreshed["items"][0]["date"] == date(2025, 3, 31)
+        assert refreshed["items"][0]["revenue"] == 9 + 8 + 7 + 6
+
+    def test_too_few_quarters(self):
+        with pytest.raises(HTTPException) as missing:
+            get_ttm_financials(self.db, "MSFT", "income_statements")
+        assert missing.value.status_code == 404
@@ -0,0 +1,115 @@
+"""
+Verify the sync work queue: broker semantics and workers draining it against the FMP stub.
+"""
+
+import asyncio
+import time
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+from app.core.config import settings
+from app.core.database import Base
+from app.models.company import Company
+from app.models.financials import IncomeStatement
+from app.services.fmp_client import FMPClient
+from app.services.work_queue import InMemoryBroker, produce, run_workers
+from tests.fmp_stub_server import run_stub_server, stub_symbols
+
+class TestBroker:
+
+    def test_claimed_tasks_are_invisible_until_the_timeout(self, clock):
+        broker = InMemoryBroker(clock=clock)
+        assert broker.enqueue(["news:AAPL", "news:MSFT", "news:AAPL"]) == 2
+        assert broker.enqueue(["news:AAPL"]) == 0  # still queued
+
+        assert broker.claim(5, visibility_timeout=60) == [("news:AAPL", 1), ("news:MSFT", 1)]
+        assert broker.claim(5, visibility_timeout=60) == []
+        broker.ack(["news:MSFT"], rows=20)
+
+        # the worker holding AAPL died; after the timeout another worker gets it
+        clock.now = 60
+        assert broker.claim(5, visibility_timeout=60) == [("news:AAPL", 2)]
+        assert broker.progress() == {"ready": 0, "in_flight": 1, "dead": 0, "enqueued": 2,
+                                     "succeeded": 1, "retried": 0, "rows": 20}
+
+    def test_failures_back_off_then_dead_letter(self, clock):
+        broker = InMemoryBroker(clock=clock)
+        broker.enqueue(["profiles:ZZZZ"])
+        outcomes = []
+        for _ in range(3):
+            [(task, attempt)] = broker.claim(1, visibility_timeout=60)
+            outcomes.append(broker.fail(task, "404 not found", max_attempts=3, retry_delay=10))
+            assert broker.claim(1, visibility_timeout=60) == []  # waiting out the backoff
+            clock.now += 10 * 2 ** (attempt - 1)
+
+        assert outcomes == ["retried", "retried", "dead"]
+        [entry] = broker.dead_letters()
+        assert entry["task"] == "profiles:ZZZZ" and entry["attempts"] == 3 and entry["error"] == "404 not found"
+
+        assert broker.requeue_dead() == 1
+        assert broker.claim(1, visibility_timeout=60) == [("profiles:ZZZZ", 1)]
+
+class TestSyncWorkers:
+
+    def run(self, monkeypatch, tmp_path, scenario, **stub_options):
+        """Workers use sessions of their own, so the database is a file with a connection per session."""
+        async def main():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'queue.db'}", poolclass=NullPool)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+            try:
+                async with run_stub_server(**stub_options) as base_url:
+                    monkeypatch.setattr(FMPClient, "BASE_URL", base_url)
+                    return await scenario(SessionLocal)
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+
+    def test_workers_drain_the_queue(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "work_queue_retry_delay", 0.01)
+        monkeypatch.setattr(settings, "work_queue_poll_interval", 0.01)
+        monkeypatch.setattr(settings, "fmp_sync_periods", ["annual"])
+        symbols = stub_symbols(6)
+        broker = InMemoryBroker()
+
+        async def scenario(SessionLocal):
+            # ZZZZ is unknown to the stub, so its tasks fail every attempt
+            added = await produce(broker, symbols + ["ZZZZ"], ["profiles", "income_statements"], SessionLocal)
+            processed = await run_workers(broker, 3, drain=True, session_factory=SessionLocal, claim_size=4)
+            async with SessionLocal() as db:
+                companies = await db.scalar(select(func.count()).select_from(Company))
+                statements = await db.scalar(select(func.count()).select_from(IncomeStatement))
+            return added, processed, companies, statements
+
+        added, processed, companies, statements = self.run(monkeypatch, tmp_path, scenario, symbols=6)
+        assert added == 14
+        assert statements == 6 * settings.fmp_max_periods
+        assert companies == 7  # the unknown symbol gets a minimal company from the resolver
+        progress = broker.progress()
+        assert progress["ready"] == progress["in_flight"] == 0
+        assert progress["succeeded"] == sum(p["succeeded"] for p in processed) == 13
+        assert progress["rows"] == 6 + statements
+        assert [entry["task"] for entry in broker.dead_letters()] == ["profiles:ZZZZ"]
+        assert progress["retried"] == settings.work_queue_max_attempts - 1
+
+    def test_throughput_scales_with_workers(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "work_queue_poll_interval", 0.01)
+        monkeypatch.setattr(settings, "fmp_sync_periods", ["annual"])
+        symbols = stub_symbols(32)
+
+        async def scenario(SessionLocal):
+            elapsed = []
+            for workers in (1, 4):
+                broker = InMemoryBroker()
+                await produce(broker, symbols, ["key_metrics"], SessionLocal)
+                started = time.perf_counter()
+                await run_workers(broker, workers, drain=True, session_factory=SessionLocal,
+                                  claim_size=4, concurrency=4)
+                elapsed.append(time.perf_counter() - started)
+                assert broker.progress()["succeeded"] == len(symbols)
+            return elapsed
+
+        # each statement request waits 50ms; a worker has 4 in flight, so 1 worker needs 8 rounds, 4 need 2
+        single, four = self.run(monkeypatch, tmp_path, scenario, symbols=32, latency=0.05)
+        assert single / four > 2
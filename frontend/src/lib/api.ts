@@ -17,4 +17,32 @@ export const getIncomeStatements = async (symbol: string, limit: number = 1) =>
     }
   );
   return response.data;
-};
\ No newline at end of file
+};
+export const getTTMFinancials = async (
+  symbol: string,
+  dataType: string = "income-statements",
+  limit: number = 4
+) => {
+  const response = await apiClient.get(`/financials/${symbol}/${dataType}/ttm`, {
+    params: { limit },
+  });
+  return response.data;
+};
+
+export const getCompanyProfiles = async (symbols: string[]) => {
+  const response = await apiClient.get(`/batch/companies`, {
+    params: { symbols: symbols.join(",") },
+  });
+  return response.data;
+};
+
+export const getFinancialsBatch = async (
+  symbols: string[],
+  dataTypes: string[] = ["income-statements", "key-metrics", "ratios"],
+  limit: number = 4
+) => {
+  const response = await apiClient.get(`/batch/financials`, {
+    params: { symbols: symbols.join(","), data_types: dataTypes.join(","), limit },
+  });
+  return response.data;
+};